@@ -0,0 +1,192 @@
+"""
+Compression benchmark: bandwidth saved versus CPU spent by permessage-deflate
+(see support.transport.TransportConfig) on full depth order book feeds.
+
+Frames are deflated and inflated the way the websocket extension does
+(raw deflate, shared context between messages, sync flush), so the sizes
+and CPU times are those of a compressed connection, without the network.
+Two feeds are simulated: grouped full depth snapshots ('book.*.none.N.100ms',
+every frame carries the whole book) and raw incremental changes
+('book.*.raw'). Recorded frames (one JSON frame per line) can be used instead.
+
+Compression pays off when the transfer time saved on the link exceeds the
+time spent deflating (exchange) and inflating (client): the break-even
+bandwidths are printed per feed.
+
+Usage: python benchmarks/bench_compression.py [--levels 1000] [--frames 500]
+       [--window-bits 12] [--level 6] [--recorded frames.jsonl]
+"""
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+
+# Appended by a sync flush, stripped from the frames (RFC 7692)
+EMPTY_BLOCK = b"\x00\x00\xff\xff"
+
+LINKS_MBPS = [10, 100, 1000]
+
+
+# ######################################################################
+# FEEDS
+# ######################################################################
+
+def _level(rng, mid, side, n):
+    price = round(mid - (n + 1) * 0.5 if side == "bids" else mid + (n + 1) * 0.5, 1)
+    return price, float(rng.randint(1, 500) * 10)
+
+
+def snapshot_feed(levels, frames, seed=7):
+    """
+    Grouped full depth books: each frame is the whole book, slightly changed.
+    """
+
+    rng = random.Random(seed)
+    mid = 60000.0
+    book = {side: [list(_level(rng, mid, side, n)) for n in range(levels)] for side in ["bids", "asks"]}
+
+    output = []
+    for k in range(frames):
+        for side in ["bids", "asks"]:
+            for _ in range(max(1, levels // 50)):
+                book[side][rng.randrange(levels)][1] = float(rng.randint(1, 500) * 10)
+        data = {"timestamp": 1600000000000 + 100 * k,
+                "instrument_name": "BTC-PERPETUAL",
+                "change_id": 1000 + k,
+                "bids": book["bids"],
+                "asks": book["asks"]}
+        output.append(_notification(f"book.BTC-PERPETUAL.none.{levels}.100ms", data))
+
+    return output
+
+
+def changes_feed(levels, frames, seed=7):
+    """
+    Raw book: a full snapshot, then small batches of level changes.
+    """
+
+    rng = random.Random(seed)
+    mid = 60000.0
+    channel = "book.BTC-PERPETUAL.raw"
+
+    data = {"type": "snapshot",
+            "timestamp": 1600000000000,
+            "instrument_name": "BTC-PERPETUAL",
+            "change_id": 1000,
+            "bids": [["new", *_level(rng, mid, "bids", n)] for n in range(levels)],
+            "asks": [["new", *_level(rng, mid, "asks", n)] for n in range(levels)]}
+    output = [_notification(channel, data)]
+
+    for k in range(1, frames):
+        data = {"type": "change",
+                "timestamp": 1600000000000 + k,
+                "instrument_name": "BTC-PERPETUAL",
+                "prev_change_id": 999 + k,
+                "change_id": 1000 + k}
+        for side in ["bids", "asks"]:
+            data[side] = [[rng.choice(["new", "change", "delete"]), *_level(rng, mid, side, rng.randrange(levels))]
+                          for _ in range(rng.randint(0, 4))]
+        output.append(_notification(channel, data))
+
+    return output
+
+
+def recorded_feed(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _notification(channel, data):
+    return json.dumps({"jsonrpc": "2.0", "method": "subscription", "params": {"channel": channel, "data": data}})
+
+
+# ######################################################################
+# MEASURES
+# ######################################################################
+
+def measure(frames, window_bits, level):
+    """
+    :return: (dict) Raw and compressed bytes, deflate, inflate and JSON decoding seconds.
+    """
+
+    raw = [f.encode("utf-8") for f in frames]
+
+    # Server side: shared deflate context
+    encoder = zlib.compressobj(level, zlib.DEFLATED, -window_bits)
+    started = time.perf_counter()
+    compressed = []
+    for data in raw:
+        out = encoder.compress(data) + encoder.flush(zlib.Z_SYNC_FLUSH)
+        compressed.append(out[:-4] if out.endswith(EMPTY_BLOCK) else out)
+    deflate = time.perf_counter() - started
+
+    # Client side: shared inflate context
+    decoder = zlib.decompressobj(-window_bits)
+    started = time.perf_counter()
+    for data in compressed:
+        decoder.decompress(data + EMPTY_BLOCK)
+    inflate = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for data in raw:
+        json.loads(data)
+    decode = time.perf_counter() - started
+
+    return {"frames": len(raw),
+            "raw_bytes": sum(len(d) for d in raw),
+            "compressed_bytes": sum(len(d) for d in compressed),
+            "deflate_s": deflate,
+            "inflate_s": inflate,
+            "decode_s": decode}
+
+
+def report(name, m):
+
+    n = m["frames"]
+    ratio = m["compressed_bytes"] / m["raw_bytes"]
+    saved_bits = 8.0 * (m["raw_bytes"] - m["compressed_bytes"])
+
+    print(f"\n{name}: {n} frames, {m['raw_bytes'] / n / 1024:.1f} KiB per frame")
+    print(f"  compressed size        {ratio * 100:6.1f} % ({m['compressed_bytes'] / n / 1024:.1f} KiB per frame)")
+    print(f"  inflate (client)       {m['inflate_s'] / n * 1e6:8.1f} us per frame")
+    print(f"  deflate (server)       {m['deflate_s'] / n * 1e6:8.1f} us per frame")
+    print(f"  json decoding          {m['decode_s'] / n * 1e6:8.1f} us per frame (for scale)")
+
+    # Latency per frame: the server deflates before sending, the client inflates after reading
+    codec = (m["deflate_s"] + m["inflate_s"]) / n
+    for mbps in LINKS_MBPS:
+        plain = 8.0 * m["raw_bytes"] / (mbps * 1e6) / n
+        deflated = 8.0 * m["compressed_bytes"] / (mbps * 1e6) / n + codec
+        better = "compression" if deflated < plain else "no compression"
+        print(f"  {mbps:>5} Mbit/s link       {plain * 1e6:8.1f} us plain vs {deflated * 1e6:8.1f} us "
+              f"deflated (transfer + codec): {better}")
+
+    print(f"  break-even bandwidth   {saved_bits / max(m['inflate_s'], 1e-9) / 1e6:8.1f} Mbit/s for the client CPU, "
+          f"{saved_bits / max(codec * n, 1e-9) / 1e6:.1f} Mbit/s for the latency (compression loses above)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, default=1000, help="Book levels per side.")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--window-bits", type=int, default=12,
+                        help="Deflate window (the websockets client negotiates 12 by default).")
+    parser.add_argument("--level", type=int, default=6, help="Deflate compression level of the server.")
+    parser.add_argument("--recorded", default=None, help="File of recorded frames (one JSON per line).")
+    args = parser.parse_args()
+
+    if args.recorded:
+        feeds = {args.recorded: recorded_feed(args.recorded)}
+    else:
+        feeds = {"full depth snapshots": snapshot_feed(args.levels, args.frames),
+                 "raw book changes": changes_feed(args.levels, args.frames)}
+
+    print(f"permessage-deflate, window bits {args.window_bits}, level {args.level}, python {sys.version.split()[0]}")
+    for (name, frames) in feeds.items():
+        report(name, measure(frames, args.window_bits, args.level))
+
+
+if __name__ == '__main__':
+    main()
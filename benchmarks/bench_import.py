@@ -0,0 +1,71 @@
+"""
+Cold start benchmark: import time of the client modules, measured in
+fresh interpreters, and the heavy modules loaded by the import alone.
+
+Usage: python benchmarks/bench_import.py [--runs 20] [--max-ms 50]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["source.clients.async_client",
+           "source.clients.sync_client",
+           "source.clients.websocket_client",
+           "source.clients.multi_client"]
+
+HEAVY = ["websockets", "websocket", "blinker", "asyncio", "numpy",
+         "source.events",
+         "source.support.sanitizers",
+         "source.features.data",
+         "source.features.session",
+         "source.features.account",
+         "source.features.trading"]
+
+PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"ms": elapsed * 1000.0, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs):
+    samples, loaded = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                             cwd=ROOT, check=True, stdout=subprocess.PIPE).stdout
+        result = json.loads(out)
+        samples.append(result["ms"])
+        loaded = result["loaded"]
+    return samples, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Exit with an error if a median import time exceeds this budget.")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<36} {'min ms':>8} {'median ms':>10}  heavy modules loaded")
+    for module in MODULES:
+        samples, loaded = measure(module, args.runs)
+        median = statistics.median(samples)
+        print(f"{module:<36} {min(samples):>8.2f} {median:>10.2f}  {', '.join(loaded) or '-'}")
+        if args.max_ms is not None and median > args.max_ms:
+            failed = True
+
+    if failed:
+        print(f"Import time budget exceeded ({args.max_ms} ms).")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import numpy as np
+
+from source.utilities import unwrap_results
+
+
+# ######################################################################
+# CONSTANTS
+# ######################################################################
+
+SIDE_BUY = "buy"
+SIDE_SELL = "sell"
+
+
+# ######################################################################
+# BOOK ARRAYS
+# ######################################################################
+
+class BookArrays(object):
+    """
+    Order books of many instruments as padded 2D arrays (instrument x
+    level), best level first. Missing levels have a NaN price and a zero
+    amount, so cumulative sums run over whole rows.
+    """
+
+    def __init__(self, names, bid_prices, bid_amounts, ask_prices, ask_amounts):
+        self.names = list(names)
+        self.bid_prices = bid_prices
+        self.bid_amounts = bid_amounts
+        self.ask_prices = ask_prices
+        self.ask_amounts = ask_amounts
+        self.__rows = {name: n for (n, name) in enumerate(self.names)}
+
+    @property
+    def size(self):
+        return len(self.names)
+
+    @property
+    def depth(self):
+        return self.bid_prices.shape[1]
+
+    def index(self, name: str):
+        return self.__rows[name]
+
+    def side(self, side: str):
+        """
+        :return: (tuple) Prices and amounts walked by an order of the given side.
+        """
+        if side == SIDE_BUY:
+            return self.ask_prices, self.ask_amounts
+        if side == SIDE_SELL:
+            return self.bid_prices, self.bid_amounts
+        raise ValueError(f"Unknown side {side}.")
+
+
+def books_to_arrays(books, depth: int = None):
+    """
+    :param books: Results of 'public/get_order_book' (raw or wrapped in responses).
+    :param depth: (int) Levels kept per side. Defaults to the deepest book.
+    :return: (BookArrays)
+    """
+
+    books = unwrap_results(books)
+    if depth is None:
+        depth = max([max(len(b.get("bids", [])), len(b.get("asks", []))) for b in books] or [0])
+
+    n = len(books)
+    arrays = {}
+    for side in ["bids", "asks"]:
+        prices = np.full((n, depth), np.nan)
+        amounts = np.zeros((n, depth))
+        for (row, b) in enumerate(books):
+            levels = b.get(side, [])[:depth]
+            if levels:
+                levels = np.asarray(levels, dtype=float)
+                prices[row, :len(levels)] = levels[:, 0]
+                amounts[row, :len(levels)] = levels[:, 1]
+        arrays[side] = (prices, amounts)
+
+    return BookArrays([b.get("instrument_name") for b in books],
+                      arrays["bids"][0], arrays["bids"][1],
+                      arrays["asks"][0], arrays["asks"][1])
+
+
+# ######################################################################
+# VECTORIZED DEPTH ANALYTICS
+# ######################################################################
+
+def vwap_to_size(prices, amounts, sizes):
+    """
+    Average fill price of market orders of the given sizes walking the
+    levels, for every instrument (row) and size at once.
+    :param prices: (array) Level prices (instrument x level), best first.
+    :param amounts: (array) Level amounts, zero past the last level.
+    :param sizes: (float or array) Order sizes, shared by all the instruments.
+    :return: (tuple) VWAP, worst price reached and filled amount, each of
+    shape (instrument x size). VWAP is NaN when the book is too thin.
+    """
+
+    prices = np.atleast_2d(prices)
+    amounts = np.atleast_2d(amounts)
+    sizes = np.atleast_1d(np.asarray(sizes, dtype=float))
+
+    depth = prices.shape[1]
+    if depth == 0:
+        empty = np.full((prices.shape[0], sizes.size), np.nan)
+        return empty, empty.copy(), np.zeros_like(empty)
+
+    # Cumulative amount and notional before each level
+    cum_amount = np.cumsum(amounts, axis=1)
+    cum_notional = np.cumsum(np.where(amounts > 0.0, prices * amounts, 0.0), axis=1)
+    prev_amount = cum_amount - amounts
+    prev_notional = cum_notional - np.where(amounts > 0.0, prices * amounts, 0.0)
+
+    # Level at which each size is completed (depth if never)
+    k = (cum_amount[:, None, :] < sizes[None, :, None]).sum(axis=2)
+    full = k < depth
+    kk = np.minimum(k, depth - 1)
+
+    rows = np.arange(prices.shape[0])[:, None]
+    level_price = prices[rows, kk]
+    notional = prev_notional[rows, kk] + (sizes[None, :] - prev_amount[rows, kk]) * level_price
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = np.where(full, notional / sizes[None, :], np.nan)
+
+    worst = np.where(full, level_price, np.nan)
+    filled = np.minimum(sizes[None, :], cum_amount[:, -1:])
+    return vwap, worst, filled
+
+
+def execution_cost(books: BookArrays, side: str, sizes):
+    """
+    Pre-trade estimates for market orders of the given side and sizes.
+    :return: (dict) Arrays (instrument x size): 'vwap', 'worst', 'filled',
+    'slippage' (VWAP vs best price, as a fraction, positive is a cost) and
+    'impact' (worst price vs best price, as a fraction).
+    """
+
+    prices, amounts = books.side(side)
+    vwap, worst, filled = vwap_to_size(prices, amounts, sizes)
+
+    best = prices[:, :1]
+    sign = 1.0 if side == SIDE_BUY else -1.0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slippage = sign * (vwap / best - 1.0)
+        impact = sign * (worst / best - 1.0)
+
+    return {"vwap": vwap, "worst": worst, "filled": filled, "slippage": slippage, "impact": impact}
+
+
+def size_within_band(prices, amounts, bands):
+    """
+    Amount available within relative price bands around the best level
+    (e.g. 0.01 for 1%), for every instrument and band at once.
+    :return: (array) Amounts (instrument x band).
+    """
+
+    prices = np.atleast_2d(prices)
+    amounts = np.atleast_2d(amounts)
+    bands = np.atleast_1d(np.asarray(bands, dtype=float))
+
+    best = prices[:, :1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distance = np.abs(prices / best - 1.0)
+
+    inside = distance[:, None, :] <= bands[None, :, None] + 1e-12
+    return np.where(inside, amounts[:, None, :], 0.0).sum(axis=2)
+
+
+def microprice(bid_prices, bid_amounts, ask_prices, ask_amounts):
+    """
+    Top of book price weighted by the opposite side amounts.
+    :return: (array) One microprice per instrument, NaN if a side is empty.
+    """
+
+    bid, ask = np.atleast_2d(bid_prices)[:, 0], np.atleast_2d(ask_prices)[:, 0]
+    bid_amount, ask_amount = np.atleast_2d(bid_amounts)[:, 0], np.atleast_2d(ask_amounts)[:, 0]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (bid * ask_amount + ask * bid_amount) / (bid_amount + ask_amount)
+
+
+def imbalance(bid_amounts, ask_amounts, levels: int = 1):
+    """
+    (bid amount - ask amount) / (bid amount + ask amount) over the first levels.
+    :return: (array) One imbalance in [-1, 1] per instrument, NaN for empty books.
+    """
+
+    bids = np.atleast_2d(bid_amounts)[:, :levels].sum(axis=1)
+    asks = np.atleast_2d(ask_amounts)[:, :levels].sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (bids - asks) / (bids + asks)
+
+
+def book_analytics(books: BookArrays, sizes, bands=(), levels: int = 1):
+    """
+    All the pre-trade analytics of a set of books at once.
+    :return: (dict) 'names', 'microprice', 'imbalance', 'buy' / 'sell'
+    (see 'execution_cost') and 'bid_size' / 'ask_size' within the bands.
+    """
+
+    output = {"names": books.names,
+              "microprice": microprice(books.bid_prices, books.bid_amounts, books.ask_prices, books.ask_amounts),
+              "imbalance": imbalance(books.bid_amounts, books.ask_amounts, levels=levels),
+              SIDE_BUY: execution_cost(books, SIDE_BUY, sizes),
+              SIDE_SELL: execution_cost(books, SIDE_SELL, sizes)}
+
+    if len(bands):
+        output["bid_size"] = size_within_band(books.bid_prices, books.bid_amounts, bands)
+        output["ask_size"] = size_within_band(books.ask_prices, books.ask_amounts, bands)
+
+    return output
@@ -0,0 +1,314 @@
+import os
+import time
+import datetime as dt
+import numpy as np
+
+from typing import Dict, List
+
+from source.utilities import unwrap_results, generate_random_characters
+
+# Parquet support is optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# ######################################################################
+# CONSTANTS
+# ######################################################################
+
+FORMAT_PARQUET = "parquet"
+FORMAT_NPZ = "npz"
+
+DATASET_TRADES = "trades"
+DATASET_ORDERBOOKS = "orderbooks"
+DATASET_INSTRUMENTS = "instruments"
+
+PARTITION_DATE = "date"
+PARTITION_INSTRUMENT = "instrument"
+
+MS_PER_DAY = 24 * 3600 * 1000
+
+# Typed column schemas: (name, numpy dtype)
+TRADE_COLUMNS = [("timestamp", "int64"),
+                 ("instrument_name", "str"),
+                 ("trade_id", "str"),
+                 ("trade_seq", "int64"),
+                 ("order_id", "str"),
+                 ("order_type", "str"),
+                 ("direction", "str"),
+                 ("price", "float64"),
+                 ("amount", "float64"),
+                 ("fee", "float64"),
+                 ("fee_currency", "str"),
+                 ("liquidity", "str"),
+                 ("index_price", "float64"),
+                 ("mark_price", "float64"),
+                 ("iv", "float64"),
+                 ("label", "str")]
+
+ORDERBOOK_COLUMNS = [("timestamp", "int64"),
+                     ("instrument_name", "str"),
+                     ("change_id", "int64"),
+                     ("side", "str"),
+                     ("level", "int64"),
+                     ("price", "float64"),
+                     ("amount", "float64")]
+
+INSTRUMENT_COLUMNS = [("timestamp", "int64"),
+                      ("instrument_name", "str"),
+                      ("kind", "str"),
+                      ("base_currency", "str"),
+                      ("quote_currency", "str"),
+                      ("option_type", "str"),
+                      ("strike", "float64"),
+                      ("expiration_timestamp", "int64"),
+                      ("creation_timestamp", "int64"),
+                      ("settlement_period", "str"),
+                      ("tick_size", "float64"),
+                      ("min_trade_amount", "float64"),
+                      ("contract_size", "float64"),
+                      ("is_active", "bool")]
+
+SUMMARY_COLUMNS = [("timestamp", "int64"),
+                   ("instrument_name", "str"),
+                   ("mark_price", "float64"),
+                   ("bid_price", "float64"),
+                   ("ask_price", "float64"),
+                   ("mid_price", "float64"),
+                   ("last", "float64"),
+                   ("underlying_price", "float64"),
+                   ("mark_iv", "float64"),
+                   ("open_interest", "float64"),
+                   ("volume", "float64"),
+                   ("volume_usd", "float64"),
+                   ("high", "float64"),
+                   ("low", "float64"),
+                   ("price_change", "float64")]
+
+MISSING = {"int64": 0, "float64": np.nan, "bool": False, "str": ""}
+
+
+# ######################################################################
+# CONVERSION TO COLUMNS
+# ######################################################################
+
+def to_columns(records: List[Dict], schema):
+    """
+    Converts a list of records into typed columns (dict of arrays).
+    """
+    columns = {}
+    for (name, dtype) in schema:
+        missing = MISSING[dtype]
+        values = [missing if r.get(name) is None else r[name] for r in records]
+        if dtype == "str":
+            columns[name] = np.array([str(v) for v in values], dtype=str) if values else np.array([], dtype=str)
+        else:
+            columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+def trades_to_columns(trades):
+    """
+    :param trades: User trades (raw, chunks, or responses of the user trades endpoints).
+    """
+    records = []
+    for r in unwrap_results(trades):
+        if isinstance(r, dict) and "trades" in r:
+            records.extend(r["trades"])
+        else:
+            records.append(r)
+    return to_columns(records, TRADE_COLUMNS)
+
+
+def orderbooks_to_columns(books):
+    """
+    Flattens order book snapshots into one row per price level.
+    :param books: Results of 'public/get_order_book' (raw or wrapped in responses).
+    """
+    records = []
+    for b in unwrap_results(books):
+        for side in ["bids", "asks"]:
+            for (level, (price, amount)) in enumerate(b.get(side, [])):
+                records.append({"timestamp": b.get("timestamp"),
+                                "instrument_name": b.get("instrument_name"),
+                                "change_id": b.get("change_id"),
+                                "side": side[:-1],
+                                "level": level,
+                                "price": price,
+                                "amount": amount})
+    return to_columns(records, ORDERBOOK_COLUMNS)
+
+
+def instruments_to_columns(instruments, timestamp: int = None):
+    """
+    :param instruments: Result of 'public/get_instruments' (raw or wrapped in responses).
+    :param timestamp: (int) Snapshot time (ms since epoch). Defaults to now.
+    """
+    timestamp = timestamp or int(time.time() * 1000)
+    records = [{**i, "timestamp": timestamp} for i in unwrap_results(instruments)]
+    return to_columns(records, INSTRUMENT_COLUMNS)
+
+
+def summaries_to_columns(summaries):
+    """
+    :param summaries: Result of 'public/get_book_summary_by_currency' (raw or wrapped in responses).
+    """
+    records = [{**s, "timestamp": s.get("creation_timestamp")} for s in unwrap_results(summaries)]
+    return to_columns(records, SUMMARY_COLUMNS)
+
+
+# ######################################################################
+# WRITING
+# ######################################################################
+
+def default_format():
+    return FORMAT_PARQUET if pq is not None else FORMAT_NPZ
+
+
+def write_partitions(columns: Dict, root: str, dataset: str,
+                     partition_by=(PARTITION_DATE, PARTITION_INSTRUMENT), fmt: str = None):
+    """
+    Writes columns into new files, one per partition (UTC day of 'timestamp'
+    and/or instrument). Existing files are never rewritten, so exports can
+    be appended to the same dataset.
+    :return: (list) Paths of the files written.
+    """
+
+    fmt = fmt or default_format()
+    if fmt == FORMAT_PARQUET and pq is None:
+        raise Exception("Parquet export requires pyarrow.")
+    if fmt not in [FORMAT_PARQUET, FORMAT_NPZ]:
+        raise ValueError(f"Invalid export format received ({fmt}).")
+
+    size = len(columns["timestamp"])
+    if size == 0:
+        return []
+
+    days = columns["timestamp"] // MS_PER_DAY
+    instruments = columns["instrument_name"]
+
+    keys = [days if PARTITION_DATE in partition_by else np.zeros(size, dtype="int64"),
+            instruments if PARTITION_INSTRUMENT in partition_by else np.full(size, "")]
+
+    # Sort once, then slice contiguous partitions
+    order = np.lexsort((columns["timestamp"], keys[1], keys[0]))
+    sorted_keys = [k[order] for k in keys]
+    change = np.flatnonzero((sorted_keys[0][1:] != sorted_keys[0][:-1]) |
+                            (sorted_keys[1][1:] != sorted_keys[1][:-1])) + 1
+    bounds = np.concatenate(([0], change, [size]))
+
+    paths = []
+    for (a, b) in zip(bounds[:-1], bounds[1:]):
+        rows = order[a:b]
+        directory = os.path.join(root, dataset)
+        if PARTITION_DATE in partition_by:
+            day = dt.datetime.utcfromtimestamp(int(sorted_keys[0][a]) * 86400).strftime("%Y-%m-%d")
+            directory = os.path.join(directory, f"{PARTITION_DATE}={day}")
+        if PARTITION_INSTRUMENT in partition_by:
+            directory = os.path.join(directory, f"{PARTITION_INSTRUMENT}={sorted_keys[1][a]}")
+
+        os.makedirs(directory, exist_ok=True)
+        part = {k: v[rows] for (k, v) in columns.items()}
+        paths.append(_write_file(part, directory, fmt))
+
+    return paths
+
+
+def _write_file(columns, directory, fmt):
+
+    name = f"part-{int(time.time() * 1000)}-{generate_random_characters(6)}"
+
+    if fmt == FORMAT_PARQUET:
+        path = os.path.join(directory, name + ".parquet")
+        table = pa.Table.from_pydict({k: pa.array(v) for (k, v) in columns.items()})
+        pq.write_table(table, path, compression="zstd")
+        return path
+
+    path = os.path.join(directory, name + ".npz")
+    np.savez_compressed(path, **columns)
+    return path
+
+
+def export_trades(trades, root: str, fmt: str = None):
+    return write_partitions(trades_to_columns(trades), root, DATASET_TRADES, fmt=fmt)
+
+
+def export_orderbooks(books, root: str, fmt: str = None):
+    return write_partitions(orderbooks_to_columns(books), root, DATASET_ORDERBOOKS, fmt=fmt)
+
+
+def export_instruments(instruments, root: str, timestamp: int = None, fmt: str = None):
+    return write_partitions(instruments_to_columns(instruments, timestamp=timestamp), root,
+                            DATASET_INSTRUMENTS, partition_by=(PARTITION_DATE,), fmt=fmt)
+
+
+# ######################################################################
+# READING
+# ######################################################################
+
+def load(root: str, dataset: str, start_date: str = None, end_date: str = None,
+         instruments: List[str] = None):
+    """
+    Loads a dataset back into columns (dict of arrays), pruning partitions
+    by date (inclusive 'YYYY-MM-DD' bounds) and instrument.
+    """
+
+    instruments_ = set(i.upper() for i in instruments) if instruments else None
+    parts = []
+
+    def selected(labels):
+        day = labels.get(PARTITION_DATE)
+        if day and ((start_date and day < start_date) or (end_date and day > end_date)):
+            return False
+        instrument = labels.get(PARTITION_INSTRUMENT)
+        return not (instrument and instruments_ is not None and instrument not in instruments_)
+
+    for (directory, dirs, files) in os.walk(os.path.join(root, dataset)):
+        # Excluded partitions are not walked into
+        dirs[:] = sorted(d for d in dirs if selected(_partition_labels(d)))
+
+        if not selected(_partition_labels(directory)):
+            continue
+
+        for f in sorted(files):
+            parts.append(_read_file(os.path.join(directory, f)))
+
+    parts = [p for p in parts if p]
+    if not parts:
+        return {}
+
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def _partition_labels(directory):
+    labels = {}
+    for token in directory.split(os.sep):
+        if "=" in token:
+            k, v = token.split("=", 1)
+            labels[k] = v
+    return labels
+
+
+def _read_file(path):
+
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as f:
+            return {k: f[k] for k in f.files}
+
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise Exception("Reading parquet files requires pyarrow.")
+        table = pq.read_table(path)
+
+        # Strings come back as objects: restore the schema dtype
+        columns = {}
+        for field in table.schema:
+            values = table.column(field.name).to_numpy()
+            columns[field.name] = values.astype(str) if pa.types.is_string(field.type) else values
+        return columns
+
+    return None
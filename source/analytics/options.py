@@ -0,0 +1,369 @@
+import time
+import numpy as np
+
+from typing import Dict, List
+
+from source.utilities import unwrap_results
+from source.support.types import INSTRUMENT_KIND
+
+
+# ######################################################################
+# CONSTANTS
+# ######################################################################
+
+MS_PER_YEAR = 365.0 * 24.0 * 3600.0 * 1000.0
+DAYS_PER_YEAR = 365.0
+
+MIN_TIME_TO_EXPIRY = 1e-8
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 10.0
+
+IV_TOLERANCE = 1e-8
+IV_MAX_ITERATIONS = 64
+
+QUOTE_MARK = "mark"
+QUOTE_MID = "mid"
+QUOTE_BID = "bid"
+QUOTE_ASK = "ask"
+
+GREEK_COLUMNS = ["iv", "delta", "gamma", "vega", "theta"]
+
+
+# ######################################################################
+# VECTORIZED PRIMITIVES
+# ######################################################################
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def norm_cdf(x):
+    # Chebyshev approximation of erfc (Numerical Recipes), with a
+    # fractional error below 1.2e-7 on the whole real line. This keeps
+    # the tails (deep OTM strikes) accurate without requiring scipy.
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    erfc = t * np.exp(poly)
+    return np.where(x >= 0.0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def _d1_d2(forward, strike, tau, sigma):
+    sqrt_tau = np.sqrt(tau)
+    vol_sqrt_tau = sigma * sqrt_tau
+    d1 = (np.log(forward / strike) + 0.5 * sigma * sigma * tau) / vol_sqrt_tau
+    return d1, d1 - vol_sqrt_tau
+
+
+def black_price(forward, strike, tau, sigma, is_call, rate=0.0):
+    """
+    Black-76 price of european options, vectorized over all arguments.
+    :param forward: (ndarray) Forward (underlying) price.
+    :param strike: (ndarray) Strike price.
+    :param tau: (ndarray) Time to expiry, in years.
+    :param sigma: (ndarray) Volatility (e.g. 0.8 for 80%).
+    :param is_call: (ndarray) True for calls, False for puts.
+    :param rate: (float) Continuously compounded discount rate.
+    :return: (ndarray) Option prices, in the currency of the forward.
+    """
+    d1, d2 = _d1_d2(forward, strike, tau, sigma)
+    discount = np.exp(-rate * tau)
+    call = discount * (forward * norm_cdf(d1) - strike * norm_cdf(d2))
+    put = discount * (strike * norm_cdf(-d2) - forward * norm_cdf(-d1))
+    return np.where(is_call, call, put)
+
+
+def black_greeks(forward, strike, tau, sigma, is_call, rate=0.0):
+    """
+    Black-76 greeks, vectorized over all arguments.
+    Vega is given per volatility point (1%) and theta per calendar day.
+    :return: (dict) Arrays for 'delta', 'gamma', 'vega' and 'theta'.
+    """
+    d1, d2 = _d1_d2(forward, strike, tau, sigma)
+    sqrt_tau = np.sqrt(tau)
+    discount = np.exp(-rate * tau)
+    pdf_d1 = norm_pdf(d1)
+
+    delta = discount * np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+    gamma = discount * pdf_d1 / (forward * sigma * sqrt_tau)
+    vega = discount * forward * pdf_d1 * sqrt_tau
+    price = black_price(forward, strike, tau, sigma, is_call, rate=rate)
+    theta = -discount * forward * pdf_d1 * sigma / (2.0 * sqrt_tau) + rate * price
+
+    return {"delta": delta,
+            "gamma": gamma,
+            "vega": vega / 100.0,
+            "theta": theta / DAYS_PER_YEAR}
+
+
+def implied_volatility(price, forward, strike, tau, is_call, rate=0.0,
+                       tolerance=IV_TOLERANCE, max_iterations=IV_MAX_ITERATIONS):
+    """
+    Solves the Black-76 implied volatility of a whole batch of options at once.
+    Newton steps are used while they stay within a bisection bracket, which
+    guarantees convergence for every price within no-arbitrage bounds.
+    :param price: (ndarray) Option prices, in the currency of the forward.
+    :return: (ndarray) Implied volatilities. NaN where the price is out of bounds.
+    """
+    price, forward, strike, tau, is_call = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(forward, dtype=float),
+        np.asarray(strike, dtype=float), np.asarray(tau, dtype=float),
+        np.asarray(is_call, dtype=bool))
+
+    discount = np.exp(-rate * tau)
+    intrinsic = discount * np.where(is_call,
+                                    np.maximum(forward - strike, 0.0),
+                                    np.maximum(strike - forward, 0.0))
+    upper = discount * np.where(is_call, forward, strike)
+
+    valid = np.isfinite(price) & np.isfinite(forward) & (forward > 0) & (strike > 0) & (tau > 0)
+    valid &= (price > intrinsic) & (price < upper)
+
+    sigma = np.full(price.shape, np.nan)
+    if not valid.any():
+        return sigma
+
+    # Work on the valid subset only
+    p, f, k, t, c = price[valid], forward[valid], strike[valid], tau[valid], is_call[valid]
+    lo = np.full(p.shape, MIN_VOLATILITY)
+    hi = np.full(p.shape, MAX_VOLATILITY)
+
+    # Brenner-Subrahmanyam initial guess, clipped into the bracket
+    guess = np.sqrt(2.0 * np.pi / t) * p / (f * np.exp(-rate * t))
+    s = np.clip(guess, MIN_VOLATILITY * 2.0, MAX_VOLATILITY / 2.0)
+    step = hi - lo
+
+    active = np.ones(p.shape, dtype=bool)
+    for _ in range(max_iterations):
+        sa = s[active]
+        fa, ka, ta, ca = f[active], k[active], t[active], c[active]
+
+        diff = black_price(fa, ka, ta, sa, ca, rate=rate) - p[active]
+        d1, _d2 = _d1_d2(fa, ka, ta, sa)
+        vega = np.exp(-rate * ta) * fa * norm_pdf(d1) * np.sqrt(ta)
+
+        # Update the bracket
+        lo_a = np.where(diff < 0.0, sa, lo[active])
+        hi_a = np.where(diff > 0.0, sa, hi[active])
+        lo[active], hi[active] = lo_a, hi_a
+
+        # Newton step, falling back to bisection when it leaves the bracket
+        # or shrinks slower than bisection would (e.g. far out of the money)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = sa - diff / vega
+        bisect = 0.5 * (lo_a + hi_a)
+        ok = np.isfinite(newton) & (newton > lo_a) & (newton < hi_a) & (np.abs(newton - sa) <= 0.5 * step[active])
+        s_new = np.where(ok, newton, bisect)
+        step[active] = np.abs(s_new - sa)
+
+        # Relative price tolerance: far out of the money options are worth next to nothing
+        priced = np.abs(diff) < tolerance * p[active]
+        s[active] = np.where(priced, sa, s_new)
+
+        done = priced | (np.abs(s_new - sa) < tolerance)
+        idx = np.flatnonzero(active)
+        active[idx[done]] = False
+        if not active.any():
+            break
+
+    sigma[valid] = s
+    return sigma
+
+
+# ######################################################################
+# OPTION CHAIN
+# ######################################################################
+
+class OptionChain(object):
+    """
+    Implied volatility and greeks for a whole option chain, computed in
+    batched NumPy passes. Quotes are fed with 'update_quotes' (order book
+    results) and only the strikes whose quotes changed are recomputed.
+    """
+
+    def __init__(self,
+                 instruments: List[Dict],
+                 quote: str = QUOTE_MARK,
+                 inverse: bool = True,
+                 rate: float = 0.0):
+        """
+        :param instruments: Result of 'public/get_instruments' (raw or wrapped in responses).
+        :param quote: (str) Price used to imply the volatility. Either mark, mid, bid or ask.
+        :param inverse: (bool) True if prices are quoted in the underlying currency (Deribit default).
+        :param rate: (float) Continuously compounded discount rate.
+        """
+
+        if quote not in [QUOTE_MARK, QUOTE_MID, QUOTE_BID, QUOTE_ASK]:
+            raise ValueError(f"Invalid quote type received ({quote}).")
+
+        options = [i for i in unwrap_results(instruments)
+                   if i.get("kind", INSTRUMENT_KIND.OPTION.value) == INSTRUMENT_KIND.OPTION.value]
+
+        self.quote = quote
+        self.inverse = inverse
+        self.rate = rate
+
+        self.__names = [i["instrument_name"] for i in options]
+        self.__index = {name: n for (n, name) in enumerate(self.__names)}
+
+        size = len(self.__names)
+        self.strike = np.array([float(i["strike"]) for i in options], dtype=float)
+        self.expiry = np.array([float(i["expiration_timestamp"]) for i in options], dtype=float)
+        self.is_call = np.array([i["option_type"] == "call" for i in options], dtype=bool)
+
+        # Quotes
+        self.bid = np.full(size, np.nan)
+        self.ask = np.full(size, np.nan)
+        self.mark = np.full(size, np.nan)
+        self.underlying = np.full(size, np.nan)
+
+        # Outputs
+        self.iv = np.full(size, np.nan)
+        self.delta = np.full(size, np.nan)
+        self.gamma = np.full(size, np.nan)
+        self.vega = np.full(size, np.nan)
+        self.theta = np.full(size, np.nan)
+
+        # Rows whose quotes changed since the last computation
+        self.__dirty = np.zeros(size, dtype=bool)
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def names(self):
+        return list(self.__names)
+
+    @property
+    def size(self):
+        return len(self.__names)
+
+    @property
+    def dirty(self):
+        return int(self.__dirty.sum())
+
+    def index_of(self, instrument: str):
+        return self.__index.get(instrument.upper())
+
+    # ##################################################################
+    # QUOTES
+    # ##################################################################
+
+    def update_quotes(self, books):
+        """
+        Stores order book (or ticker) results and flags the rows whose
+        prices changed.
+        :param books: Results of 'public/get_order_book' (raw or wrapped in responses).
+        :return: (int) Number of rows flagged for recomputation.
+        """
+        flagged = 0
+        for b in unwrap_results(books):
+            n = self.__index.get(b.get("instrument_name"))
+            if n is None:
+                continue
+
+            values = (_as_float(b.get("best_bid_price")),
+                      _as_float(b.get("best_ask_price")),
+                      _as_float(b.get("mark_price")),
+                      _as_float(b.get("underlying_price", b.get("index_price"))))
+            current = (self.bid[n], self.ask[n], self.mark[n], self.underlying[n])
+
+            if all(_same(v, c) for (v, c) in zip(values, current)):
+                continue
+
+            self.bid[n], self.ask[n], self.mark[n], self.underlying[n] = values
+            self.__dirty[n] = True
+            flagged += 1
+
+        return flagged
+
+    def quote_prices(self):
+        if self.quote == QUOTE_MARK:
+            price = self.mark
+        elif self.quote == QUOTE_BID:
+            price = self.bid
+        elif self.quote == QUOTE_ASK:
+            price = self.ask
+        else:
+            price = 0.5 * (self.bid + self.ask)
+
+        if self.inverse:
+            return price * self.underlying
+        return price
+
+    # ##################################################################
+    # COMPUTATION
+    # ##################################################################
+
+    def compute(self, now_ms: float = None, full: bool = False):
+        """
+        Recomputes implied volatility and greeks.
+        :param now_ms: (float) Valuation time in milliseconds since epoch. Defaults to now.
+        :param full: (bool) Recompute every row (e.g. to roll time forward), not only changed ones.
+        :return: (int) Number of rows recomputed.
+        """
+        if now_ms is None:
+            now_ms = time.time() * 1000.0
+
+        rows = np.ones(self.size, dtype=bool) if full else self.__dirty.copy()
+        if not rows.any():
+            return 0
+
+        forward = self.underlying[rows]
+        strike = self.strike[rows]
+        is_call = self.is_call[rows]
+        tau = np.maximum((self.expiry[rows] - now_ms) / MS_PER_YEAR, MIN_TIME_TO_EXPIRY)
+
+        iv = implied_volatility(self.quote_prices()[rows], forward, strike, tau, is_call, rate=self.rate)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            greeks = black_greeks(forward, strike, tau, iv, is_call, rate=self.rate)
+
+        self.iv[rows] = iv
+        for k in greeks:
+            getattr(self, k)[rows] = greeks[k]
+
+        self.__dirty[rows] = False
+        return int(rows.sum())
+
+    # ##################################################################
+    # OUTPUTS
+    # ##################################################################
+
+    def table(self):
+        """
+        Returns the chain as a columnar table (dict of arrays).
+        """
+        return {"instrument_name": np.array(self.__names, dtype=object),
+                "strike": self.strike,
+                "expiration_timestamp": self.expiry,
+                "is_call": self.is_call,
+                "bid": self.bid,
+                "ask": self.ask,
+                "mark": self.mark,
+                "underlying": self.underlying,
+                **{k: getattr(self, k) for k in GREEK_COLUMNS}}
+
+    def row(self, instrument: str):
+        n = self.index_of(instrument)
+        if n is None:
+            raise KeyError(f"Unknown option instrument ({instrument}).")
+        return {k: (v[n].item() if hasattr(v[n], "item") else v[n]) for (k, v) in self.table().items()}
+
+
+# ######################################################################
+# HELPERS
+# ######################################################################
+
+def _as_float(value):
+    if value is None:
+        return np.nan
+    return float(value)
+
+
+def _same(a, b):
+    if np.isnan(a) and np.isnan(b):
+        return True
+    return a == b
@@ -0,0 +1,94 @@
+import unittest
+
+import numpy as np
+
+from source.analytics.book import (books_to_arrays, vwap_to_size, execution_cost, size_within_band,
+                                   microprice, imbalance, SIDE_BUY, SIDE_SELL)
+
+
+def walk(levels, size):
+    """
+    Reference: fills a market order level by level.
+    :return: (tuple) VWAP, worst price and filled amount (NaN prices if the book is too thin).
+    """
+    remaining, notional, worst = size, 0.0, None
+    for (price, amount) in levels:
+        if remaining <= 0.0:
+            break
+        fill = min(amount, remaining)
+        if fill > 0.0:
+            notional += fill * price
+            remaining -= fill
+            worst = price
+    filled = size - remaining
+    if remaining > 1e-12:
+        return np.nan, np.nan, filled
+    return notional / size, worst, filled
+
+
+class TestVwapToSize(unittest.TestCase):
+
+    def test_matches_a_walk_through_the_levels(self):
+        rng = np.random.default_rng(3)
+        books = []
+        for n in range(50):
+            depth = int(rng.integers(0, 12))
+            asks = [[50000.0 + 0.5 * (k + 1) + rng.random(), float(rng.integers(1, 100)) * 10.0] for k in range(depth)]
+            asks.sort()
+            books.append({"instrument_name": f"I{n}", "bids": [], "asks": asks})
+
+        arrays = books_to_arrays(books)
+        sizes = [10.0, 55.0, 300.0, 2500.0, 20000.0]
+        vwap, worst, filled = vwap_to_size(arrays.ask_prices, arrays.ask_amounts, sizes)
+
+        for (row, book) in enumerate(books):
+            for (col, size) in enumerate(sizes):
+                expected = walk(book["asks"], size)
+                np.testing.assert_allclose([vwap[row, col], worst[row, col], filled[row, col]], expected,
+                                           rtol=1e-12, equal_nan=True)
+
+    def test_exact_level_boundaries(self):
+        prices = [[100.0, 101.0, 102.0]]
+        amounts = [[1.0, 2.0, 3.0]]
+        vwap, worst, filled = vwap_to_size(prices, amounts, [1.0, 3.0, 6.0, 6.5])
+
+        np.testing.assert_allclose(vwap[0, :3], [100.0, (100.0 + 202.0) / 3.0, (100.0 + 202.0 + 306.0) / 6.0])
+        np.testing.assert_allclose(worst[0, :3], [100.0, 101.0, 102.0])
+        self.assertTrue(np.isnan(vwap[0, 3]))
+        self.assertEqual(filled[0, 3], 6.0)
+
+    def test_empty_books(self):
+        vwap, worst, filled = vwap_to_size(np.zeros((2, 0)), np.zeros((2, 0)), [1.0])
+        self.assertTrue(np.isnan(vwap).all())
+        self.assertTrue((filled == 0.0).all())
+
+
+class TestBookAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.books = books_to_arrays([{"instrument_name": "A",
+                                       "bids": [[99.0, 3.0], [98.0, 5.0]],
+                                       "asks": [[101.0, 1.0], [103.0, 4.0]]}])
+
+    def test_execution_cost_sides(self):
+        buy = execution_cost(self.books, SIDE_BUY, [2.0])
+        sell = execution_cost(self.books, SIDE_SELL, [2.0])
+
+        self.assertAlmostEqual(buy["vwap"][0, 0], 102.0)
+        self.assertAlmostEqual(buy["slippage"][0, 0], 102.0 / 101.0 - 1.0)
+        self.assertAlmostEqual(sell["vwap"][0, 0], 99.0)
+        self.assertAlmostEqual(sell["slippage"][0, 0], 0.0)
+
+        with self.assertRaises(ValueError):
+            execution_cost(self.books, "hold", [1.0])
+
+    def test_top_of_book(self):
+        self.assertAlmostEqual(microprice(self.books.bid_prices, self.books.bid_amounts,
+                                          self.books.ask_prices, self.books.ask_amounts)[0],
+                               (99.0 * 1.0 + 101.0 * 3.0) / 4.0)
+        self.assertAlmostEqual(imbalance(self.books.bid_amounts, self.books.ask_amounts)[0], 0.5)
+        self.assertAlmostEqual(imbalance(self.books.bid_amounts, self.books.ask_amounts, levels=2)[0], 3.0 / 13.0)
+
+    def test_size_within_band(self):
+        np.testing.assert_allclose(size_within_band(self.books.ask_prices, self.books.ask_amounts, [0.0, 0.01, 0.05]),
+                                   [[1.0, 1.0, 5.0]])
@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+import numpy as np
+
+import source.analytics.export as export
+
+DAY = export.MS_PER_DAY
+
+# 2024-01-01 00:00 UTC
+T0 = 1704067200000
+
+TRADES = [{"timestamp": T0 + 1000, "instrument_name": "BTC-PERPETUAL", "trade_id": "1", "trade_seq": 1,
+           "direction": "buy", "price": 42000.5, "amount": 10.0, "fee": 0.0001, "iv": None},
+          {"timestamp": T0 + 2000, "instrument_name": "ETH-PERPETUAL", "trade_id": "2", "trade_seq": 1,
+           "direction": "sell", "price": 2300.25, "amount": 1.0, "fee": -0.00001, "label": "hedge"},
+          {"timestamp": T0 + DAY + 3000, "instrument_name": "BTC-PERPETUAL", "trade_id": "3", "trade_seq": 2,
+           "direction": "sell", "price": 42100.0, "amount": 20.0, "fee": 0.0002},
+          {"timestamp": T0 + 2 * DAY + 4000, "instrument_name": "BTC-PERPETUAL", "trade_id": "4", "trade_seq": 3,
+           "direction": "buy", "price": 42200.0, "amount": 30.0, "fee": 0.0003}]
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def formats(self):
+        formats = [export.FORMAT_NPZ]
+        if export.pq is not None:
+            formats.append(export.FORMAT_PARQUET)
+        return formats
+
+    def test_round_trip(self):
+        columns = export.trades_to_columns(TRADES)
+
+        for fmt in self.formats():
+            with self.subTest(fmt=fmt):
+                root = os.path.join(self.root, fmt)
+                paths = export.write_partitions(columns, root, export.DATASET_TRADES, fmt=fmt)
+                self.assertEqual(len(paths), 4)
+
+                loaded = export.load(root, export.DATASET_TRADES)
+                self.assertEqual(set(loaded), {name for (name, _) in export.TRADE_COLUMNS})
+
+                # Partitions are read by date then instrument, in time order within each one
+                order = np.lexsort((columns["timestamp"], columns["instrument_name"],
+                                    columns["timestamp"] // DAY))
+                for (name, dtype) in export.TRADE_COLUMNS:
+                    if dtype == "str":
+                        self.assertEqual(loaded[name].dtype.kind, "U", name)
+                    else:
+                        self.assertEqual(loaded[name].dtype, np.dtype(dtype), name)
+                    np.testing.assert_array_equal(loaded[name], columns[name][order])
+
+    def test_missing_values(self):
+        columns = export.trades_to_columns(TRADES)
+
+        self.assertTrue(np.isnan(columns["iv"][0]))
+        self.assertEqual(columns["label"][0], "")
+        self.assertEqual(columns["label"][1], "hedge")
+        self.assertEqual(columns["order_id"].dtype.kind, "U")
+
+    def test_partition_pruning(self):
+        export.write_partitions(export.trades_to_columns(TRADES), self.root, export.DATASET_TRADES,
+                                fmt=export.FORMAT_NPZ)
+
+        visited = []
+        walk = os.walk
+
+        def recording_walk(top):
+            for (directory, dirs, files) in walk(top):
+                visited.append(os.path.relpath(directory, top))
+                yield directory, dirs, files
+
+        with mock.patch("os.walk", recording_walk):
+            loaded = export.load(self.root, export.DATASET_TRADES, start_date="2024-01-02",
+                                 instruments=["btc-perpetual"])
+
+        self.assertEqual(list(loaded["trade_id"]), ["3", "4"])
+
+        # Excluded partitions are not walked into
+        self.assertEqual(visited, [".",
+                                   "date=2024-01-02", os.path.join("date=2024-01-02", "instrument=BTC-PERPETUAL"),
+                                   "date=2024-01-03", os.path.join("date=2024-01-03", "instrument=BTC-PERPETUAL")])
+
+    def test_date_bounds_are_inclusive(self):
+        export.write_partitions(export.trades_to_columns(TRADES), self.root, export.DATASET_TRADES,
+                                fmt=export.FORMAT_NPZ)
+
+        loaded = export.load(self.root, export.DATASET_TRADES, start_date="2024-01-01", end_date="2024-01-02")
+        self.assertEqual(list(loaded["trade_id"]), ["1", "2", "3"])
+
+    def test_empty(self):
+        self.assertEqual(export.write_partitions(export.trades_to_columns([]), self.root, export.DATASET_TRADES), [])
+        self.assertEqual(export.load(self.root, export.DATASET_TRADES), {})
+
+
+
+SUMMARIES = [{"instrument_name": "BTC-PERPETUAL", "creation_timestamp": T0, "mark_price": 42000.0,
+              "bid_price": 41999.5, "ask_price": 42000.5, "mid_price": 42000.0, "last": 42001.0,
+              "underlying_price": 42000.0, "open_interest": 1.0e9, "volume": 12000.0, "volume_usd": 5.0e8,
+              "high": 42500.0, "low": 41500.0, "price_change": 1.25, "funding_8h": 0.0001},
+             {"instrument_name": "BTC-27DEC24-60000-C", "creation_timestamp": T0 + 1, "mark_price": 0.0125,
+              "bid_price": None, "ask_price": 0.013, "mid_price": None, "last": None, "mark_iv": 55.5,
+              "underlying_price": 43000.0, "open_interest": 120.0, "volume": 3.0}]
+
+
+class TestSummaries(unittest.TestCase):
+
+    def test_summaries_to_columns(self):
+        columns = export.summaries_to_columns({"jsonrpc": "2.0", "id": 1, "result": SUMMARIES})
+
+        self.assertEqual(list(columns), [name for (name, _) in export.SUMMARY_COLUMNS])
+        for (name, dtype) in export.SUMMARY_COLUMNS:
+            self.assertEqual(len(columns[name]), 2)
+            if dtype != "str":
+                self.assertEqual(columns[name].dtype, np.dtype(dtype), name)
+
+        self.assertEqual(list(columns["timestamp"]), [T0, T0 + 1])
+        self.assertEqual(list(columns["instrument_name"]), ["BTC-PERPETUAL", "BTC-27DEC24-60000-C"])
+        self.assertEqual(columns["ask_price"][1], 0.013)
+        self.assertEqual(columns["mark_iv"][1], 55.5)
+
+        # Missing and null fields are NaN
+        for name in ["bid_price", "mid_price", "last", "high", "price_change"]:
+            self.assertTrue(np.isnan(columns[name][1]), name)
+        self.assertTrue(np.isnan(columns["mark_iv"][0]))
+
+    def test_raw_and_empty_summaries(self):
+        self.assertEqual(list(export.summaries_to_columns(SUMMARIES)["volume"]), [12000.0, 3.0])
+
+        columns = export.summaries_to_columns([])
+        self.assertEqual(len(columns["timestamp"]), 0)
+        self.assertEqual(columns["mark_price"].dtype, np.dtype("float64"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+
+from source.analytics.options import (black_price, black_greeks, implied_volatility, OptionChain,
+                                      MS_PER_YEAR, DAYS_PER_YEAR)
+
+FORWARD = 50000.0
+
+
+class TestBlack76(unittest.TestCase):
+
+    def test_put_call_parity(self):
+        strike = np.array([30000.0, 50000.0, 70000.0])
+        call = black_price(FORWARD, strike, 0.25, 0.8, True, rate=0.02)
+        put = black_price(FORWARD, strike, 0.25, 0.8, False, rate=0.02)
+        np.testing.assert_allclose(call - put, np.exp(-0.02 * 0.25) * (FORWARD - strike), rtol=1e-10)
+
+    def test_greeks_match_finite_differences(self):
+        strike, tau, sigma = 55000.0, 0.1, 0.7
+        greeks = black_greeks(FORWARD, strike, tau, sigma, True)
+
+        h = 1.0
+        up = black_price(FORWARD + h, strike, tau, sigma, True)
+        down = black_price(FORWARD - h, strike, tau, sigma, True)
+        mid = black_price(FORWARD, strike, tau, sigma, True)
+        self.assertAlmostEqual(greeks["delta"], (up - down) / (2 * h), places=5)
+        self.assertAlmostEqual(greeks["gamma"], (up - 2 * mid + down) / h ** 2, delta=greeks["gamma"] * 1e-2)
+
+        # Per volatility point and per calendar day
+        vega = black_price(FORWARD, strike, tau, sigma + 0.01, True) - mid
+        self.assertAlmostEqual(greeks["vega"], vega, delta=abs(vega) * 1e-2)
+        theta = black_price(FORWARD, strike, tau - 1.0 / DAYS_PER_YEAR, sigma, True) - mid
+        self.assertAlmostEqual(greeks["theta"], theta, delta=abs(theta) * 1e-2)
+
+
+class TestImpliedVolatility(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = np.random.default_rng(7)
+        n = 2000
+        strike = rng.uniform(20000.0, 120000.0, n)
+        tau = rng.uniform(0.01, 1.5, n)
+        sigma = rng.uniform(0.1, 3.0, n)
+        is_call = rng.random(n) < 0.5
+
+        price = black_price(FORWARD, strike, tau, sigma, is_call)
+        iv = implied_volatility(price, FORWARD, strike, tau, is_call)
+
+        # The volatility is only identifiable with some time value left
+        intrinsic = np.where(is_call, np.maximum(FORWARD - strike, 0.0), np.maximum(strike - FORWARD, 0.0))
+        rows = (price - intrinsic) > 1e-6 * price
+
+        self.assertGreater(rows.sum(), n * 0.9)
+        np.testing.assert_allclose(iv[rows], sigma[rows], atol=1e-3)
+
+    def test_far_out_of_the_money(self):
+        strike = np.array([150000.0, 200000.0, 300000.0, 400000.0])
+        for tau in [0.01, 0.05, 0.1]:
+            price = black_price(FORWARD, strike, tau, 0.8, True)
+            np.testing.assert_allclose(implied_volatility(price, FORWARD, strike, tau, True), 0.8, rtol=1e-6)
+
+    def test_prices_out_of_bounds(self):
+        iv = implied_volatility(price=[0.0, 20000.0, 60000.0, np.nan],
+                                forward=FORWARD, strike=30000.0, tau=0.25, is_call=True)
+
+        # Below the intrinsic value, above the forward, or missing
+        self.assertTrue(np.isnan(iv[[0, 1, 2, 3]]).all())
+
+
+class TestOptionChain(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1600000000000.0
+        expiry = self.now + 0.25 * MS_PER_YEAR
+        self.instruments = [{"instrument_name": f"BTC-X-{k}-{t[0].upper()}", "kind": "option", "strike": k,
+                             "expiration_timestamp": expiry, "option_type": t}
+                            for k in [40000, 60000] for t in ["call", "put"]]
+
+    def test_only_changed_rows_are_computed(self):
+        chain = OptionChain(self.instruments)
+
+        books = []
+        for i in self.instruments:
+            price = black_price(FORWARD, i["strike"], 0.25, 0.6, i["option_type"] == "call")
+            books.append({"instrument_name": i["instrument_name"], "mark_price": float(price) / FORWARD,
+                          "underlying_price": FORWARD, "best_bid_price": None, "best_ask_price": None})
+
+        self.assertEqual(chain.update_quotes(books), 4)
+        self.assertEqual(chain.compute(now_ms=self.now), 4)
+        np.testing.assert_allclose(chain.iv, 0.6, rtol=1e-6)
+
+        # Unchanged quotes are not flagged again
+        self.assertEqual(chain.update_quotes(books), 0)
+        self.assertEqual(chain.compute(now_ms=self.now), 0)
+
+        books[1]["mark_price"] *= 1.1
+        self.assertEqual(chain.update_quotes(books), 1)
+        self.assertEqual(chain.compute(now_ms=self.now), 1)
+        self.assertGreater(chain.row(books[1]["instrument_name"])["iv"], 0.6)
+
+    def test_unknown_instrument(self):
+        with self.assertRaises(KeyError):
+            OptionChain(self.instruments).row("BTC-UNKNOWN")
@@ -1,28 +1,42 @@
+import copy
 import json
+import time
 import logging
-import websockets
 import datetime as dt
 
-# Import events
-from source.events import *
+from typing import Dict, List
+
+from source.utilities import generate_id, lazy_import
 
 # Import networking constants
 from source.support.networking import *
 
-# Import features
-import source.features.data as data
-import source.features.session as session
-import source.features.account as account
-import source.features.trading as trading
+# Heavy dependencies, events and features are loaded on first use
+asyncio = lazy_import("asyncio")
+websockets = lazy_import("websockets")
+events = lazy_import("source.events")
+
+data = lazy_import("source.features.data")
+session = lazy_import("source.features.session")
+account = lazy_import("source.features.account")
+trading = lazy_import("source.features.trading")
+export = lazy_import("source.analytics.export")
 
-from source.utilities import generate_id
 from source.features.common import message
+from source.clients.connection import DeribitConnection
+import source.support.tracing as tracing
+
+from source.support.cache import ResponseCache, CACHE_FRESH, CACHE_STALE
+from source.support.transport import TransportConfig
+from source.support.metrics import (REQUESTS, REQUEST_ERRORS, REQUEST_LATENCY, CONNECTIONS_OPENED, COALESCED,
+                                    CACHE_LOOKUPS)
 
 # Import some Deribit specific classes
 from source.support.settings import (DEFAULT_KIND,
                                      DEFAULT_CURRENCY,
                                      DEFAULT_DEPTH,
-                                     DERIBIT_WSS_URL)
+                                     DEFAULT_TRADES_PAGE_SIZE,
+                                     TOKEN_REFRESH_MARGIN)
 
 
 # ######################################################################
@@ -41,10 +55,14 @@ class DeribitAsyncClient(object):
 
     def __init__(self,
                  key=None,
-                 secret=None):
+                 secret=None,
+                 coalesce: bool = True,
+                 cache: bool = False,
+                 cache_ttls: Dict[str, float] = None,
+                 transport: TransportConfig = None):
 
         self.__id = generate_id()
-        self.__url = DERIBIT_WSS_URL
+        self.transport = transport or TransportConfig()
         self.__key = self.parse_key(key=key)
         self.__secret = self.parse_secret(secret=secret)
 
@@ -54,11 +72,28 @@ class DeribitAsyncClient(object):
         self.__refresh_token = None
         self.__token_expiry = None
 
+        # Single-flight of identical public requests
+        self.coalesce = coalesce
+        self.coalesced = 0
+        self.__in_flight = {}
+
+        # Opt-in response cache of slow-changing public endpoints (see support.cache)
+        self.cache = ResponseCache(ttls=cache_ttls) if cache else None
+        self.__revalidations = set()
+
+        # Exchange clock (e.g. a managers.clock.ClockManager), local clock if None
+        self.clock = None
+
+        # Persistent, authenticated connection of the pipelined requests
+        self.__connection = None
+        self.__connection_lock = None
+
         def handle_signal_login(sender, data=None, websocket=None, **kwargs):
             self.on_deribit_login(sender, data, websocket, **kwargs)
 
+        # Only listen to this instance's logins (see 'sender' in __async_request)
         self.handle_signal_login = handle_signal_login
-        sig_login.connect(handle_signal_login)
+        events.sig_login.connect(handle_signal_login, sender=self)
 
         logging.debug(f"[{self.id}] Deribit Async client instance created.")
 
@@ -93,6 +128,9 @@ class DeribitAsyncClient(object):
     @property
     def token_lifespan(self):
         if self.__token_expiry:
+            # The expiry is in exchange time
+            if self.clock is not None:
+                return self.__token_expiry - dt.datetime.utcfromtimestamp(self.clock.now_exchange())
             return self.__token_expiry - dt.datetime.utcnow()
         return None
 
@@ -187,11 +225,6 @@ class DeribitAsyncClient(object):
 
     async def __async_request(self, messages, auth_required=False, signal=None):
 
-        async def _send_thru_ws(msg, ws):
-            await ws.send(json.dumps(msg))
-            resp = await ws.recv()
-            return json.loads(resp)
-
         if not signal:
             logging.debug(f"[{self.id}] No signal found. Connecting to default handler.")
             signal = self.on_message
@@ -199,34 +232,289 @@ class DeribitAsyncClient(object):
         if not isinstance(messages, list):
             messages = [messages]
 
-        async with websockets.connect(self.__url, max_size=None) as websocket:
+        if auth_required:
+            response, trace = await self.__exchange(messages, auth_required)
+        else:
+            response, trace = await self.__public_request(messages)
+
+        output = signal(data=response)
+
+        if trace:
+            trace.mark(tracing.PHASE_SIGNAL)
+            tracing.finish(trace)
+
+        return output
+
+    async def __public_request(self, messages):
+        """
+        Answers public requests from the response cache when possible. Stale
+        entries are served while being refreshed in the background.
+        """
+
+        methods = {_request_method(msg) for msg in messages}
+        method = methods.pop() if len(methods) == 1 else None
+
+        if self.cache is None or method is None or not self.cache.is_cacheable(method):
+            return await self.__fetch(messages)
+
+        key = tuple(_request_key(msg) for msg in messages)
+        value, state = self.cache.lookup(key)
+        CACHE_LOOKUPS.labels(method, state).inc()
+
+        if state == CACHE_FRESH:
+            return value, None
+
+        if state == CACHE_STALE:
+            if self.cache.begin_refresh(key):
+                task = asyncio.ensure_future(self.__revalidate(messages, key, method))
+                self.__revalidations.add(task)
+                task.add_done_callback(self.__revalidated)
+            return value, None
+
+        response, trace = await self.__fetch(messages, key)
+        if not any(RESP_ERROR in r for r in response):
+            self.cache.store(key, method, response)
+        return response, trace
+
+    async def __revalidate(self, messages, key, method):
+
+        try:
+            response, _ = await self.__fetch(messages, key)
+            if not any(RESP_ERROR in r for r in response):
+                self.cache.store(key, method, response)
+        finally:
+            self.cache.end_refresh(key)
+
+    def __revalidated(self, task):
+        self.__revalidations.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"[{self.id}] Cache refresh failed ({task.exception()}).")
+
+    async def __fetch(self, messages, key=None):
+        if self.coalesce:
+            return await self.__single_flight(messages, key)
+        return await self.__exchange(messages, auth_required=False)
+
+    async def __single_flight(self, messages, key=None):
+        """
+        Identical public requests (same methods and parameters) issued
+        while one is in flight share its responses instead of being sent
+        again. Shared responses are copies carrying the ids of the first
+        request. If the first request is cancelled (e.g. its caller timed
+        out), a waiting caller sends the request instead.
+        """
+
+        loop = asyncio.get_event_loop()
+        key = (id(loop), key or tuple(_request_key(msg) for msg in messages))
+
+        leader = self.__in_flight.get(key)
+        while leader is not None:
+            try:
+                response = await asyncio.shield(leader)
+                for msg in messages:
+                    COALESCED.labels(_request_method(msg)).inc()
+                self.coalesced += 1
+                return copy.deepcopy(response), None
+
+            except asyncio.CancelledError:
+                # Only take over when the leader was cancelled, not this caller
+                if not leader.cancelled() or _is_cancelling():
+                    raise
+
+            leader = self.__in_flight.get(key)
+
+        future = loop.create_future()
+        self.__in_flight[key] = future
+
+        try:
+            response, trace = await self.__exchange(messages, auth_required=False)
+            future.set_result(response)
+            return response, trace
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers get the exception; nobody else awaits it otherwise
+            future.exception()
+            raise
+
+        finally:
+            if self.__in_flight.get(key) is future:
+                del self.__in_flight[key]
+
+    async def __exchange(self, messages, auth_required=False):
+        """
+        Sends the messages on a new connection, one at a time.
+        :return: (list, Trace) The responses, and the trace of the last message (if any).
+        """
+
+        async def _send_thru_ws(msg, ws):
+            await ws.send(json.dumps(msg))
+            resp = await ws.recv()
+            return json.loads(resp)
+
+        def _record(method, started, response=None):
+            REQUESTS.labels(method).inc()
+            REQUEST_LATENCY.labels(method).observe(time.perf_counter() - started)
+            if response is None or RESP_ERROR in response:
+                REQUEST_ERRORS.labels(method).inc()
+
+        # The first message carries the build phases of this context
+        trace = tracing.start_request(_request_method(messages[0])) if messages else None
+
+        CONNECTIONS_OPENED.labels(type(self).__name__).inc()
+
+        async with websockets.connect(self.transport.url, **self.transport.connect_kwargs()) as websocket:
+            self.transport.configure(websocket)
+
+            if trace:
+                trace.mark(tracing.PHASE_CONNECT)
 
             if auth_required or not self.is_logged_in:
 
                 # Authenticate the connection
                 log_msg = self.login_message()
+                started = time.perf_counter()
                 await websocket.send(json.dumps(log_msg))
                 login_response = await websocket.recv()
+                _record(METHOD_LOGIN, started, json.loads(login_response))
 
                 # Store token if first login
                 if not self.is_logged_in:
                     logging.debug(f"[{self.id}] Logging in client.")
-                    sig_login.send(data=json.loads(login_response))
+                    events.sig_login.send(self, data=json.loads(login_response))
+
+                if trace:
+                    trace.mark(tracing.PHASE_LOGIN)
 
             # Authenticate the messages to be sent
             if auth_required:
                 messages = [self.auth_with_access_token(messages=msg) for msg in messages]
 
-            _json_msg = [json.dumps(m) for m in messages]
             response = []
 
             # Gather async tasks and results
-            for m in _json_msg:
-                await websocket.send(m)
-                _ = await websocket.recv()
+            for (n, msg) in enumerate(messages):
+                method = _request_method(msg)
+                if n > 0:
+                    trace = tracing.start(method)
+
+                started = time.perf_counter()
+                try:
+                    m = json.dumps(msg)
+                    if trace:
+                        trace.mark(tracing.PHASE_ENCODE)
+                    await websocket.send(m)
+                    if trace:
+                        trace.mark(tracing.PHASE_SEND)
+                    _ = await websocket.recv()
+                    if trace:
+                        trace.mark(tracing.PHASE_WAIT)
+                except Exception:
+                    _record(method, started)
+                    raise
                 response.append(json.loads(_))
-
-            return signal(data=response)
+                _record(method, started, response[-1])
+
+                if trace:
+                    trace.mark(tracing.PHASE_DECODE)
+                    # The signal callback is traced with the last message
+                    if n < len(messages) - 1:
+                        tracing.finish(trace)
+
+            return response, trace
+
+    async def __async_pipelined_request(self, messages, signals, auth_required=False):
+        """
+        Writes every message on the persistent connection before reading any
+        response (a single round trip for the batch). Each response is
+        delivered to its own signal as soon as it arrives.
+        :return: (list) Futures resolved with the responses, in the order of the messages.
+        """
+
+        async def _deliver(future, signal):
+            response = await future
+            signal(data=[response])
+            return response
+
+        connection = await self.connection()
+        futures = await connection.pipeline(messages, auth_required=auth_required)
+
+        return [asyncio.ensure_future(_deliver(f, s)) for (f, s) in zip(futures, signals)]
+
+    async def connection(self):
+        """
+        Opens (or reopens) the persistent connection of the pipelined
+        requests, and logs it in again before the token expires.
+        :return: (DeribitConnection) The open, authenticated connection.
+        """
+
+        if self.__connection_lock is None:
+            self.__connection_lock = asyncio.Lock()
+
+        async with self.__connection_lock:
+            if self.__connection is None or not self.__connection.is_open:
+                self.__connection = DeribitConnection(client=self, transport=self.transport)
+                await self.__connection.open(authenticate=True)
+
+            else:
+                lifespan = self.token_lifespan
+                if lifespan is not None and lifespan.total_seconds() <= TOKEN_REFRESH_MARGIN:
+                    await self.__connection.authenticate()
+
+        return self.__connection
+
+    async def close_connection(self):
+        if self.__connection is not None:
+            await self.__connection.close()
+            self.__connection = None
+
+    async def __async_paginated_request(self, build, advance, prefetch=2):
+        """
+        Async generator walking through a paginated private endpoint on a
+        single connection. 'build(cursor)' formulates the request for a page
+        and 'advance(result, cursor)' returns (chunk, next cursor, has more).
+        Up to 'prefetch' pages are fetched ahead of the consumer.
+        """
+
+        queue = asyncio.Queue(maxsize=max(1, prefetch))
+
+        async def _produce(connection):
+            cursor = None
+            try:
+                while True:
+                    response = await connection.request(build(cursor), auth_required=True)
+                    if RESP_ERROR in response:
+                        raise Exception(f"Paginated request failed ({response[RESP_ERROR]}).")
+
+                    chunk, cursor, more = advance(response[RESP_CONTENT], cursor)
+                    if chunk:
+                        await queue.put(chunk)
+                    if not more:
+                        break
+
+                await queue.put(None)
+
+            except Exception as e:
+                await queue.put(e)
+
+        async with DeribitConnection(client=self, transport=self.transport) as connection:
+            await connection.authenticate()
+            producer = asyncio.ensure_future(_produce(connection))
+
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                producer.cancel()
 
     # ##################################################################
     # SESSION
@@ -254,7 +542,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=False,
-                                          signal=sig_instrument_received.send)
+                                          signal=events.sig_instrument_received.send)
 
     async def currencies(self):
 
@@ -262,7 +550,39 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=False,
-                                          signal=sig_currency_received.send)
+                                          signal=events.sig_currency_received.send)
+
+    async def index(self, currency=DEFAULT_CURRENCY):
+
+        msg = data.request_index(currency=currency)
+
+        return await self.__async_request(messages=msg,
+                                          auth_required=False,
+                                          signal=events.sig_index_level_received.send)
+
+    async def book_summary(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND):
+
+        msg = data.request_book_summary(currency=currency, kind=kind)
+
+        return await self.__async_request(messages=msg,
+                                          auth_required=False,
+                                          signal=events.sig_book_summary_received.send)
+
+    async def market_snapshot(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND):
+        """
+        Marks, best bid/ask, open interest and volumes of every instrument
+        of the currency, from a single 'public/get_book_summary_by_currency'.
+        :return: (dict) Columns (numpy arrays), see analytics.export.SUMMARY_COLUMNS.
+        """
+
+        msg = data.request_book_summary(currency=currency, kind=kind)
+        response = await self.__async_request(messages=msg, auth_required=False)
+
+        for r in response:
+            if RESP_ERROR in r:
+                raise Exception(f"Book summary request failed ({r[RESP_ERROR]}).")
+
+        return export.summaries_to_columns(response)
 
     async def orderbooks(self, instruments, depth=DEFAULT_DEPTH):
 
@@ -273,7 +593,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=False,
-                                          signal=sig_orderbook_snapshot_received.send)
+                                          signal=events.sig_orderbook_snapshot_received.send)
 
     # ##################################################################
     # ACCOUNT
@@ -285,7 +605,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_position_received.send)
+                                          signal=events.sig_position_received.send)
 
     async def all_positions(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND):
 
@@ -343,7 +663,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_buy_received.send)
+                                          signal=events.sig_trade_buy_received.send)
 
     async def sell(self,
                    instrument: str,
@@ -374,7 +694,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_sell_received.send)
+                                          signal=events.sig_trade_sell_received.send)
 
     async def close(self,
                     instrument: str,
@@ -387,7 +707,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_close_received.send)
+                                          signal=events.sig_trade_close_received.send)
 
     async def cancel_all(self):
 
@@ -395,7 +715,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_cancel_all_received)
+                                          signal=events.sig_trade_cancel_all_received)
 
     async def cancel_all_by_currency(self, currency: str, kind: str = None, order_type: str = None):
 
@@ -405,7 +725,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_cancel_received.send)
+                                          signal=events.sig_trade_cancel_received.send)
 
     async def cancel_all_by_instrument(self, instrument: str, order_type: str = None):
 
@@ -414,7 +734,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_cancel_received.send)
+                                          signal=events.sig_trade_cancel_received.send)
 
     async def estimate_margins(self, instrument: str, amount: float, price: float):
 
@@ -424,7 +744,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_margin_estimate_received.send)
+                                          signal=events.sig_trade_margin_estimate_received.send)
 
     async def open_orders_by_currency(self, currency: str, kind: str = None, order_type: float = None):
 
@@ -434,7 +754,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_open_orders_received.send)
+                                          signal=events.sig_trade_open_orders_received.send)
 
     async def open_orders_by_instrument(self, instrument: str, order_type: float = None):
 
@@ -443,7 +763,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_open_orders_received.send)
+                                          signal=events.sig_trade_open_orders_received.send)
 
     async def user_trades_by_currency(self, currency: str, kind: str = None,
                                       count: int = None,
@@ -456,7 +776,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_history_received.send)
+                                          signal=events.sig_trade_history_received.send)
 
     async def user_trades_by_instrument(self, instrument: str, count: int = None, include_old: bool = None):
 
@@ -466,7 +786,7 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_history_received.send)
+                                          signal=events.sig_trade_history_received.send)
 
     async def order_status(self, order_id: str):
 
@@ -474,7 +794,211 @@ class DeribitAsyncClient(object):
 
         return await self.__async_request(messages=msg,
                                           auth_required=True,
-                                          signal=sig_trade_order_status_received.send)
+                                          signal=events.sig_trade_order_status_received.send)
+
+    # ##################################################################
+    # TRADE HISTORY STREAMING
+    # ##################################################################
+
+    async def stream_user_trades_by_currency(self, currency: str, kind: str = None,
+                                             start_timestamp: int = None,
+                                             end_timestamp: int = None,
+                                             count: int = DEFAULT_TRADES_PAGE_SIZE,
+                                             include_old: bool = True,
+                                             prefetch: int = 2):
+        """
+        Async generator over the full trade history of a currency, oldest
+        first, yielding one chunk (list of trades) per page. Pages are
+        walked with a timestamp cursor.
+        :param start_timestamp: (int) Earliest trade timestamp (ms). Defaults to the beginning.
+        :param end_timestamp: (int) Latest trade timestamp (ms). Defaults to now.
+        :param prefetch: (int) Maximum number of pages fetched ahead of the consumer.
+        """
+
+        end_ = end_timestamp or int(time.time() * 1000)
+
+        def build(cursor):
+            start_ = cursor[0] if cursor else (start_timestamp or 1)
+            return trading.user_trades_by_currency_and_time(currency=currency,
+                                                            kind=kind,
+                                                            start_timestamp=start_,
+                                                            end_timestamp=end_,
+                                                            count=count,
+                                                            include_old=include_old,
+                                                            sorting="asc")
+
+        def advance(result, cursor):
+            trades = result.get("trades", [])
+            last_ts, seen = cursor if cursor else (None, set())
+
+            # Trades sharing the boundary timestamp are returned twice
+            chunk = [t for t in trades if not (t["timestamp"] == last_ts and t["trade_id"] in seen)]
+            more = bool(result.get("has_more")) and bool(trades)
+
+            if not trades:
+                return chunk, cursor, False
+
+            next_ts = trades[-1]["timestamp"]
+            if not chunk and more:
+                # A full page within one millisecond, skip ahead
+                logging.warning(f"[{self.id}] A page of {count} trades at {next_ts} ms, skipping to the next ms "
+                                f"(more trades of this ms would be missed).")
+                return chunk, (next_ts + 1, set()), more
+
+            boundary = {t["trade_id"] for t in trades if t["timestamp"] == next_ts}
+            if next_ts == last_ts:
+                boundary |= seen
+            return chunk, (next_ts, boundary), more
+
+        async for chunk in self.__async_paginated_request(build=build, advance=advance, prefetch=prefetch):
+            yield chunk
+
+    async def stream_user_trades_by_instrument(self, instrument: str,
+                                               start_seq: int = None,
+                                               end_seq: int = None,
+                                               count: int = DEFAULT_TRADES_PAGE_SIZE,
+                                               include_old: bool = True,
+                                               prefetch: int = 2):
+        """
+        Async generator over the full trade history of an instrument, oldest
+        first, yielding one chunk (list of trades) per page. Pages are
+        walked with a trade sequence cursor.
+        :param start_seq: (int) First trade sequence number. Defaults to the beginning.
+        :param end_seq: (int) Last trade sequence number. Defaults to the latest trade.
+        :param prefetch: (int) Maximum number of pages fetched ahead of the consumer.
+        """
+
+        def build(cursor):
+            return trading.user_trades_by_instrument(instrument=instrument,
+                                                     count=count,
+                                                     include_old=include_old,
+                                                     start_seq=cursor or start_seq or 1,
+                                                     end_seq=end_seq,
+                                                     sorting="asc")
+
+        def advance(result, cursor):
+            trades = result.get("trades", [])
+            if not trades:
+                return trades, cursor, False
+            return trades, trades[-1]["trade_seq"] + 1, bool(result.get("has_more"))
+
+        async for chunk in self.__async_paginated_request(build=build, advance=advance, prefetch=prefetch):
+            yield chunk
+
+    # ##################################################################
+    # BATCH TRADING
+    # ##################################################################
+
+    async def submit_orders(self, orders: List[Dict]):
+        """
+        Submits a batch of orders, pipelined on the persistent connection.
+        Every order is validated before anything is sent.
+        :param orders: (list) Orders as dicts holding a 'direction' ('buy' or 'sell')
+        and the arguments of the buy / sell methods.
+        :return: (list) Responses, in the order of the orders.
+        """
+        return await asyncio.gather(*await self.send_orders(orders))
+
+    async def submit_orders_as_completed(self, orders: List[Dict]):
+        """
+        Async generator of the responses to a batch of orders (see
+        'submit_orders'), as soon as each of them arrives.
+        :return: (tuple) Index of the order and its response.
+        """
+        async for result in _as_completed(await self.send_orders(orders)):
+            yield result
+
+    async def send_orders(self, orders: List[Dict]):
+        """
+        Sends a batch of orders without waiting for the responses.
+        :return: (list) Futures resolved with the responses, in the order of the orders.
+        """
+
+        messages, signals = [], []
+        for order in orders:
+            order_ = dict(order)
+            direction = str(order_.pop("direction", "")).lower()
+
+            if direction == "buy":
+                messages.append(trading.buy(**order_))
+                signals.append(events.sig_trade_buy_received.send)
+            elif direction == "sell":
+                messages.append(trading.sell(**order_))
+                signals.append(events.sig_trade_sell_received.send)
+            else:
+                raise ValueError(f"Invalid order direction received ({direction}).")
+
+        if not messages:
+            return []
+
+        return await self.__async_pipelined_request(messages=messages,
+                                                    signals=signals,
+                                                    auth_required=True)
+
+    async def cancel_orders(self, order_ids: List[str]):
+        """
+        Cancels a batch of orders, pipelined on the persistent connection.
+        :param order_ids: (list) Deribit order ids.
+        :return: (list) Responses, in the order of the order ids.
+        """
+        return await asyncio.gather(*await self.send_cancellations(order_ids))
+
+    async def cancel_orders_as_completed(self, order_ids: List[str]):
+        """
+        Async generator of the responses to a batch of cancellations, as
+        soon as each of them arrives.
+        :return: (tuple) Index of the order id and its response.
+        """
+        async for result in _as_completed(await self.send_cancellations(order_ids)):
+            yield result
+
+    async def send_cancellations(self, order_ids: List[str]):
+        """
+        Sends a batch of cancellations without waiting for the responses.
+        :return: (list) Futures resolved with the responses, in the order of the order ids.
+        """
+
+        messages = [trading.cancel(order_id=order_id) for order_id in order_ids]
+
+        if not messages:
+            return []
+
+        return await self.__async_pipelined_request(messages=messages,
+                                                    signals=[events.sig_trade_cancel_received.send] * len(messages),
+                                                    auth_required=True)
+
+
+async def _as_completed(futures):
+    """
+    :return: (tuple) Index and result of each future, in the order of completion.
+    """
+
+    async def _indexed(n, future):
+        return n, await future
+
+    for done in asyncio.as_completed([_indexed(n, f) for (n, f) in enumerate(futures)]):
+        yield await done
+
+
+def _is_cancelling():
+    # Python 3.11+: cancellation requested for the current task
+    task = asyncio.current_task()
+    cancelling = getattr(task, "cancelling", None)
+    return bool(cancelling()) if cancelling is not None else False
+
+
+def _request_key(msg):
+    """
+    :return: (tuple) Method and canonical parameters of a message, ignoring its id.
+    """
+    return msg.get(REQ_METHOD), json.dumps(msg.get(REQ_PARAMS, {}), sort_keys=True)
+
+
+def _request_method(msg):
+    # Authenticated messages may be wrapped in a list
+    if isinstance(msg, list):
+        msg = msg[0] if msg else {}
+    return msg.get(REQ_METHOD, "unknown")
 
 
 if __name__ == '__main__':
@@ -490,7 +1014,7 @@ if __name__ == '__main__':
         client = DeribitAsyncClient(key=KEY, secret=SECRET)
 
         # Connect signal
-        sig_orderbook_snapshot_received.connect(on_orderbooks)
+        events.sig_orderbook_snapshot_received.connect(on_orderbooks)
 
         # Async run
         loop = grab_event_loop()
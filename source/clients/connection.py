@@ -0,0 +1,314 @@
+import json
+import time
+import logging
+
+from typing import Callable, List
+
+import source.support.tracing as tracing
+
+from source.utilities import lazy_import
+from source.support.networking import *
+from source.support.settings import DERIBIT_WSS_URL
+from source.support.transport import TransportConfig
+from source.support.decoding import LazyMessage, is_notification
+from source.support.metrics import (REQUESTS, REQUEST_ERRORS, REQUEST_LATENCY, MESSAGES_RECEIVED,
+                                    LAST_MESSAGE_TIME, CONNECTIONS_OPENED, QUEUE_DEPTH)
+
+asyncio = lazy_import("asyncio")
+websockets = lazy_import("websockets")
+
+
+# ######################################################################
+# DERIBIT CONNECTION
+# ######################################################################
+
+class DeribitConnection(object):
+    """
+    Persistent websocket connection to Deribit. Responses are matched to
+    their requests by id, so any number of requests can be in flight at
+    once (pipelining). Frames without a pending id (e.g. subscription
+    notifications) are forwarded to the notification handler.
+
+    With 'lazy' decoding, notifications are not decoded by the connection:
+    the handler receives a LazyMessage, so unused frames are never parsed.
+    """
+
+    def __init__(self,
+                 client=None,
+                 url: str = DERIBIT_WSS_URL,
+                 notification_handler: Callable = None,
+                 lazy: bool = False,
+                 transport: TransportConfig = None):
+
+        # Client holding the credentials (required for private methods)
+        self.__client = client
+
+        # The transport settings carry their own url
+        self.transport = transport or TransportConfig(url=url)
+
+        self.__ws = None
+        self.__reader = None
+        self.__pending = {}
+        self.__is_authenticated = False
+
+        self.notification_handler = notification_handler or self.on_notification
+        self.lazy = lazy
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def is_open(self):
+        return self.__ws is not None and self.__reader is not None and not self.__reader.done()
+
+    @property
+    def is_authenticated(self):
+        return self.__is_authenticated
+
+    @property
+    def pending(self):
+        return len(self.__pending)
+
+    # ##################################################################
+    # CONNECTION MANAGEMENT
+    # ##################################################################
+
+    async def open(self, authenticate: bool = False):
+
+        if self.is_open:
+            if authenticate and not self.is_authenticated:
+                await self.authenticate()
+            return self
+
+        self.__ws = self.transport.configure(await websockets.connect(self.transport.url,
+                                                                      **self.transport.connect_kwargs()))
+        CONNECTIONS_OPENED.labels(type(self).__name__).inc()
+        self.__reader = asyncio.ensure_future(self.__read_forever())
+
+        if authenticate:
+            await self.authenticate()
+
+        return self
+
+    async def close(self):
+
+        if self.__ws is not None:
+            await self.__ws.close()
+
+        if self.__reader is not None:
+            try:
+                await self.__reader
+            except asyncio.CancelledError:
+                pass
+
+        self.__ws = None
+        self.__reader = None
+        self.__is_authenticated = False
+
+    async def authenticate(self):
+
+        if not self.__client:
+            raise Exception("A client with credentials is required to authenticate the connection.")
+
+        response = await self.request(self.__client.login_message())
+        self.__client.parse_login_response(response=response)
+        self.__is_authenticated = True
+        return response
+
+    async def wait_closed(self):
+        if self.__reader is not None:
+            await asyncio.shield(self.__reader)
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # ##################################################################
+    # REQUESTS
+    # ##################################################################
+
+    async def send(self, msg, auth_required: bool = False):
+        """
+        Sends a message without waiting for its response.
+        :return: (Future) Resolved with the response carrying the message id.
+        """
+
+        if not self.is_open:
+            raise Exception("Connection is not open.")
+
+        if auth_required:
+            self.__client.auth_with_access_token(messages=msg)
+
+        method = msg.get(REQ_METHOD, "unknown")
+        trace = tracing.start_request(method)
+        started = time.perf_counter()
+
+        try:
+            frame = json.dumps(msg)
+        except Exception:
+            REQUESTS.labels(method).inc()
+            REQUEST_ERRORS.labels(method).inc()
+            raise
+
+        if trace:
+            trace.mark(tracing.PHASE_ENCODE)
+
+        return await self.__send_frame(frame, msg["id"], method, trace, started)
+
+    async def send_raw(self, frame: str, id_, method: str = "unknown"):
+        """
+        Sends a frame encoded by the caller (e.g. by an OrderTicket) without
+        waiting for its response.
+        :param id_: Id of the message of the frame, to match its response.
+        :return: (Future) Resolved with the response carrying the message id.
+        """
+
+        if not self.is_open:
+            raise Exception("Connection is not open.")
+
+        return await self.__send_frame(frame, id_, method, tracing.start_request(method), time.perf_counter())
+
+    async def submit(self, ticket, amount: float, price: float = None, label: str = None):
+        """
+        Sends an order of a ticket (see OrderTicket), authenticating the
+        connection first if needed.
+        :return: (Future) Resolved with the response to the order.
+        """
+
+        if not self.is_authenticated:
+            await self.open(authenticate=True)
+
+        id_, frame = ticket.frame(amount=amount, price=price, label=label)
+        return await self.send_raw(frame, id_, method=ticket.method)
+
+    async def __send_frame(self, frame: str, id_, method: str, trace, started: float):
+
+        future = asyncio.get_event_loop().create_future()
+        self.__pending[id_] = (future, method, started, trace)
+
+        REQUESTS.labels(method).inc()
+        QUEUE_DEPTH.labels("connection_pending").inc()
+
+        try:
+            await self.__ws.send(frame)
+            if trace:
+                trace.mark(tracing.PHASE_SEND)
+        except Exception:
+            del self.__pending[id_]
+            REQUEST_ERRORS.labels(method).inc()
+            QUEUE_DEPTH.labels("connection_pending").dec()
+            raise
+
+        return future
+
+    async def request(self, msg, auth_required: bool = False):
+        future = await self.send(msg, auth_required=auth_required)
+        return await future
+
+    async def pipeline(self, messages: List, auth_required: bool = False):
+        """
+        Writes every message before reading any response.
+        :return: (list) Futures, in the order of the messages.
+        """
+
+        if not isinstance(messages, list):
+            messages = [messages]
+
+        return [await self.send(m, auth_required=auth_required) for m in messages]
+
+    # ##################################################################
+    # RECEPTION
+    # ##################################################################
+
+    async def __read_forever(self):
+
+        try:
+            while True:
+                frame = await self.__ws.recv()
+                received = time.perf_counter_ns() if tracing.TRACER is not None else None
+
+                if self.lazy and is_notification(frame):
+                    msg = LazyMessage(frame)
+                    self.__record_notification(msg.channel)
+                    trace = tracing.start(msg.channel, tracing.KIND_NOTIFICATION, received) if received else None
+                    self.notification_handler(msg)
+                    if trace:
+                        trace.mark(tracing.PHASE_DISPATCH)
+                        tracing.finish(trace)
+                else:
+                    self.dispatch(json.loads(frame), received_ns=received)
+
+        except websockets.ConnectionClosed as e:
+            logging.debug(f"Deribit connection closed ({e}).")
+            self.__fail_pending(e)
+
+        except Exception as e:
+            logging.exception("Deribit connection reader failed.")
+            self.__fail_pending(e)
+            raise
+
+    def dispatch(self, msg, received_ns: int = None):
+        """
+        Resolves the request matching the message id, or forwards the
+        message to the notification handler.
+        :param received_ns: (int) perf_counter_ns at reception, for tracing.
+        """
+
+        id_ = msg.get("id") if isinstance(msg, dict) else None
+        pending = self.__pending.pop(id_, None) if id_ is not None else None
+
+        if pending is not None:
+            future, method, started, trace = pending
+            REQUEST_LATENCY.labels(method).observe(time.perf_counter() - started)
+            QUEUE_DEPTH.labels("connection_pending").dec()
+            if RESP_ERROR in msg:
+                REQUEST_ERRORS.labels(method).inc()
+            if trace:
+                trace.marks.append((tracing.PHASE_WAIT, received_ns or time.perf_counter_ns()))
+                trace.mark(tracing.PHASE_DECODE)
+            if not future.done():
+                future.set_result(msg)
+            if trace:
+                trace.mark(tracing.PHASE_DISPATCH)
+                tracing.finish(trace)
+            return
+
+        channel = None
+        if isinstance(msg, dict) and msg.get(REQ_METHOD) == NOTIF_METHOD:
+            channel = msg.get(REQ_PARAMS, {}).get(NOTIF_CHANNEL)
+            self.__record_notification(channel)
+
+        trace = tracing.start(channel, tracing.KIND_NOTIFICATION, received_ns) if received_ns and channel else None
+        if trace:
+            trace.mark(tracing.PHASE_DECODE)
+
+        self.notification_handler(msg)
+
+        if trace:
+            trace.mark(tracing.PHASE_DISPATCH)
+            tracing.finish(trace)
+
+    @staticmethod
+    def __record_notification(channel):
+        MESSAGES_RECEIVED.labels(channel).inc()
+        LAST_MESSAGE_TIME.labels(channel).set_to_current_time()
+
+    def __fail_pending(self, error):
+        pending, self.__pending = self.__pending, {}
+        for (future, method, _, _) in pending.values():
+            REQUEST_ERRORS.labels(method).inc()
+            QUEUE_DEPTH.labels("connection_pending").dec()
+            if not future.done():
+                future.set_exception(error)
+        self.__is_authenticated = False
+
+    # ##################################################################
+    # DELEGATES
+    # ##################################################################
+
+    @staticmethod
+    def on_notification(msg):
+        pass
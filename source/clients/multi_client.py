@@ -0,0 +1,162 @@
+import logging
+
+from typing import Callable, Dict, List
+
+from source.utilities import lazy_import
+from source.support.networking import *
+from source.support.settings import DEFAULT_CURRENCY, DEFAULT_KIND, DERIBIT_WSS_URL
+from source.support.transport import TransportConfig
+from source.clients.async_client import DeribitAsyncClient
+from source.clients.connection import DeribitConnection
+
+asyncio = lazy_import("asyncio")
+account = lazy_import("source.features.account")
+
+
+# ######################################################################
+# DERIBIT MULTI-ACCOUNT CLIENT
+# ######################################################################
+
+class DeribitMultiClient(object):
+    """
+    Manages several Deribit accounts (e.g. sub-accounts) from a single
+    event loop. Each account has its own client (isolated token state)
+    and its own persistent, authenticated connection. Requests can be
+    fanned out to all accounts and their results aggregated.
+    """
+
+    def __init__(self,
+                 credentials: Dict,
+                 url: str = DERIBIT_WSS_URL,
+                 transport: TransportConfig = None):
+        """
+        :param credentials: (dict) Account name -> (key, secret).
+        :param url: (str) Deribit websocket url.
+        :param transport: (TransportConfig) Websocket settings of every account (overrides 'url').
+        """
+
+        if not credentials:
+            raise Exception("Credentials for at least one account must be provided.")
+
+        self.transport = transport or TransportConfig(url=url)
+        self.__clients = {name: DeribitAsyncClient(key=key, secret=secret, transport=self.transport)
+                          for (name, (key, secret)) in credentials.items()}
+        self.__connections = {}
+        self.__locks = {}
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def accounts(self):
+        return list(self.__clients)
+
+    def client(self, account_name: str):
+        if account_name not in self.__clients:
+            raise KeyError(f"Unknown account ({account_name}).")
+        return self.__clients[account_name]
+
+    # ##################################################################
+    # CONNECTIONS
+    # ##################################################################
+
+    async def connection(self, account_name: str):
+        """
+        :return: (DeribitConnection) The open, authenticated connection of the account.
+        """
+
+        client = self.client(account_name)
+        lock = self.__locks.setdefault(account_name, asyncio.Lock())
+
+        async with lock:
+            connection = self.__connections.get(account_name)
+            if connection is None or not connection.is_open:
+                connection = DeribitConnection(client=client, transport=self.transport)
+                await connection.open(authenticate=True)
+                self.__connections[account_name] = connection
+
+        return connection
+
+    async def close(self):
+        connections, self.__connections = self.__connections, {}
+        await asyncio.gather(*[c.close() for c in connections.values()], return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # ##################################################################
+    # REQUESTS
+    # ##################################################################
+
+    async def request(self, account_name: str, msg, auth_required: bool = True):
+        connection = await self.connection(account_name)
+        return await connection.request(msg, auth_required=auth_required)
+
+    async def fan_out(self, build: Callable, accounts: List[str] = None, auth_required: bool = True):
+        """
+        Sends the same request to several accounts concurrently.
+        :param build: (callable) Builds the message (a new one per account, ids must differ).
+        :param accounts: (list) Account names. Defaults to all accounts.
+        :return: (dict) Account name -> result content, or the exception raised for this account.
+        """
+
+        accounts = accounts or self.accounts
+
+        async def _one(name):
+            response = await self.request(name, build(), auth_required=auth_required)
+            if RESP_ERROR in response:
+                raise Exception(f"Request failed for account {name} ({response[RESP_ERROR]}).")
+            return response[RESP_CONTENT]
+
+        results = await asyncio.gather(*[_one(n) for n in accounts], return_exceptions=True)
+
+        for (name, result) in zip(accounts, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Fan-out request failed for account {name} ({result}).")
+
+        return dict(zip(accounts, results))
+
+    # ##################################################################
+    # ACCOUNT
+    # ##################################################################
+
+    async def all_positions(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND, accounts: List[str] = None):
+        return await self.fan_out(lambda: account.get_all_positions(currency=currency, kind=kind),
+                                  accounts=accounts)
+
+    async def account_summaries(self, currency=DEFAULT_CURRENCY, extended=True, accounts: List[str] = None):
+        return await self.fan_out(lambda: account.get_account_summary(currency=currency, extended=extended),
+                                  accounts=accounts)
+
+    # ##################################################################
+    # AGGREGATES
+    # ##################################################################
+
+    async def net_positions(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND, accounts: List[str] = None):
+        """
+        :return: (dict) Instrument name -> size summed over the accounts.
+        """
+
+        net = {}
+        for positions in (await self.all_positions(currency=currency, kind=kind, accounts=accounts)).values():
+            if isinstance(positions, Exception):
+                raise positions
+            for p in positions:
+                net[p["instrument_name"]] = net.get(p["instrument_name"], 0.0) + p.get("size", 0.0)
+        return net
+
+    async def total_equity(self, currency=DEFAULT_CURRENCY, accounts: List[str] = None):
+        """
+        :return: (float) Equity summed over the accounts.
+        """
+
+        total = 0.0
+        for summary in (await self.account_summaries(currency=currency, accounts=accounts)).values():
+            if isinstance(summary, Exception):
+                raise summary
+            total += summary.get("equity", 0.0)
+        return total
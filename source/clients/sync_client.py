@@ -1,9 +1,12 @@
+from typing import Dict
+
 from source.clients.async_client import DeribitAsyncClient
+from source.support.transport import TransportConfig
 
-from source.events import *
+from source.support.settings import (DEFAULT_DEPTH, DEFAULT_CURRENCY, DEFAULT_KIND)
+from source.utilities import grab_event_loop, lazy_import
 
-from source.support.settings import (DEFAULT_DEPTH)
-from source.utilities import grab_event_loop
+events = lazy_import("source.events")
 
 
 # Import features
@@ -17,9 +20,16 @@ class DeribitClient(DeribitAsyncClient):
 
     def __init__(self,
                  key=None,
-                 secret=None):
+                 secret=None,
+                 cache: bool = False,
+                 cache_ttls: Dict[str, float] = None,
+                 transport: TransportConfig = None):
+
+        super().__init__(key=key, secret=secret, cache=cache, cache_ttls=cache_ttls, transport=transport)
 
-        super().__init__(key=key, secret=secret)
+        # Each call runs its own event loop: no background refresh can outlive it
+        if self.cache is not None:
+            self.cache.stale_while_revalidate = False
 
     # ##################################################################
     # SYNC WRAPPER
@@ -39,6 +49,18 @@ class DeribitClient(DeribitAsyncClient):
         delegate = super().orderbooks
         return self.__sync_wrapper(delegate, instruments=instruments, depth=depth)
 
+    def index(self, currency=DEFAULT_CURRENCY):
+        delegate = super().index
+        return self.__sync_wrapper(delegate, currency=currency)
+
+    def book_summary(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND):
+        delegate = super().book_summary
+        return self.__sync_wrapper(delegate, currency=currency, kind=kind)
+
+    def market_snapshot(self, currency=DEFAULT_CURRENCY, kind=DEFAULT_KIND):
+        delegate = super().market_snapshot
+        return self.__sync_wrapper(delegate, currency=currency, kind=kind)
+
 
     # ##################################################################
     # SESSION
@@ -58,6 +80,21 @@ class DeribitClient(DeribitAsyncClient):
 
     # Add missing routes
 
+    def submit_orders(self, orders):
+        delegate = super().submit_orders
+        return self.__sync_wrapper(self.__on_connection, method=delegate, orders=orders)
+
+    def cancel_orders(self, order_ids):
+        delegate = super().cancel_orders
+        return self.__sync_wrapper(self.__on_connection, method=delegate, order_ids=order_ids)
+
+    async def __on_connection(self, method, **kwargs):
+        # The persistent connection cannot outlive the event loop of the call
+        try:
+            return await method(**kwargs)
+        finally:
+            await self.close_connection()
+
 
 
 if __name__ == '__main__':
@@ -71,6 +108,6 @@ if __name__ == '__main__':
     def on_orderbooks(sender, data):
         print(data)
 
-    sig_orderbook_snapshot_received.connect(on_orderbooks)
+    events.sig_orderbook_snapshot_received.connect(on_orderbooks)
     res = client.orderbooks(instruments=instruments, depth=10)
 
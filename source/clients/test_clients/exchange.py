@@ -0,0 +1,114 @@
+import json
+import time
+import asyncio
+import threading
+
+import websockets
+
+from source.support.networking import *
+
+KEY = "test-key"
+SECRET = "test-secret"
+ACCESS_TOKEN = "test-token"
+
+
+# ######################################################################
+# FAKE EXCHANGE
+# ######################################################################
+
+class FakeExchange(object):
+    """
+    Local websocket server answering JSON-RPC requests, for the client
+    tests. 'handlers' maps methods to handler(params) returning a result
+    (or raising for an error response), and 'delay(msg)' the seconds a
+    response waits, to answer out of order. Every request received is
+    recorded in 'requests'.
+
+    The server runs in its own thread and event loop: use it as a context
+    manager around the test, and connect to 'url'.
+    """
+
+    def __init__(self, handlers=None, delay=None):
+        self.handlers = {"public/auth": self.auth}
+        self.handlers.update(handlers or {})
+        self.delay = delay
+        self.requests = []
+        self.url = None
+
+        self.__loop = None
+        self.__thread = None
+        self.__stop = None
+
+    def __enter__(self):
+        started = threading.Event()
+        self.__thread = threading.Thread(target=self.__serve, args=(started,), daemon=True)
+        self.__thread.start()
+        started.wait(5)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.__loop.call_soon_threadsafe(self.__stop.set_result, None)
+        self.__thread.join(5)
+
+    def methods(self):
+        return [msg[REQ_METHOD] for msg in self.requests]
+
+    @staticmethod
+    def auth(params):
+        return {"access_token": ACCESS_TOKEN, "refresh_token": "refresh", "expires_in": 900}
+
+    # ##################################################################
+    # SERVER
+    # ##################################################################
+
+    def __serve(self, started):
+        self.__loop = asyncio.new_event_loop()
+
+        async def _main():
+            self.__stop = self.__loop.create_future()
+            async with websockets.serve(self.__handler, "127.0.0.1", 0) as server:
+                port = list(server.sockets)[0].getsockname()[1]
+                self.url = f"ws://127.0.0.1:{port}"
+                started.set()
+                await self.__stop
+
+        self.__loop.run_until_complete(_main())
+        self.__loop.close()
+
+    async def __handler(self, ws, *args):
+        tasks = set()
+        try:
+            async for frame in ws:
+                msg = json.loads(frame)
+                self.requests.append(msg)
+                task = asyncio.ensure_future(self.__respond(ws, msg))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            # Responses still waiting for a closed connection
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __respond(self, ws, msg):
+
+        if self.delay is not None:
+            await asyncio.sleep(self.delay(msg))
+
+        now = int(time.time() * 1e6)
+        response = {PROTOCOL: PROTOCOL_VERSION, "id": msg.get("id"), RESP_TS_IN: now, RESP_TS_OUT: now}
+
+        handler = self.handlers.get(msg.get(REQ_METHOD))
+        try:
+            if handler is None:
+                raise Exception(f"Method not found ({msg.get(REQ_METHOD)}).")
+            response[RESP_CONTENT] = handler(msg.get(REQ_PARAMS, {}))
+        except Exception as e:
+            response[RESP_ERROR] = {"code": -32601, "message": str(e)}
+
+        try:
+            await ws.send(json.dumps(response))
+        except websockets.ConnectionClosed:
+            pass
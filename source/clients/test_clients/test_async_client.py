@@ -0,0 +1,322 @@
+import asyncio
+import unittest
+
+from source.events import sig_trade_buy_received, sig_trade_cancel_received
+from source.clients.async_client import DeribitAsyncClient
+from source.clients.test_clients.exchange import FakeExchange, KEY, SECRET, ACCESS_TOKEN
+from source.support.transport import TransportConfig
+
+
+def order(params):
+    # Deribit rejects unknown parameters
+    for key in params:
+        if key not in ["instrument_name", "amount", "type", "price", "label", "time_in_force", "max_show",
+                       "post_only", "reduce_only", "stop_price", "trigger", "advanced", "access_token"]:
+            raise Exception(f"Invalid params ({key}).")
+    if params["access_token"] != ACCESS_TOKEN:
+        raise Exception("Unauthorized.")
+    return {"order": {"order_id": f"O-{params['price']}", "instrument_name": params["instrument_name"],
+                      "amount": params["amount"], "price": params["price"]}, "trades": []}
+
+
+def cancel(params):
+    return {"order_id": params["order_id"], "order_state": "cancelled"}
+
+
+def latest_first(msg):
+    # Orders with a higher price are answered sooner
+    return 0.02 - msg.get("params", {}).get("price", 0.0) * 0.001
+
+
+HANDLERS = {"private/buy": order, "private/sell": order, "private/cancel": cancel}
+
+
+class TestBatchTrading(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = FakeExchange(handlers=HANDLERS, delay=latest_first).__enter__()
+        self.addCleanup(self.exchange.__exit__, None, None, None)
+        self.client = DeribitAsyncClient(key=KEY, secret=SECRET, transport=TransportConfig(url=self.exchange.url))
+        self.orders = [{"direction": "buy" if n % 2 else "sell", "instrument": "btc-perpetual", "amount": 10,
+                        "limit_price": float(n + 1)} for n in range(5)]
+
+    def run_async(self, coroutine):
+
+        async def _main():
+            try:
+                return await coroutine
+            finally:
+                await self.client.close_connection()
+
+        return asyncio.run(_main())
+
+    def test_submit_orders(self):
+        responses = self.run_async(self.client.submit_orders(self.orders))
+
+        for (n, response) in enumerate(responses):
+            self.assertNotIn("error", response)
+            self.assertEqual(response["result"]["order"]["price"], float(n + 1))
+            self.assertEqual(response["result"]["order"]["instrument_name"], "BTC-PERPETUAL")
+
+        # Logged in once, then every order written before any response
+        self.assertEqual(self.exchange.methods(), ["public/auth"] + [("private/sell", "private/buy")[n % 2]
+                                                                    for n in range(5)])
+
+    def test_send_orders(self):
+        received = []
+
+        def on_buy(sender, data=None, **kwargs):
+            received.append(data[0]["result"]["order"]["order_id"])
+
+        sig_trade_buy_received.connect(on_buy)
+        self.addCleanup(sig_trade_buy_received.disconnect, on_buy)
+
+        async def main():
+            futures = await self.client.send_orders(self.orders)
+            self.assertEqual(len(futures), 5)
+            return await asyncio.gather(*futures)
+
+        responses = self.run_async(main())
+        self.assertEqual([r["result"]["order"]["order_id"] for r in responses], [f"O-{n + 1}.0" for n in range(5)])
+        self.assertEqual(sorted(received), ["O-2.0", "O-4.0"])
+
+    def test_submit_orders_as_completed(self):
+
+        async def main():
+            return [(n, r["result"]["order"]["price"]) async for (n, r) in
+                    self.client.submit_orders_as_completed(self.orders)]
+
+        results = self.run_async(main())
+        self.assertEqual(results, [(n, float(n + 1)) for n in reversed(range(5))])
+
+    def test_invalid_batches_send_nothing(self):
+        with self.assertRaises(ValueError):
+            self.run_async(self.client.submit_orders(self.orders + [{"direction": "hold"}]))
+        self.assertEqual(self.exchange.requests, [])
+        self.assertEqual(self.run_async(self.client.submit_orders([])), [])
+
+    def test_cancel_orders(self):
+        cancelled = []
+
+        def on_cancel(sender, data=None, **kwargs):
+            cancelled.append(data[0]["result"]["order_id"])
+
+        sig_trade_cancel_received.connect(on_cancel)
+        self.addCleanup(sig_trade_cancel_received.disconnect, on_cancel)
+
+        responses = self.run_async(self.client.cancel_orders(["A", "B", "C"]))
+        self.assertEqual([r["result"]["order_id"] for r in responses], ["A", "B", "C"])
+        self.assertEqual(sorted(cancelled), ["A", "B", "C"])
+
+    def test_cancel_orders_as_completed(self):
+
+        async def main():
+            return sorted([n async for (n, _) in self.client.cancel_orders_as_completed(["A", "B"])])
+
+        self.assertEqual(self.run_async(main()), [0, 1])
+
+    def test_batches_share_the_connection(self):
+
+        async def main():
+            await self.client.submit_orders(self.orders[:2])
+            await self.client.cancel_orders(["A"])
+            await self.client.submit_orders(self.orders[2:])
+
+        self.run_async(main())
+        self.assertEqual(self.exchange.methods().count("public/auth"), 1)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.answers = 0
+
+        def announcements(params):
+            self.answers += 1
+            return [{"id": self.answers}]
+
+        self.exchange = FakeExchange(handlers={"public/get_announcements": announcements}).__enter__()
+        self.addCleanup(self.exchange.__exit__, None, None, None)
+
+    def client(self, **kwargs):
+        return DeribitAsyncClient(key=KEY, secret=SECRET, transport=TransportConfig(url=self.exchange.url), **kwargs)
+
+    def test_disabled_by_default(self):
+        client = self.client()
+        self.assertIsNone(client.cache)
+
+        async def main():
+            return [(await client.announcements())[0]["result"][0]["id"] for _ in range(2)]
+
+        self.assertEqual(asyncio.run(main()), [1, 2])
+
+    def test_stale_responses_are_served_while_revalidating(self):
+        client = self.client(cache=True, cache_ttls={"public/get_announcements": 0.2})
+
+        async def main():
+            first = await client.announcements()
+            cached = await client.announcements()
+            await asyncio.sleep(0.25)
+
+            # Stale: served at once, refreshed in the background
+            stale = await client.announcements()
+            await asyncio.sleep(0.1)
+            fresh = await client.announcements()
+            return [r[0]["result"][0]["id"] for r in [first, cached, stale, fresh]]
+
+        self.assertEqual(asyncio.run(main()), [1, 1, 1, 2])
+        self.assertEqual(self.answers, 2)
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.answers = 0
+
+        def announcements(params):
+            self.answers += 1
+            return [{"id": self.answers}]
+
+        def delay(msg):
+            return 0.1 if msg["method"] == "public/get_announcements" else 0.0
+
+        self.exchange = FakeExchange(handlers={"public/get_announcements": announcements}, delay=delay).__enter__()
+        self.addCleanup(self.exchange.__exit__, None, None, None)
+        self.client = DeribitAsyncClient(key=KEY, secret=SECRET, transport=TransportConfig(url=self.exchange.url))
+
+    def test_identical_requests_are_coalesced(self):
+
+        async def main():
+            return await asyncio.gather(*[self.client.announcements() for _ in range(5)])
+
+        responses = asyncio.run(main())
+        self.assertEqual(self.answers, 1)
+        self.assertEqual(self.client.coalesced, 4)
+
+        # Every caller gets its own copy
+        self.assertEqual(len({id(r) for r in responses}), 5)
+        responses[0][0]["result"].clear()
+        self.assertEqual([r[0]["result"] for r in responses[1:]], [[{"id": 1}]] * 4)
+
+    def test_leader_failure_reaches_the_followers(self):
+        client = DeribitAsyncClient(key=KEY, secret=SECRET, transport=TransportConfig(url="ws://127.0.0.1:9"))
+
+        async def main():
+            return await asyncio.gather(*[client.announcements() for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(r, OSError) for r in results))
+
+        # Nothing left in flight: the next request is sent again
+        self.assertTrue(isinstance(asyncio.run(main())[0], OSError))
+
+    def test_cancelled_leader_hands_over_to_a_follower(self):
+
+        async def main():
+            leader = asyncio.ensure_future(self.client.announcements())
+            await asyncio.sleep(0.02)
+            followers = [asyncio.ensure_future(self.client.announcements()) for _ in range(3)]
+            await asyncio.sleep(0.02)
+
+            leader.cancel()
+            responses = await asyncio.gather(*followers)
+            self.assertTrue(leader.cancelled())
+            return [r[0]["result"][0]["id"] for r in responses]
+
+        # The request is sent again once, by one of the followers (the first one is never answered)
+        self.assertEqual(asyncio.run(main()), [1, 1, 1])
+        self.assertEqual(self.exchange.methods().count("public/get_announcements"), 2)
+
+    def test_cancelled_follower_leaves_the_others(self):
+
+        async def main():
+            leader = asyncio.ensure_future(self.client.announcements())
+            await asyncio.sleep(0.02)
+            follower = asyncio.ensure_future(self.client.announcements())
+            await asyncio.sleep(0.02)
+
+            follower.cancel()
+            response = await leader
+            return response[0]["result"][0]["id"], follower.cancelled()
+
+        self.assertEqual(asyncio.run(main()), (1, True))
+        self.assertEqual(self.answers, 1)
+
+
+# Several trades per millisecond, pages ending within a millisecond
+TRADES = [{"trade_id": f"T{n}", "timestamp": ts, "trade_seq": n + 1, "instrument_name": "BTC-PERPETUAL"}
+          for (n, ts) in enumerate([1, 1, 2, 2, 2, 3, 4, 4, 5, 6])]
+
+
+def trades_by_time(params):
+    if params["access_token"] != ACCESS_TOKEN:
+        raise Exception("Unauthorized.")
+    # Inclusive bounds: the trades of the cursor's millisecond are returned again
+    trades = [t for t in TRADES if params["start_timestamp"] <= t["timestamp"] <= params["end_timestamp"]]
+    return {"trades": trades[:params["count"]], "has_more": len(trades) > params["count"]}
+
+
+def trades_by_sequence(params):
+    end_seq = params.get("end_seq") or len(TRADES)
+    trades = [t for t in TRADES if params["start_seq"] <= t["trade_seq"] <= end_seq]
+    return {"trades": trades[:params["count"]], "has_more": len(trades) > params["count"]}
+
+
+class TestTradeHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = FakeExchange(handlers={"private/get_user_trades_by_currency_and_time": trades_by_time,
+                                               "private/get_user_trades_by_instrument": trades_by_sequence})
+        self.exchange.__enter__()
+        self.addCleanup(self.exchange.__exit__, None, None, None)
+        self.client = DeribitAsyncClient(key=KEY, secret=SECRET, transport=TransportConfig(url=self.exchange.url))
+
+    def collect(self, stream):
+
+        async def _main():
+            return [chunk async for chunk in stream]
+
+        return asyncio.run(_main())
+
+    def params(self, method):
+        return [msg["params"] for msg in self.exchange.requests if msg["method"] == method]
+
+    def test_boundary_trades_are_yielded_once(self):
+        chunks = self.collect(self.client.stream_user_trades_by_currency("BTC", end_timestamp=10, count=4))
+
+        self.assertEqual([t["trade_id"] for chunk in chunks for t in chunk], [t["trade_id"] for t in TRADES])
+        self.assertEqual([[t["trade_id"] for t in chunk] for chunk in chunks],
+                         [["T0", "T1", "T2", "T3"], ["T4", "T5"], ["T6", "T7", "T8"], ["T9"]])
+
+        # Each page starts at the millisecond of the last trade received
+        starts = [p["start_timestamp"] for p in self.params("private/get_user_trades_by_currency_and_time")]
+        self.assertEqual(starts, [1, 2, 3, 5])
+
+    def test_time_range(self):
+        chunks = self.collect(self.client.stream_user_trades_by_currency("BTC", start_timestamp=2, end_timestamp=4,
+                                                                         count=4))
+
+        self.assertEqual([t["trade_id"] for chunk in chunks for t in chunk], ["T2", "T3", "T4", "T5", "T6", "T7"])
+
+    def test_full_page_within_a_millisecond_is_skipped(self):
+        with self.assertLogs(level="WARNING"):
+            chunks = self.collect(self.client.stream_user_trades_by_currency("BTC", start_timestamp=2,
+                                                                             end_timestamp=3, count=2))
+
+        # The third trade of the millisecond cannot be reached with a timestamp cursor
+        self.assertEqual([t["trade_id"] for chunk in chunks for t in chunk], ["T2", "T3", "T5"])
+
+    def test_sequence_cursor(self):
+        chunks = self.collect(self.client.stream_user_trades_by_instrument("BTC-PERPETUAL", count=3))
+
+        self.assertEqual([[t["trade_seq"] for t in chunk] for chunk in chunks],
+                         [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10]])
+        params = self.params("private/get_user_trades_by_instrument")
+        self.assertEqual([p["start_seq"] for p in params], [1, 4, 7, 10])
+        self.assertTrue(all(p["sorting"] == "asc" and p["instrument_name"] == "BTC-PERPETUAL" for p in params))
+
+    def test_sequence_range(self):
+        chunks = self.collect(self.client.stream_user_trades_by_instrument("BTC-PERPETUAL", start_seq=3, end_seq=7,
+                                                                           count=4))
+
+        self.assertEqual([[t["trade_seq"] for t in chunk] for chunk in chunks], [[3, 4, 5, 6], [7]])
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+
+from source.clients.connection import DeribitConnection
+from source.clients.async_client import DeribitAsyncClient
+from source.clients.test_clients.exchange import FakeExchange, KEY, SECRET, ACCESS_TOKEN
+from source.features.common import message
+from source.support.transport import TransportConfig
+
+
+def echo(params):
+    return dict(params)
+
+
+class TestDeribitConnection(unittest.TestCase):
+
+    def test_pipelined_responses_are_matched_by_id(self):
+
+        # The later a request is sent, the sooner it is answered
+        def delay(msg):
+            return 0.05 - 0.01 * msg.get("params", {}).get("n", 0)
+
+        async def main(url):
+            async with DeribitConnection(url=url) as connection:
+                messages = [message(method="public/echo") for _ in range(5)]
+                for (n, msg) in enumerate(messages):
+                    msg["params"] = {"n": n}
+
+                futures = await connection.pipeline(messages)
+                self.assertEqual(connection.pending, 5)
+
+                order = []
+                for future in futures:
+                    future.add_done_callback(lambda f: order.append(f.result()["result"]["n"]))
+
+                responses = await asyncio.gather(*futures)
+                self.assertEqual(connection.pending, 0)
+                return [r["id"] for r in responses], [m["id"] for m in messages], order
+
+        with FakeExchange(handlers={"public/echo": echo}, delay=delay) as exchange:
+            (ids, sent, order) = asyncio.run(main(exchange.url))
+
+        self.assertEqual(ids, sent)
+        self.assertEqual(order, [4, 3, 2, 1, 0])
+
+    def test_dispatch(self):
+        notifications = []
+        connection = DeribitConnection(notification_handler=notifications.append)
+
+        # Frames without a pending id are notifications
+        notification = {"method": "subscription", "params": {"channel": "ticker.BTC-PERPETUAL.raw", "data": {}}}
+        connection.dispatch(notification)
+        connection.dispatch({"id": "unknown", "result": 1})
+        self.assertEqual(notifications, [notification, {"id": "unknown", "result": 1}])
+
+    def test_error_responses_resolve_their_request(self):
+
+        async def main(url):
+            async with DeribitConnection(url=url) as connection:
+                return await connection.request(message(method="public/missing"))
+
+        with FakeExchange() as exchange:
+            response = asyncio.run(main(exchange.url))
+
+        self.assertIn("error", response)
+
+    def test_authenticated_requests(self):
+
+        async def main(url):
+            client = DeribitAsyncClient(key=KEY, secret=SECRET, transport=TransportConfig(url=url))
+            async with DeribitConnection(client=client, url=url) as connection:
+                await connection.authenticate()
+                self.assertTrue(connection.is_authenticated)
+                return await connection.request(message(method="private/echo"), auth_required=True)
+
+        with FakeExchange(handlers={"private/echo": echo}) as exchange:
+            response = asyncio.run(main(exchange.url))
+            self.assertEqual(exchange.methods(), ["public/auth", "private/echo"])
+
+        self.assertEqual(response["result"]["access_token"], ACCESS_TOKEN)
+
+    def test_pending_requests_fail_when_the_connection_closes(self):
+
+        async def main(url):
+            connection = await DeribitConnection(url=url).open()
+            future = await connection.send(message(method="public/echo"))
+            await connection.close()
+            with self.assertRaises(Exception):
+                await future
+            self.assertFalse(connection.is_open)
+
+        with FakeExchange(handlers={"public/echo": echo}, delay=lambda msg: 1.0) as exchange:
+            asyncio.run(main(exchange.url))
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+from source.clients.multi_client import DeribitMultiClient
+from source.clients.test_clients.exchange import FakeExchange, KEY, SECRET, ACCESS_TOKEN
+from source.support.transport import TransportConfig
+
+POSITIONS = {"main": [{"instrument_name": "BTC-PERPETUAL", "size": 100.0},
+                      {"instrument_name": "BTC-27DEC24", "size": -50.0}],
+             "hedge": [{"instrument_name": "BTC-PERPETUAL", "size": -30.0}],
+             "rejected": None,
+             "offline": None}
+
+SUMMARIES = {"main": {"equity": 1.5}, "hedge": {"equity": 0.25}}
+
+
+class FakeConnection(object):
+    """
+    Answers the requests of one account, or fails them.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = []
+
+    async def request(self, msg, auth_required=False):
+        self.requests.append((msg, auth_required))
+
+        if self.name == "offline":
+            raise OSError("Connection refused.")
+        if self.name == "rejected":
+            return {"id": msg["id"], "error": {"code": 13009, "message": "unauthorized"}}
+        if msg["method"] == "private/get_positions":
+            return {"id": msg["id"], "result": POSITIONS[self.name]}
+        return {"id": msg["id"], "result": SUMMARIES[self.name]}
+
+
+class TestMultiClientAggregates(unittest.TestCase):
+
+    def setUp(self):
+        self.multi = DeribitMultiClient(credentials={name: (KEY, SECRET) for name in POSITIONS})
+        self.connections = {name: FakeConnection(name) for name in POSITIONS}
+
+        async def connection(name):
+            return self.connections[name]
+
+        self.multi.connection = connection
+
+    def test_fan_out(self):
+        results = asyncio.run(self.multi.all_positions(currency="BTC", kind="future"))
+
+        self.assertEqual(list(results), list(POSITIONS))
+        self.assertEqual(results["main"], POSITIONS["main"])
+        self.assertIsInstance(results["rejected"], Exception)
+        self.assertIsInstance(results["offline"], OSError)
+
+        # One message per account, all authenticated
+        ids = [msg["id"] for c in self.connections.values() for (msg, _) in c.requests]
+        self.assertEqual(len(set(ids)), len(POSITIONS))
+        self.assertTrue(all(auth for c in self.connections.values() for (_, auth) in c.requests))
+
+    def test_net_positions(self):
+        net = asyncio.run(self.multi.net_positions(accounts=["main", "hedge"]))
+
+        self.assertEqual(net, {"BTC-PERPETUAL": 70.0, "BTC-27DEC24": -50.0})
+        self.assertEqual(self.connections["offline"].requests, [])
+
+    def test_net_positions_fail_with_an_account(self):
+        with self.assertRaises(OSError):
+            asyncio.run(self.multi.net_positions(accounts=["main", "offline"]))
+        with self.assertRaises(Exception):
+            asyncio.run(self.multi.net_positions())
+
+    def test_total_equity(self):
+        self.assertEqual(asyncio.run(self.multi.total_equity(accounts=["main", "hedge"])), 1.75)
+
+
+class TestMultiClientTransport(unittest.TestCase):
+
+    def test_accounts_connect_with_the_transport(self):
+        def positions(params):
+            if params.get("access_token") != ACCESS_TOKEN:
+                raise Exception("Unauthorized.")
+            return []
+
+        with FakeExchange(handlers={"private/get_positions": positions}) as exchange:
+            transport = TransportConfig(url=exchange.url, compression=False)
+            multi = DeribitMultiClient(credentials={"a": (KEY, SECRET), "b": (KEY, SECRET)}, transport=transport)
+
+            self.assertIs(multi.client("a").transport, transport)
+
+            async def _main():
+                async with multi:
+                    results = await multi.all_positions()
+                    connection = await multi.connection("a")
+                    self.assertIs(connection.transport, transport)
+                    return results
+
+            self.assertEqual(asyncio.run(_main()), {"a": [], "b": []})
+            self.assertEqual(exchange.methods().count("public/auth"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import threading
+import unittest
+
+from unittest import mock
+
+from source.clients.async_client import DeribitAsyncClient
+from source.clients.websocket_client import DeribitChannelClient
+from source.clients.test_clients.exchange import FakeExchange, KEY, SECRET
+from source.support.transport import TransportConfig
+
+TIMEOUT = 5.0
+
+
+def channels(params):
+    return params["channels"]
+
+
+HANDLERS = {"public/subscribe": channels, "public/unsubscribe": channels,
+            "private/subscribe": channels, "private/unsubscribe": channels}
+
+
+class TestChannelClient(unittest.TestCase):
+
+    def start(self, handlers=None, delay=None, client=None):
+        self.exchange = FakeExchange(handlers={**HANDLERS, **(handlers or {})}, delay=delay).__enter__()
+        self.addCleanup(self.exchange.__exit__, None, None, None)
+
+        self.channel_client = DeribitChannelClient(message_handler=lambda ws, msg: None,
+                                                   close_handler=lambda ws, *args: None,
+                                                   transport=TransportConfig(url=self.exchange.url),
+                                                   sequence=False,
+                                                   client=client)
+        self.addCleanup(self.channel_client.close_socket)
+        return self.channel_client
+
+    def subscriptions(self):
+        return [c for msg in self.exchange.requests if msg["method"].endswith("/subscribe")
+                for c in msg["params"]["channels"]]
+
+    def test_concurrent_subscriptions(self):
+        channel_client = self.start()
+        barrier = threading.Barrier(8)
+        results = {}
+
+        def subscribe(n):
+            barrier.wait()
+            for m in range(5):
+                channel = f"ticker.BTC-{n}-{m}.100ms"
+                results[channel] = channel_client.subscribe(channel)
+
+        threads = [threading.Thread(target=subscribe, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(TIMEOUT)
+
+        # Each future is resolved with a confirmation including its channel
+        for (channel, future) in results.items():
+            self.assertIn(channel, future.result(timeout=TIMEOUT))
+
+        self.assertEqual(len(results), 40)
+        self.assertEqual(sorted(channel_client.channels), sorted(results))
+        self.assertEqual(sorted(self.subscriptions()), sorted(results))
+
+    def test_confirmations_are_matched_by_id(self):
+        # The first subscription is answered last
+        channel_client = self.start(delay=lambda msg: 0.5 if "ticker.A.100ms" in msg["params"]["channels"] else 0.0)
+
+        first = channel_client.subscribe("ticker.A.100ms")
+        second = channel_client.subscribe("ticker.B.100ms")
+
+        self.assertEqual(second.result(timeout=TIMEOUT), ["ticker.B.100ms"])
+        self.assertFalse(first.done())
+        self.assertEqual(first.result(timeout=TIMEOUT), ["ticker.A.100ms"])
+        self.assertEqual(sorted(channel_client.channels), ["ticker.A.100ms", "ticker.B.100ms"])
+
+    def test_unsubscribe(self):
+        channel_client = self.start()
+
+        channel_client.subscribe("ticker.A.100ms").result(timeout=TIMEOUT)
+        self.assertEqual(channel_client.unsubscribe("ticker.A.100ms").result(timeout=TIMEOUT), ["ticker.A.100ms"])
+        self.assertEqual(channel_client.channels, [])
+
+    def test_errors_fail_the_subscription(self):
+        def reject(params):
+            raise Exception("Invalid channel.")
+
+        channel_client = self.start(handlers={"public/subscribe": reject})
+
+        with self.assertRaises(Exception):
+            channel_client.subscribe("ticker.A.100ms").result(timeout=TIMEOUT)
+        self.assertEqual(channel_client.channels, [])
+
+    def test_token_is_renewed_while_commands_keep_coming(self):
+        # Tokens expiring within the refresh margin are renewed before each command
+        def auth(params):
+            return {"access_token": "token", "refresh_token": "refresh", "expires_in": 30}
+
+        channel_client = self.start(handlers={"public/auth": auth}, client=DeribitAsyncClient(key=KEY, secret=SECRET))
+
+        channel_client.subscribe("ticker.A.100ms").result(timeout=TIMEOUT)
+        self.assertTrue(channel_client.is_authenticated)
+        self.assertEqual(self.exchange.methods().count("public/auth"), 1)
+
+        channel_client.subscribe("ticker.B.100ms").result(timeout=TIMEOUT)
+        self.assertEqual(self.exchange.methods().count("public/auth"), 2)
+        self.assertEqual(self.exchange.methods()[-1], "private/subscribe")
+
+
+class TestChannelClientDisconnected(unittest.TestCase):
+
+    @mock.patch("source.clients.websocket_client.CONNECTION_TIMEOUT", 0.2)
+    def test_commands_fail_without_connection(self):
+        channel_client = DeribitChannelClient(auto_start=False, sequence=False,
+                                              transport=TransportConfig(url="ws://127.0.0.1:9"))
+
+        subscriptions = [channel_client.subscribe(f"ticker.{name}.100ms") for name in "ABC"]
+
+        for future in subscriptions:
+            with self.assertRaises(Exception):
+                future.result(timeout=TIMEOUT)
+        self.assertFalse(channel_client.is_connected)
+
+
+if __name__ == "__main__":
+    unittest.main()
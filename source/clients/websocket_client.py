@@ -1,32 +1,74 @@
 import json
-import websocket
+import time
+import queue
+import logging
 import threading
-import copy
 
 from typing import Callable
 
-import source.features.data as data
-import source.features.session as session
-from source.support.settings import DERIBIT_WSS_URL
+from source.utilities import lazy_import
+from source.support.types import INTERVAL
+from source.support.transport import TransportConfig
+from source.support.conflation import ConflatingDispatcher
+from source.support.sequencing import RawFeedSequencer
+from source.support.networking import *
+from source.support.settings import TOKEN_REFRESH_MARGIN
+from source.support.decoding import extract_channel, extract_field
+from source.support.metrics import MESSAGES_RECEIVED, LAST_MESSAGE_TIME
+
+import source.support.tracing as tracing
+
+# Heavy dependencies and features are loaded on first use
+websocket = lazy_import("websocket")
+futures = lazy_import("concurrent.futures")
+data = lazy_import("source.features.data")
+session = lazy_import("source.features.session")
 
 WEBSOCKET_DELAY = 1.0
 
+# Control commands
+COMMAND_SUBSCRIBE = "subscribe"
+COMMAND_UNSUBSCRIBE = "unsubscribe"
+COMMAND_AUTHENTICATE = "authenticate"
+
+AUTHENTICATION_TIMEOUT = 10.0
+CONNECTION_TIMEOUT = 30.0
+TOKEN_CHECK_INTERVAL = 5.0
+
 
 # ######################################################################
 # DERIBIT CLIENT
 # ######################################################################
 
 class DeribitChannelClient(object):
+    """
+    Websocket client for channel subscriptions, run in a background thread.
+    Subscriptions can be changed from any thread: 'subscribe' and
+    'unsubscribe' only queue a command and return a Future, resolved with
+    the channels confirmed by the exchange. A single control thread drains
+    the commands and is the only one sending them, so concurrent callers
+    never interleave their frames nor corrupt the subscription state.
+
+    With a client holding credentials, the session is authenticated before
+    any subscription (and again before the token expires), which gives
+    access to the raw channels and to the private ones. Raw book and trades
+    channels are checked for gaps (see support.sequencing.RawFeedSequencer).
+    """
 
     def __init__(self,
                  message_handler: Callable = None,
                  open_handler: Callable = None,
                  error_handler: Callable = None,
                  close_handler: Callable = None,
-                 auto_start: bool = True):
+                 auto_start: bool = True,
+                 conflate: bool = False,
+                 transport: TransportConfig = None,
+                 sequence: bool = True,
+                 client=None):
 
-        # Uri
-        self.__url = DERIBIT_WSS_URL
+        # Uri and socket options
+        self.transport = transport or TransportConfig()
+        self.__url = self.transport.url
 
         # Websocket properties
         # self.__wss = None
@@ -34,15 +76,28 @@ class DeribitChannelClient(object):
         self.heartbeat = 5
 
         # Deribit (current) channels
-        # these are already subscribed
-        self.__channels = []
+        # these are confirmed by the exchange
+        self.__channels = set()
+
+        # Channels subscribed or being subscribed (restored on reconnection)
+        self.__requested = set()
 
-        # Deribit channels that are not yet subscribed
-        # to update the update: self.__execute()
+        # Channels waiting for 'implement_channels_modifications'
+        # (command, channel, future)
         self.__pending_channels = []
 
-        # Features
-        #self.__authentication = AuthManager(wss_url=self.__url, key=key, secret=secret)
+        # Control commands (command, channels, waiters), drained by the control thread
+        self.__commands = queue.Queue()
+        self.__control = None
+        self.__connected = threading.Event()
+
+        # Message id -> (command, channels, waiters) waiting for a confirmation
+        self.__confirmations = {}
+        self.__lock = threading.RLock()
+
+        # Client holding the credentials of authenticated sessions
+        self.client = client
+        self.__authenticated = threading.Event()
 
         # Setting up delegates
         self.open_handler = open_handler or self.on_open
@@ -50,6 +105,18 @@ class DeribitChannelClient(object):
         self.error_handler = error_handler or self.on_error
         self.close_handler = close_handler or self.on_close
 
+        # Slow message handlers only see the latest state of each channel
+        self.conflator = None
+        if conflate:
+            self.conflator = ConflatingDispatcher(handler=self.message_handler)
+            self.message_handler = self.conflator.on_message
+
+        # Raw channels are checked for gaps before any conflation
+        self.sequencer = None
+        if sequence:
+            self.sequencer = RawFeedSequencer(handler=self.message_handler, resync=self.resubscribe)
+            self.message_handler = self.sequencer.on_message
+
         # Start a websocket thread in the background
         self.start(auto_start=auto_start)
 
@@ -63,6 +130,22 @@ class DeribitChannelClient(object):
             self.__create_websocket()
         return self.__ws
 
+    @property
+    def channels(self):
+        """
+        :return: (list) Channels confirmed by the exchange.
+        """
+        with self.__lock:
+            return list(self.__channels)
+
+    @property
+    def is_connected(self):
+        return self.__connected.is_set()
+
+    @property
+    def is_authenticated(self):
+        return self.__authenticated.is_set()
+
     # ##################################################################
     # WEBSOCKET BASIC OPERATIONS
     # ##################################################################
@@ -71,30 +154,75 @@ class DeribitChannelClient(object):
         websocket.enableTrace(True)
         ws = websocket.WebSocketApp(self.__url,
                                     keep_running=True,
-                                    on_message=self.message_handler,
+                                    on_open=self.__on_open,
+                                    on_message=self.__on_message,
                                     on_error=self.error_handler,
-                                    on_close=self.close_handler)
-        ws.on_open = self.on_open
+                                    on_close=self.__on_close)
         self.__ws = ws
 
     def open_socket(self):
         if not self.__ws:
             self.__create_websocket()
 
-        self.__ws.on_open = self.subscribe
-        self.__ws.run_forever(ping_interval=self.heartbeat)
+        self.__ws.run_forever(ping_interval=self.heartbeat, sockopt=self.transport.socket_options())
         time.sleep(0.25)
 
     def close_socket(self):
         if self.__ws:
             self.__ws.close()
 
+        # Some websocket-client versions do not call 'on_close' on local closes
+        self.__reset_subscriptions()
+
     def start(self, auto_start: bool = False, daemon: bool = True):
         if auto_start:
+            self.__start_control()
             thread = threading.Thread(target=self.open_socket, args=())
             thread.daemon = daemon
             thread.start()
-        time.sleep(WEBSOCKET_DELAY)
+            time.sleep(WEBSOCKET_DELAY)
+
+    def __on_open(self, ws):
+
+        # Restore the subscriptions (e.g. after a reconnection)
+        with self.__lock:
+            channels = sorted(self.__requested)
+
+        self.__connected.set()
+        if channels:
+            self.__commands.put((COMMAND_SUBSCRIBE, channels, []))
+
+        self.open_handler(ws)
+
+    def __on_close(self, ws, *args):
+        self.__reset_subscriptions()
+        self.close_handler(ws, *args)
+
+    def __reset_subscriptions(self):
+
+        self.__connected.clear()
+        self.__authenticated.clear()
+
+        with self.__lock:
+            confirmations, self.__confirmations = self.__confirmations, {}
+            self.__channels.clear()
+
+        for (_, _, waiters) in confirmations.values():
+            _fail(waiters, Exception("Connection closed before the subscription was confirmed."))
+
+    def __on_message(self, ws, message):
+        channel = extract_channel(message) if isinstance(message, str) else None
+        if channel:
+            MESSAGES_RECEIVED.labels(channel).inc()
+            LAST_MESSAGE_TIME.labels(channel).set_to_current_time()
+        elif self.__confirmations and isinstance(message, str):
+            self.__confirm(message)
+
+        trace = tracing.start(channel, tracing.KIND_NOTIFICATION) if channel else None
+        self.message_handler(ws, message)
+        if trace:
+            trace.mark(tracing.PHASE_DISPATCH)
+            tracing.finish(trace)
 
     # ##################################################################
     # DELEGATES
@@ -113,7 +241,7 @@ class DeribitChannelClient(object):
         pass
 
     @staticmethod
-    def on_close(ws):
+    def on_close(ws, *args):
         print("### closed ###")
 
     # ##################################################################
@@ -121,70 +249,264 @@ class DeribitChannelClient(object):
     # ##################################################################
 
     def subscribe(self, channel=None, immediate=True):
+        """
+        Thread safe. The subscription is sent by the control thread (once
+        connected), or on the next 'implement_channels_modifications' if
+        not immediate.
+        :return: (Future) Resolved with the channels confirmed by the exchange.
+        """
 
         if not channel:
             return None
 
-        if channel not in self.__channels:
-            self.__pending_channels.append(channel)
-
-        if immediate:
-            self.implement_channels_modifications()
+        return self.__request(COMMAND_SUBSCRIBE, channel, immediate)
 
     def unsubscribe(self, channel=None, immediate=True):
+        """
+        Thread safe, see 'subscribe'.
+        :return: (Future) Resolved with the channels unsubscribed by the exchange.
+        """
+
+        if not channel:
+            return None
 
-        if channel in self.__pending_channels:
-            self.__pending_channels.remove(channel)
+        if self.sequencer is not None:
+            self.sequencer.reset(channel)
+
+        return self.__request(COMMAND_UNSUBSCRIBE, channel, immediate)
+
+    def resubscribe(self, channel):
+        """
+        Unsubscribes and subscribes again a channel, e.g. to receive a new
+        snapshot of an out of sync raw book.
+        :return: (Future) Resolved with the channels confirmed by the exchange.
+        """
+        self.__request(COMMAND_UNSUBSCRIBE, channel, immediate=True)
+        return self.__request(COMMAND_SUBSCRIBE, channel, immediate=True)
+
+    def implement_channels_modifications(self):
+        """
+        Sends the subscriptions (and unsubscriptions) waiting for it, as one
+        request of each kind.
+        """
+
+        with self.__lock:
+            pending, self.__pending_channels = self.__pending_channels, []
+
+        for command in [COMMAND_SUBSCRIBE, COMMAND_UNSUBSCRIBE]:
+            batch = [(channel, future) for (command_, channel, future) in pending if command_ == command]
+            if batch:
+                channels = list(dict.fromkeys(channel for (channel, _) in batch))
+                self.__commands.put((command, channels, [future for (_, future) in batch]))
+
+        self.__start_control()
+
+    def __request(self, command: str, channel: str, immediate: bool):
+
+        future = futures.Future()
+
+        with self.__lock:
+            if command == COMMAND_SUBSCRIBE:
+                self.__requested.add(channel)
+            else:
+                self.__requested.discard(channel)
+            self.__pending_channels.append((command, channel, future))
 
         if immediate:
             self.implement_channels_modifications()
 
-    def implement_channels_modifications(self):
+        return future
+
+    # ##################################################################
+    # CONTROL THREAD
+    # ##################################################################
+
+    def __start_control(self):
+        with self.__lock:
+            if self.__control is None or not self.__control.is_alive():
+                self.__control = threading.Thread(target=self.__control_forever, args=())
+                self.__control.daemon = True
+                self.__control.start()
+
+    def __control_forever(self):
+
+        while True:
+            try:
+                (command, channels, waiters) = self.__commands.get(timeout=TOKEN_CHECK_INTERVAL)
+            except queue.Empty:
+                self.__refresh_authentication()
+                continue
+
+            # Commands wait for the connection (and its authentication)
+            if not self.__connected.wait(timeout=CONNECTION_TIMEOUT):
+                self.__fail_commands(waiters, Exception("Not connected to the exchange."))
+                continue
+
+            # A busy queue must not let the token expire
+            self.__refresh_authentication()
+
+            if self.client is not None and not self.__authenticated.is_set():
+                try:
+                    self.__authenticate()
+                except Exception as e:
+                    _fail(waiters, Exception(f"Authentication failed ({e})."))
+                    continue
+
+            msg = self.__command_message(command, channels)
+
+            with self.__lock:
+                self.__confirmations[msg["id"]] = (command, channels, waiters)
+
+            try:
+                self.websocket.send(json.dumps(msg))
+            except Exception as e:
+                with self.__lock:
+                    self.__confirmations.pop(msg["id"], None)
+                _fail(waiters, Exception(f"Channel modification failed ({e})."))
+
+    def __fail_commands(self, waiters, error: Exception):
+        """
+        Fails the waiters of a command and of every command queued behind it.
+        The channels stay requested and are subscribed once connected.
+        """
+
+        _fail(waiters, error)
+
+        while True:
+            try:
+                (_, _, queued) = self.__commands.get_nowait()
+            except queue.Empty:
+                return
+            _fail(queued, error)
+
+    def __command_message(self, command, channels):
+
+        # Authenticated sessions subscribe privately (raw and private channels)
+        if self.client is not None:
+            if command == COMMAND_SUBSCRIBE:
+                return session.private_subscription_message(channels=channels)
+            return session.private_unsubscription_message(channels=channels)
+
+        if command == COMMAND_SUBSCRIBE:
+            return session.subscription_message(channels=channels)
+        return session.unsubscription_message(channels=channels)
+
+    def __authenticate(self):
+
+        future = futures.Future()
+        msg = self.client.login_message()
+
+        with self.__lock:
+            self.__confirmations[msg["id"]] = (COMMAND_AUTHENTICATE, [], [future])
+
+        self.websocket.send(json.dumps(msg))
+        response = future.result(timeout=AUTHENTICATION_TIMEOUT)
+
+        self.client.parse_login_response(response=response)
+        self.__authenticated.set()
+
+    def __refresh_authentication(self):
+
+        if not self.__authenticated.is_set():
+            return
+
+        lifespan = self.client.token_lifespan
+        if lifespan is None or lifespan.total_seconds() > TOKEN_REFRESH_MARGIN:
+            return
 
         try:
-            # Formulate a message for websocket
-            msg = session.subscription_message(channels=self.__pending_channels)
+            self.__authenticate()
+        except Exception as e:
+            logging.warning(f"Session authentication renewal failed ({e}).")
+
+    def __confirm(self, message):
+
+        id_ = extract_field(message, "id")
 
-            # send message through websocket
-            self.websocket.send(json.dumps(msg))
+        with self.__lock:
+            if id_ not in self.__confirmations:
+                return
+            (command, channels, waiters) = self.__confirmations.pop(id_)
 
-            # if successful, update the list of current channels
-            self.__channels = copy.deepcopy(self.__pending_channels)
+        response = json.loads(message)
 
-        except KeyboardInterrupt:
-            # TODO Some logging required here...
-            print("Channel modification failed.")
+        if command == COMMAND_AUTHENTICATE:
+            _resolve(waiters, response)
+            return
+
+        if RESP_ERROR in response:
+            _fail(waiters, Exception(f"Channel modification failed ({response[RESP_ERROR]})."))
+            return
+
+        confirmed = response.get(RESP_CONTENT) or []
+        with self.__lock:
+            if command == COMMAND_SUBSCRIBE:
+                self.__channels.update(c for c in confirmed if c in self.__requested)
+            else:
+                self.__channels.difference_update(confirmed)
+
+        _resolve(waiters, confirmed)
 
     # ##################################################################
     # MARKET DATA CHANNELS
     # ##################################################################
 
-    def subscribe_orderbook(self, instrument):
+    def subscribe_orderbook(self, instrument, raw: bool = False):
+        """
+        :param raw: (bool) Every change instead of 100ms aggregates (authenticated sessions only).
+        """
 
         channel = data.channel_orderbook(instrument=instrument,
-                                         interval=100,
+                                         interval=self.__interval(raw),
                                          depth=None,
                                          group=None)
 
-        self.subscribe(channel, immediate=True)
+        return self.subscribe(channel, immediate=True)
 
-    def subscribe_trades(self, instrument):
+    def subscribe_trades(self, instrument, raw: bool = False):
+        """
+        :param raw: (bool) Every trade instead of 100ms aggregates (authenticated sessions only).
+        """
 
         channel = data.channel_trades(instrument=instrument,
-                                      interval=100)
+                                      interval=self.__interval(raw))
 
-        self.subscribe(channel, immediate=True)
+        return self.subscribe(channel, immediate=True)
 
     def subscribe_quotes(self, instrument):
 
         channel = data.channel_quotes(instrument=instrument)
 
-        self.subscribe(channel, immediate=True)
+        return self.subscribe(channel, immediate=True)
 
+    def __interval(self, raw: bool):
 
-if __name__ == '__main__':
-    import time
+        if not raw:
+            return 100
+
+        if self.client is None:
+            raise Exception("Raw channels require an authenticated session (a client with credentials).")
 
+        return INTERVAL.RAW
+
+
+# ######################################################################
+# PRIVATE METHODS
+# ######################################################################
+
+def _fail(pending, error: Exception):
+    for future in pending:
+        if not future.done():
+            future.set_exception(error)
+
+
+def _resolve(pending, result):
+    for future in pending:
+        if not future.done():
+            future.set_result(result)
+
+
+if __name__ == '__main__':
     client = DeribitChannelClient()
     time.sleep(1.5)
     client.subscribe_quotes("BTC-PERPETUAL")
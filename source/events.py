@@ -15,6 +15,9 @@ sig_instrument_received = signal("DERIBIT-INSTRUMENTS-RECEIVED")
 sig_index_level_received = signal("DERIBIT-INDEX-LEVEL-RECEIVED")
 sig_currency_received = signal("DERIBIT-CURRENCY-RECEIVED")
 sig_orderbook_snapshot_received = signal("DERIBIT-ORDERBOOK-SNAPSHOT-RECEIVED")
+sig_book_summary_received = signal("DERIBIT-BOOK-SUMMARY-RECEIVED")
+sig_market_snapshot_updated = signal("DERIBIT-MARKET-SNAPSHOT-UPDATED")
+sig_index_level_updated = signal("DERIBIT-INDEX-LEVEL-UPDATED")
 
 
 # ##################################################################
@@ -45,6 +48,22 @@ sig_trade_history_received = signal("DERIBIT-TRADE-HISTORY-RECEIVED")
 sig_trade_order_status_received = signal("DERIBIT-TRADE-ORDER-STATUS-RECEIVED")
 
 
+# ##################################################################
+# ORDER MANAGEMENT
+# ##################################################################
+
+sig_order_updated = signal("DERIBIT-ORDER-UPDATED")
+sig_user_trade_received = signal("DERIBIT-USER-TRADE-RECEIVED")
+
+
+# ##################################################################
+# PORTFOLIO MANAGEMENT
+# ##################################################################
+
+sig_position_updated = signal("DERIBIT-POSITION-UPDATED")
+sig_portfolio_updated = signal("DERIBIT-PORTFOLIO-UPDATED")
+
+
 
 
 
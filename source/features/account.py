@@ -1,5 +1,7 @@
 from source.support.sanitizers import sanitize
+from source.support.channel_name import build_channel
 from source.features.common import message, add_params_to_message
+from source.support.types import INTERVAL, PRIVATE_CHANNELS
 
 # ######################################################################
 # METHODS
@@ -41,6 +43,23 @@ def get_announcements():
     return add_params_to_message({}, msg)
 
 
+# ######################################################################
+# CHANNELS
+# ######################################################################
+
+def channel_user_changes(currency: str = None, kind: str = None, interval: str = INTERVAL.RAW.value):
+    data = sanitize(currency=currency, kind=kind)
+    return build_channel(header=PRIVATE_CHANNELS.USER_CHANGES.value,
+                         instrument=f"{data['kind']}.{data['currency']}",
+                         interval=interval)
+
+
+def channel_user_portfolio(currency: str = None):
+    data = sanitize(currency=currency)
+    return build_channel(header=PRIVATE_CHANNELS.USER_PORTFOLIO.value,
+                         instrument=data["currency"])
+
+
 
 
 
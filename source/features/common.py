@@ -1,5 +1,7 @@
 from typing import List
 
+import source.support.tracing as tracing
+
 from source.utilities import generate_id
 from source.support.networking import *
 
@@ -15,6 +17,9 @@ def empty_message():
 
 def message(method=None, msg=None):
 
+    if tracing.TRACER is not None:
+        tracing.on_build()
+
     if not msg:
         msg = add_message_id(message=add_rpc_protocol({}))
 
@@ -1,4 +1,5 @@
 from source.support.sanitizers import *
+from source.support.settings import DEFAULT_INDEX_QUOTE
 from source.support.channel_name import build_channel
 from source.features.common import message, add_params_to_message
 from source.support.types import INTERVAL, PUBLIC_CHANNELS
@@ -8,9 +9,11 @@ from source.support.types import INTERVAL, PUBLIC_CHANNELS
 # ######################################################################
 
 METHOD_GET_INSTRUMENTS = "public/get_instruments"
+METHOD_GET_INSTRUMENT = "public/get_instrument"
 METHOD_GET_ORDER_BOOK = "public/get_order_book"
 METHOD_CURRENCIES = "public/get_currencies"
 METHOD_INDEX = "public/get_index"
+METHOD_GET_BOOK_SUMMARY_BY_CURRENCY = "public/get_book_summary_by_currency"
 
 METHOD_SUBSCRIBE = "public/subscribe"
 
@@ -29,6 +32,17 @@ def request_instruments(currency: str, kind: str, expired=False):
     return add_params_to_message(params, msg)
 
 
+def request_instrument(instrument: str):
+
+    # Sanitize input arguments
+    data = sanitize(instrument=instrument)
+
+    # Build basic message
+    msg = message(method=METHOD_GET_INSTRUMENT)
+    params = {"instrument_name": data["instrument"]}
+    return add_params_to_message(params, msg)
+
+
 def request_orderbook(instrument: str, depth: int = None):
 
     # Sanitize input arguments
@@ -54,6 +68,19 @@ def request_currencies():
     return add_params_to_message({}, msg)
 
 
+def request_book_summary(currency: str, kind: str = None):
+
+    # Sanitize input arguments
+    data = sanitize(currency=currency, kind=kind)
+
+    # Summaries of every kind are returned when no kind is given
+    kind_ = None if data["kind"] == INSTRUMENT_KIND.ANY.value else data["kind"]
+
+    msg = message(method=METHOD_GET_BOOK_SUMMARY_BY_CURRENCY)
+    params = {"currency": data["currency"], "kind": kind_}
+    return add_params_to_message(params, msg)
+
+
 def request_index(currency: str):
     # Sanitize input arguments
     data = sanitize(currency=currency)
@@ -70,28 +97,44 @@ def channel_orderbook(instrument: str,
                       interval: int = DEFAULT_INTERVAL,
                       group: int = None,
                       depth: int = None):
+    """
+    :param interval: 'raw' for every change (authenticated connections
+    only, without group nor depth), any other value for 100ms aggregates.
+    :return: (str) Order book channel of the instrument.
+    """
 
     # Sanitize input arguments
     data = sanitize(instrument=instrument, interval=interval,
                     group=group, depth=depth)
 
     # WARNING: For orderbook modification, the only supported
-    # interval is 100ms.
-    channel = build_channel(header=PUBLIC_CHANNELS.ORDERBOOK_UPDATES,
+    # intervals are raw and 100ms.
+    if data["interval"] == INTERVAL.RAW.value:
+        if data["group"] or data["depth"]:
+            raise ValueError("Raw order book channels cannot be grouped nor limited in depth.")
+        interval_ = INTERVAL.RAW.value
+    else:
+        interval_ = INTERVAL.STANDARD.value
+
+    channel = build_channel(header=PUBLIC_CHANNELS.ORDERBOOK_UPDATES.value,
                             instrument=data["instrument"],
                             group=data["group"],
                             depth=data["depth"],
-                            interval=INTERVAL.STANDARD)
+                            interval=interval_)
     return channel
 
 
 def channel_trades(instrument: str, interval: int = None):
+    """
+    :param interval: 'raw' for every trade (authenticated connections only).
+    :return: (str) Trades channel of the instrument.
+    """
 
     # Sanitize input arguments
     data = sanitize(instrument=instrument, interval=interval)
 
     # Get (clean) channel name
-    channel = build_channel(header=PUBLIC_CHANNELS.TRADES,
+    channel = build_channel(header=PUBLIC_CHANNELS.TRADES.value,
                             instrument=data["instrument"],
                             interval=data["interval"])
     return channel
@@ -106,3 +149,18 @@ def channel_quotes(instrument: str):
     channel = build_channel(header=PUBLIC_CHANNELS.QUOTES.value,
                             instrument=data["instrument"])
     return channel
+
+
+def channel_index(currency: str, quote: str = DEFAULT_INDEX_QUOTE):
+    """
+    :return: (str) Price index channel of the currency (e.g. 'deribit_price_index.btc_usd').
+    """
+    return build_channel(header=PUBLIC_CHANNELS.PRICE_INDEX.value,
+                         instrument=index_name(currency=currency, quote=quote))
+
+
+def index_name(currency: str, quote: str = DEFAULT_INDEX_QUOTE):
+
+    # Sanitize input arguments
+    data = sanitize(currency=currency)
+    return f"{data['currency']}_{quote.lower()}"
@@ -7,6 +7,9 @@ from source.features.common import message, add_params_to_message
 # ######################################################################
 
 METHOD_SUBSCRIBE = "public/subscribe"
+METHOD_PRIVATE_SUBSCRIBE = "private/subscribe"
+METHOD_UNSUBSCRIBE = "public/unsubscribe"
+METHOD_PRIVATE_UNSUBSCRIBE = "private/unsubscribe"
 
 METHOD_GET_TIME = "public/get_time"
 METHOD_TEST = "public/test"
@@ -57,6 +60,36 @@ def subscription_message(channels):
     return add_params_to_message(params, msg)
 
 
+def private_subscription_message(channels):
+
+    if not isinstance(channels, List):
+        channels = [channels]
+
+    msg = message(method=METHOD_PRIVATE_SUBSCRIBE)
+    params = {"channels": channels}
+    return add_params_to_message(params, msg)
+
+
+def unsubscription_message(channels):
+
+    if not isinstance(channels, List):
+        channels = [channels]
+
+    msg = message(method=METHOD_UNSUBSCRIBE)
+    params = {"channels": channels}
+    return add_params_to_message(params, msg)
+
+
+def private_unsubscription_message(channels):
+
+    if not isinstance(channels, List):
+        channels = [channels]
+
+    msg = message(method=METHOD_PRIVATE_UNSUBSCRIBE)
+    params = {"channels": channels}
+    return add_params_to_message(params, msg)
+
+
 
 
 
@@ -0,0 +1,67 @@
+import json
+import unittest
+
+from source.features.tickets import OrderTicket
+from source.features.trading import buy, sell, METHOD_BUY, METHOD_SELL
+
+
+class TestOrderTicket(unittest.TestCase):
+
+    def test_limit_frame_matches_the_order_message(self):
+        ticket = OrderTicket("buy", "btc-perpetual", time_in_force="good_til_cancelled", post_only=True)
+        id_, frame = ticket.frame(amount=10, price=50000.5)
+        msg = json.loads(frame)
+
+        expected = buy(instrument="BTC-PERPETUAL", amount=10, order_type="limit", limit_price=50000.5,
+                       time_in_force="good_til_cancelled", post_only=True)
+
+        self.assertEqual(msg["id"], id_)
+        self.assertEqual(msg["method"], METHOD_BUY)
+        self.assertEqual(msg["jsonrpc"], expected["jsonrpc"])
+        self.assertEqual(msg["params"], {k: v for (k, v) in expected["params"].items() if v})
+
+    def test_market_frame(self):
+        ticket = OrderTicket("SELL", "BTC-PERPETUAL", order_type="market", reduce_only=True)
+        msg = ticket.message(amount=20)
+
+        expected = sell(instrument="BTC-PERPETUAL", amount=20, order_type="market", reduce_only=True)
+        self.assertEqual(msg["method"], METHOD_SELL)
+        self.assertEqual(msg["params"], {k: v for (k, v) in expected["params"].items() if v})
+        self.assertNotIn("price", msg["params"])
+
+    def test_ids_are_unique(self):
+        ticket = OrderTicket("buy", "BTC-PERPETUAL")
+        ids = [ticket.frame(amount=10, price=1.0)[0] for _ in range(1000)]
+        self.assertEqual(len(set(ids)), 1000)
+
+    def test_labels(self):
+        ticket = OrderTicket("buy", "BTC-PERPETUAL", label="quote-")
+        self.assertEqual(ticket.message(amount=10, price=1.0)["params"]["label"], "quote-")
+        self.assertEqual(ticket.message(amount=10, price=1.0, label="7")["params"]["label"], "quote-7")
+
+        # Labels are escaped
+        ticket = OrderTicket("buy", "BTC-PERPETUAL")
+        self.assertEqual(ticket.message(amount=10, price=1.0, label='a"b')["params"]["label"], 'a"b')
+
+    def test_invalid_tickets(self):
+        with self.assertRaises(ValueError):
+            OrderTicket("hold", "BTC-PERPETUAL")
+        with self.assertRaises(ValueError):
+            OrderTicket("buy", "BTC-PERPETUAL", order_type="stop_limit")
+        with self.assertRaises(KeyError):
+            OrderTicket("buy", "BTC-PERPETUAL", order_type="market", post_only=True)
+
+    def test_invalid_orders(self):
+        limit = OrderTicket("buy", "BTC-PERPETUAL")
+        market = OrderTicket("buy", "BTC-PERPETUAL", order_type="market")
+
+        with self.assertRaises(KeyError):
+            limit.frame(amount=10)
+        with self.assertRaises(KeyError):
+            market.frame(amount=10, price=1.0)
+
+        for amount in [0, -10, float("nan"), float("inf")]:
+            with self.assertRaises(ValueError):
+                limit.frame(amount=amount, price=1.0)
+        with self.assertRaises(ValueError):
+            limit.frame(amount=10, price=-1.0)
@@ -1,3 +1,25 @@
-# import unittest
+import unittest
 
-# write tests
\ No newline at end of file
+import source.features.trading as trading
+
+
+class TestInstrumentParams(unittest.TestCase):
+    """
+    Instrument scoped requests name the instrument 'instrument_name'.
+    """
+
+    def test_open_orders_by_instrument(self):
+        msg = trading.open_orders_by_instrument(instrument="btc-perpetual")
+        self.assertEqual(msg["method"], trading.METHOD_OPEN_ORDERS_BY_INSTRUMENT)
+        self.assertEqual(msg["params"], {"instrument_name": "BTC-PERPETUAL", "type": "all"})
+
+    def test_user_trades_by_instrument(self):
+        msg = trading.user_trades_by_instrument(instrument="BTC-PERPETUAL")
+        self.assertEqual(msg["params"]["instrument_name"], "BTC-PERPETUAL")
+        self.assertNotIn("instrument", msg["params"])
+
+    def test_orders(self):
+        msg = trading.buy(instrument="BTC-PERPETUAL", amount=10, limit_price=50000.0)
+        self.assertEqual(msg["params"]["instrument_name"], "BTC-PERPETUAL")
+        self.assertEqual(msg["params"]["price"], 50000.0)
+        self.assertNotIn("instrument", msg["params"])
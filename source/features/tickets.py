@@ -0,0 +1,143 @@
+import json
+import math
+import itertools
+
+import source.features.trading as trading
+
+from source.utilities import generate_id
+from source.support.networking import *
+from source.support.sanitizers import sanitize
+from source.support.types import ORDER_TYPE
+
+# Methods of the ticket directions
+TICKET_METHODS = {"buy": trading.METHOD_BUY,
+                  "sell": trading.METHOD_SELL}
+
+# Stop orders need a stop price per order and cannot use tickets
+TICKET_ORDER_TYPES = [ORDER_TYPE.LIMIT.value, ORDER_TYPE.MARKET.value]
+
+
+# ######################################################################
+# ORDER TICKET
+# ######################################################################
+
+class OrderTicket(object):
+    """
+    Pre-validated order template for the lowest latency order entry path.
+    The static fields (direction, instrument, type, time in force, flags
+    and label prefix) are sanitized and encoded once: each order only
+    formats its amount, price and id into the pre-encoded frame, without
+    building, sanitizing or encoding a message.
+
+    Frames do not carry an access token: send them on an authenticated
+    connection (see 'DeribitConnection.submit').
+    """
+
+    def __init__(self,
+                 direction: str,
+                 instrument: str,
+                 order_type: str = None,
+                 time_in_force: str = None,
+                 post_only: bool = False,
+                 reduce_only: bool = False,
+                 label: str = None,
+                 max_show: float = None,
+                 vol_quote: bool = False):
+        """
+        :param direction: (str) Either buy or sell.
+        :param instrument: (str) Deribit instrument's name
+        :param order_type: (str) Order type. Either limit (default) or market.
+        :param time_in_force: (str) Time in force. Either GTC, FOK, IOC.
+        :param post_only: (bool) Only limit orders can be post only.
+        :param reduce_only: (bool) The orders are intended to only reduce a current position.
+        :param label: (str) Label of the orders, or prefix of the label given to each order.
+        :param max_show: Maximum amount to be shown to other customers. 0 is invisible order.
+        :param vol_quote: (bool) True to enter prices in vol (e.g. 1.0 for 100%).
+        """
+
+        if not direction or direction.lower() not in TICKET_METHODS:
+            raise ValueError(f"Invalid order direction received {direction}.")
+
+        if not instrument:
+            raise ValueError("An instrument is required for an order ticket.")
+
+        # Implement Deribit default behaviour
+        if not order_type:
+            order_type = ORDER_TYPE.LIMIT.value
+
+        data = sanitize(instrument=instrument,
+                        type=order_type,
+                        label=label,
+                        time_in_force=time_in_force,
+                        max_show=max_show,
+                        post_only=post_only,
+                        reduce_only=reduce_only,
+                        advanced=vol_quote)
+
+        if data["type"] not in TICKET_ORDER_TYPES:
+            raise ValueError(f"Order tickets only support limit and market orders, not {data['type']}.")
+
+        if data["post_only"] and data["type"] != ORDER_TYPE.LIMIT.value:
+            raise KeyError(f"Incoherent order. Post only requested, but order type is {data['type']}.")
+
+        params = {k: v for (k, v) in trading.order_params(data).items() if v}
+
+        self.direction = direction.lower()
+        self.method = TICKET_METHODS[self.direction]
+        self.instrument = params["instrument_name"]
+        self.order_type = params["type"]
+        self.label = params.pop("label", None)
+        self.params = params
+
+        # Pre-encoded frame: head + id + body + amount [+ price] [+ label] + end
+        static = json.dumps(params, separators=(",", ":"))[1:-1]
+        self.__head = json.dumps({PROTOCOL: PROTOCOL_VERSION, REQ_METHOD: self.method},
+                                 separators=(",", ":"))[:-1] + ',"id":"'
+        self.__body = f'","{REQ_PARAMS}":{{{static},"amount":'
+        self.__label = ',"label":' + json.dumps(self.label) if self.label else ""
+
+        self.__prefix = generate_id() + "."
+        self.__counter = itertools.count(1)
+
+    @property
+    def is_limit(self):
+        return self.order_type == ORDER_TYPE.LIMIT.value
+
+    def frame(self, amount: float, price: float = None, label: str = None):
+        """
+        :param amount: (float) Amount in USD for future or BTC (or ETH) for options
+        :param price: (float) Limit price, required for limit orders only.
+        :param label: (str) Appended to the label of the ticket.
+        :return: (tuple) Message id and encoded frame.
+        """
+
+        amount = float(amount)
+        if not amount > 0.0 or not math.isfinite(amount):
+            raise ValueError(f"Order amounts must be positive ({amount}).")
+
+        id_ = self.__prefix + str(next(self.__counter))
+        frame = self.__head + id_ + self.__body + repr(amount)
+
+        if self.is_limit:
+            if price is None:
+                raise KeyError("Limit price must be provided for limit orders.")
+            price = float(price)
+            if not price > 0.0 or not math.isfinite(price):
+                raise ValueError(f"Limit prices must be positive ({price}).")
+            frame += ',"price":' + repr(price)
+
+        elif price is not None:
+            raise KeyError(f"Incoherent order. Limit price provided, but order type is {self.order_type}.")
+
+        if label:
+            frame += ',"label":' + json.dumps((self.label or "") + label)
+        else:
+            frame += self.__label
+
+        return id_, frame + "}}"
+
+    def message(self, amount: float, price: float = None, label: str = None):
+        """
+        :return: (dict) The message of an order, decoded (e.g. to send it on a client).
+        """
+        return json.loads(self.frame(amount=amount, price=price, label=label)[1])
@@ -1,8 +1,9 @@
 from typing import Dict
 
 from source.support.sanitizers import sanitize
+from source.support.channel_name import build_channel
 from source.features.common import message, add_params_to_message
-from source.support.types import ORDER_TYPE
+from source.support.types import ORDER_TYPE, INTERVAL, PRIVATE_CHANNELS, ADVANCED_QUOTE_TYPE
 
 # ######################################################################
 # METHODS
@@ -14,6 +15,7 @@ METHOD_SELL = "private/sell"
 METHOD_CLOSE = "private/close_position"
 
 # Order cancellation
+METHOD_CANCEL = "private/cancel"
 METHOD_CANCEL_ALL = "private/cancel_all"
 METHOD_CANCEL_ALL_BY_CURRENCY = "private/cancel_all_by_currency"
 METHOD_CANCEL_ALL_BY_INSTRUMENT = "private/cancel_all_by_instrument"
@@ -29,6 +31,11 @@ METHOD_OPEN_ORDERS_BY_INSTRUMENT = "private/get_open_orders_by_instrument"
 # Trade history
 METHOD_USER_TRADES_BY_CURRENCY = "private/get_user_trades_by_currency"
 METHOD_USER_TRADES_BY_INSTRUMENT = "private/get_user_trades_by_instrument"
+METHOD_USER_TRADES_BY_CURRENCY_AND_TIME = "private/get_user_trades_by_currency_and_time"
+
+# Sanitized fields named differently in the API
+ORDER_PARAMS = {"instrument": "instrument_name",
+                "limit_price": "price"}
 
 
 # ######################################################################
@@ -86,8 +93,7 @@ def buy(instrument: str, amount: float, order_type: str = None, label: str = Non
 
     # Build basic message
     msg = message(method=METHOD_BUY)
-    params = {key: value for (key, value) in data.items()}
-    return add_params_to_message(params, msg)
+    return add_params_to_message(order_params(data), msg)
 
 
 def sell(instrument: str, amount: float, order_type: str = None, label: str = None,
@@ -129,7 +135,7 @@ def sell(instrument: str, amount: float, order_type: str = None, label: str = No
 
     # Asset the coherence of a limit order
     limit_price_ = None if "limit_price" not in data else data["limit_price"]
-    assert_limit_order_coherence(order_type=data["order_type"], limit_price=limit_price_)
+    assert_limit_order_coherence(order_type=data["type"], limit_price=limit_price_)
 
     # Asset the coherence of a stop order
     stop_price_ = None if "stop_price" not in data else data["stop_price"]
@@ -141,8 +147,7 @@ def sell(instrument: str, amount: float, order_type: str = None, label: str = No
 
     # Build basic message
     msg = message(method=METHOD_SELL)
-    params = {key: value for (key, value) in data.items()}
-    return add_params_to_message(params, msg)
+    return add_params_to_message(order_params(data), msg)
 
 
 def close(instrument: str, order_type: str = None, limit_price: float = None):
@@ -164,6 +169,23 @@ def close(instrument: str, order_type: str = None, limit_price: float = None):
 
     # Build basic message
     msg = message(method=METHOD_CLOSE)
+    return add_params_to_message(order_params(data), msg)
+
+
+def cancel(order_id: str):
+    """
+    Generates a 'cancellation' message for Deribit API for a single order.
+    :param order_id: (str) Deribit order id
+    :return: (dict) Message to be sent into the websocket.
+    """
+
+    if not order_id:
+        raise KeyError("An order id must be provided for cancellations.")
+
+    data = sanitize(order_id=order_id)
+
+    # Build basic message
+    msg = message(method=METHOD_CANCEL)
     params = {key: value for (key, value) in data.items()}
     return add_params_to_message(params, msg)
 
@@ -233,7 +255,7 @@ def margins(instrument: str, amount: float = None, price: float = None):
 
     # Build basic message
     msg = message(method=METHOD_MARGINS)
-    params = {key: value for (key, value) in data.items()}
+    params = {"instrument_name": data["instrument"], "amount": data["amount"], "price": data["price"]}
     return add_params_to_message(params, msg)
 
 
@@ -274,7 +296,7 @@ def open_orders_by_instrument(instrument: str, order_type: float = None):
 
     # Build basic message
     msg = message(method=METHOD_OPEN_ORDERS_BY_INSTRUMENT)
-    params = {key: value for (key, value) in data.items()}
+    params = {"instrument_name": data["instrument"], "type": data["type"]}
     return add_params_to_message(params, msg)
 
 
@@ -297,12 +319,40 @@ def user_trades_by_currency(currency: str, kind: str = None, count: int = None,
     return add_params_to_message(params, msg)
 
 
-def user_trades_by_instrument(instrument: str, count: int = None, include_old: bool = None):
+def user_trades_by_currency_and_time(currency: str, start_timestamp: int, end_timestamp: int,
+                                     kind: str = None, count: int = None, include_old: bool = False,
+                                     sorting: str = None):
+    """
+    Request the user_trades for a given currency within a time range.
+    :param currency: (str) Deribit instrument's name
+    :param start_timestamp: (int) The earliest timestamp to return results for (ms since epoch).
+    :param end_timestamp: (int) The most recent timestamp to return results for (ms since epoch).
+    :param kind: (str) Kind of instrument. Either 'future' or 'option'
+    :param count: (int) The number of old trades requested.
+    :param include_old: (bool) Retrieve trades that more than 7 days old.
+    :param sorting: (str) Direction of sorting. Either asc, desc or default.
+    :return: (dict) Message to be sent into the websocket.
+    """
+
+    data = sanitize(currency=currency, kind=kind, count=count, include_old=include_old)
+
+    # Build basic message
+    msg = message(method=METHOD_USER_TRADES_BY_CURRENCY_AND_TIME)
+    params = {key: value for (key, value) in data.items()}
+    params.update({"start_timestamp": start_timestamp, "end_timestamp": end_timestamp, "sorting": sorting})
+    return add_params_to_message(params, msg)
+
+
+def user_trades_by_instrument(instrument: str, count: int = None, include_old: bool = None,
+                              start_seq: int = None, end_seq: int = None, sorting: str = None):
     """
     Request all open user_trades for a given instrument.
     :param instrument: (str) Deribit instrument's name
     :param count: (int) The number of old trades requested.
     :param include_old: (bool) Retrieve trades that more than 7 days old.
+    :param start_seq: (int) The sequence number of the first trade to be returned.
+    :param end_seq: (int) The sequence number of the last trade to be returned.
+    :param sorting: (str) Direction of sorting. Either asc, desc or default.
     :return: (dict) Message to be sent into the websocket.
     """
 
@@ -310,13 +360,14 @@ def user_trades_by_instrument(instrument: str, count: int = None, include_old: b
 
     # Build basic message
     msg = message(method=METHOD_USER_TRADES_BY_INSTRUMENT)
-    params = {key: value for (key, value) in data.items()}
+    params = {"instrument_name": data["instrument"], "count": data["count"], "include_old": data["include_old"],
+              "start_seq": start_seq, "end_seq": end_seq, "sorting": sorting}
     return add_params_to_message(params, msg)
 
 
 def order_status(order_id: str):
     """
-    Generates a request for qn estimated margins for a trade.
+    Generates a request for the state of an order.
     :param order_id: (str) Deribit order id
     :return: (dict) Message to be sent into the websocket.
     """
@@ -324,11 +375,67 @@ def order_status(order_id: str):
     data = sanitize(order_id=order_id)
 
     # Build basic message
-    msg = message(method=METHOD_MARGINS)
+    msg = message(method=METHOD_ORDER_STATUS)
     params = {key: value for (key, value) in data.items()}
     return add_params_to_message(params, msg)
 
 
+# ######################################################################
+# CHANNELS
+# ######################################################################
+
+def channel_user_orders(currency: str = None, kind: str = None, instrument: str = None,
+                        interval: str = INTERVAL.RAW.value):
+    """
+    Channel name for the updates of the user's orders, either for a single
+    instrument or for all instruments of a kind in a currency.
+    """
+    return _user_channel(PRIVATE_CHANNELS.USER_ORDERS.value, currency, kind, instrument, interval)
+
+
+def channel_user_trades(currency: str = None, kind: str = None, instrument: str = None,
+                        interval: str = INTERVAL.RAW.value):
+    """
+    Channel name for the user's trades, either for a single instrument or
+    for all instruments of a kind in a currency.
+    """
+    return _user_channel(PRIVATE_CHANNELS.USER_TRADES.value, currency, kind, instrument, interval)
+
+
+def _user_channel(header, currency, kind, instrument, interval):
+
+    if instrument:
+        data = sanitize(instrument=instrument)
+        return build_channel(header=header, instrument=data["instrument"], interval=interval)
+
+    data = sanitize(currency=currency, kind=kind)
+    return build_channel(header=header, instrument=f"{data['kind']}.{data['currency']}", interval=interval)
+
+
+# ######################################################################
+# PARAMETERS
+# ######################################################################
+
+def order_params(data: Dict):
+    """
+    Maps sanitized order fields to the parameter names of the API
+    (e.g. 'instrument' -> 'instrument_name', 'limit_price' -> 'price').
+    The trigger is only kept for stop orders.
+    :param data: (dict) Output of 'sanitize'.
+    :return: (dict) Order parameters.
+    """
+
+    params = {ORDER_PARAMS.get(key, key): value for (key, value) in data.items()}
+
+    if "advanced" in params:
+        params["advanced"] = ADVANCED_QUOTE_TYPE.IMP_VOL.value if params["advanced"] else None
+
+    if params.get("type") not in [ORDER_TYPE.STOP_LIMIT.value, ORDER_TYPE.STOP_MARKET.value]:
+        params.pop("trigger", None)
+
+    return params
+
+
 # ######################################################################
 # ASSERTIONS
 # ######################################################################
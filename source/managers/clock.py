@@ -0,0 +1,136 @@
+import time
+import asyncio
+import logging
+
+import source.features.session as session
+
+from source.support.networking import *
+from source.support.settings import DERIBIT_WSS_URL
+from source.support.clock import ClockEstimator, CLOCK_FILTER_WINDOW
+from source.support.transport import TransportConfig
+from source.managers.common import SubscriptionManager, RECONNECT_DELAY
+
+CLOCK_SAMPLE_INTERVAL = 10.0
+
+# Samples taken on every (re)connection
+CLOCK_SYNC_BURST = 4
+
+
+# ######################################################################
+# CLOCK MANAGER
+# ######################################################################
+
+class ClockManager(SubscriptionManager):
+    """
+    Keeps the exchange clock offset and drift up to date by sampling
+    'public/get_time' on a persistent connection (a burst on every
+    (re)connection, then one sample per 'interval'). The server reception
+    and emission times ('usIn' / 'usOut') of each response are used to
+    remove the server processing time from the round trip.
+
+    Set it as a client's 'clock' to compute token lifespans in exchange time.
+    """
+
+    def __init__(self,
+                 interval: float = CLOCK_SAMPLE_INTERVAL,
+                 burst: int = CLOCK_SYNC_BURST,
+                 window: int = CLOCK_FILTER_WINDOW,
+                 url: str = DERIBIT_WSS_URL,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 transport: TransportConfig = None):
+
+        super().__init__(client=None,
+                         channels=[],
+                         private=False,
+                         url=url,
+                         reconnect_delay=reconnect_delay,
+                         transport=transport)
+
+        self.interval = interval
+        self.burst = burst
+        self.estimator = ClockEstimator(window=window)
+
+    # ##################################################################
+    # ESTIMATES
+    # ##################################################################
+
+    @property
+    def offset(self):
+        """
+        :return: (float) Exchange time minus local time, in seconds.
+        """
+        return self.estimator.offset_at(time.time())
+
+    @property
+    def drift(self):
+        """
+        :return: (float) Drift of the offset, in seconds per second.
+        """
+        return self.estimator.drift
+
+    @property
+    def error(self):
+        return self.estimator.error
+
+    def now_exchange(self):
+        return self.estimator.now_exchange()
+
+    def to_exchange(self, local_time: float):
+        return self.estimator.to_exchange(local_time)
+
+    def to_local(self, exchange_time: float):
+        return self.estimator.to_local(exchange_time)
+
+    # ##################################################################
+    # LIFECYCLE
+    # ##################################################################
+
+    async def run(self):
+
+        sampler = asyncio.ensure_future(self.__sample_forever())
+        try:
+            await super().run()
+        finally:
+            sampler.cancel()
+
+    async def __sample_forever(self):
+
+        while True:
+            await asyncio.sleep(self.interval)
+
+            if not self.is_ready:
+                continue
+
+            try:
+                await self.sample(self.connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.is_running:
+                    logging.warning(f"Clock sample failed ({e}).")
+
+    # ##################################################################
+    # SAMPLING
+    # ##################################################################
+
+    async def synchronize(self, connection):
+        for _ in range(self.burst):
+            await self.sample(connection)
+
+    async def sample(self, connection):
+
+        msg = session.get_time()
+
+        sent = time.time()
+        response = await connection.request(msg)
+        received = time.time()
+
+        if RESP_ERROR in response:
+            raise Exception(f"Server time request failed ({response[RESP_ERROR]}).")
+
+        if RESP_TS_IN in response and RESP_TS_OUT in response:
+            server_in, server_out = response[RESP_TS_IN] / 1e6, response[RESP_TS_OUT] / 1e6
+        else:
+            server_in = server_out = response[RESP_CONTENT] / 1e3
+
+        self.estimator.add_sample(sent, received, server_in, server_out)
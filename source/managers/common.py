@@ -0,0 +1,172 @@
+import asyncio
+import logging
+
+from typing import List
+
+import source.features.session as session
+
+from source.support.networking import *
+from source.support.settings import DERIBIT_WSS_URL
+from source.support.transport import TransportConfig
+from source.clients.connection import DeribitConnection
+from source.support.metrics import RECONNECTS
+
+RECONNECT_DELAY = 1.0
+
+
+# ######################################################################
+# SUBSCRIPTION MANAGER
+# ######################################################################
+
+class SubscriptionManager(object):
+    """
+    Base class for the services keeping a local state up to date from
+    Deribit subscriptions. 'run' keeps a connection open (reconnecting when
+    it drops), subscribes to the channels and calls 'synchronize' so the
+    subclass can reconcile with a snapshot. Notifications received while
+    synchronizing are buffered and replayed once the snapshot is applied.
+    """
+
+    def __init__(self,
+                 client=None,
+                 channels: List[str] = None,
+                 private: bool = True,
+                 url: str = DERIBIT_WSS_URL,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 transport: TransportConfig = None):
+
+        if private and not client:
+            raise Exception("A client with credentials is required for private subscriptions.")
+
+        self.client = client
+        self.channels = list(channels or [])
+        self.private = private
+        self.reconnect_delay = reconnect_delay
+
+        # The transport settings carry their own url
+        self.transport = transport or TransportConfig(url=url)
+
+        self.__connection = None
+        self.__is_running = False
+        self.__is_synchronizing = False
+        self.__buffer = []
+        self.__ready = None
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def connection(self):
+        return self.__connection
+
+    @property
+    def is_running(self):
+        return self.__is_running
+
+    @property
+    def is_ready(self):
+        return self.__ready is not None and self.__ready.is_set()
+
+    # ##################################################################
+    # LIFECYCLE
+    # ##################################################################
+
+    async def run(self):
+
+        self.__is_running = True
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
+
+        while self.__is_running:
+            try:
+                async with DeribitConnection(client=self.client,
+                                             transport=self.transport,
+                                             notification_handler=self.__on_message) as connection:
+                    self.__connection = connection
+                    await self.__start_session(connection)
+                    await connection.wait_closed()
+
+            except asyncio.CancelledError:
+                self.__is_running = False
+                raise
+
+            except Exception as e:
+                logging.warning(f"{type(self).__name__} connection failed ({e}).")
+
+            finally:
+                self.__connection = None
+                self.__is_synchronizing = False
+                self.__buffer = []
+                if self.__ready is not None:
+                    self.__ready.clear()
+
+            if self.__is_running:
+                RECONNECTS.labels(type(self).__name__).inc()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def stop(self):
+        self.__is_running = False
+        if self.__connection is not None:
+            await self.__connection.close()
+
+    async def wait_ready(self):
+        if self.__ready is None:
+            self.__ready = asyncio.Event()
+        await self.__ready.wait()
+
+    async def __start_session(self, connection):
+
+        if self.private:
+            await connection.authenticate()
+
+        # Buffer notifications until the snapshot is applied
+        self.__is_synchronizing = True
+
+        if self.channels:
+            if self.private:
+                msg = session.private_subscription_message(channels=self.channels)
+            else:
+                msg = session.subscription_message(channels=self.channels)
+
+            response = await connection.request(msg)
+            if RESP_ERROR in response:
+                raise Exception(f"Subscription failed ({response[RESP_ERROR]}).")
+
+        await self.synchronize(connection)
+
+        # Replay the buffered notifications
+        buffer, self.__buffer = self.__buffer, []
+        self.__is_synchronizing = False
+        for (channel, data) in buffer:
+            self.on_notification(channel, data)
+
+        self.__ready.set()
+
+    # ##################################################################
+    # NOTIFICATIONS
+    # ##################################################################
+
+    def __on_message(self, msg):
+
+        if msg.get(REQ_METHOD) != NOTIF_METHOD:
+            return
+
+        params = msg.get(REQ_PARAMS, {})
+        channel, data = params.get(NOTIF_CHANNEL), params.get(NOTIF_DATA)
+
+        if self.__is_synchronizing:
+            self.__buffer.append((channel, data))
+            return
+
+        self.on_notification(channel, data)
+
+    # ##################################################################
+    # DELEGATES
+    # ##################################################################
+
+    async def synchronize(self, connection):
+        pass
+
+    def on_notification(self, channel, data):
+        pass
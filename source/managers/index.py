@@ -0,0 +1,183 @@
+import time
+import asyncio
+import logging
+
+from collections import namedtuple
+from typing import List
+
+import source.features.data as data
+
+from source.events import sig_index_level_updated
+from source.support.networking import *
+from source.support.settings import DEFAULT_CURRENCY, DERIBIT_WSS_URL
+from source.clients.connection import DeribitConnection
+from source.support.transport import TransportConfig
+from source.managers.common import SubscriptionManager, RECONNECT_DELAY
+
+# Seconds without an index update before the level is polled
+INDEX_MAX_AGE = 5.0
+INDEX_POLL_INTERVAL = 1.0
+
+# timestamp: exchange time (ms), received: local time (time.time)
+IndexLevel = namedtuple("IndexLevel", ["currency", "price", "timestamp", "received"])
+
+
+# ######################################################################
+# INDEX MANAGER
+# ######################################################################
+
+class IndexManager(SubscriptionManager):
+    """
+    Local cache of the Deribit price indices, kept up to date from the
+    public 'deribit_price_index' channels. Reads are dictionary lookups.
+    Every level carries its exchange timestamp and local reception time;
+    levels older than 'max_age' are refreshed with 'public/get_index'
+    until the stream catches up. Each new level is sent as an IndexLevel
+    with 'sig_index_level_updated'.
+    """
+
+    def __init__(self,
+                 client=None,
+                 currencies: List[str] = None,
+                 max_age: float = INDEX_MAX_AGE,
+                 poll_interval: float = INDEX_POLL_INTERVAL,
+                 url: str = DERIBIT_WSS_URL,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 transport: TransportConfig = None):
+
+        self.currencies = [c.lower() for c in (currencies or [DEFAULT_CURRENCY])]
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+
+        # Index name (e.g. 'btc_usd') -> currency
+        self.__names = {data.index_name(currency=cur): cur for cur in self.currencies}
+
+        super().__init__(client=client,
+                         channels=[data.channel_index(currency=cur) for cur in self.currencies],
+                         private=False,
+                         url=url,
+                         reconnect_delay=reconnect_delay,
+                         transport=transport)
+
+        self.__levels = {}
+
+        # Statistics
+        self.updates = 0
+        self.polls = 0
+
+    # ##################################################################
+    # LOCAL READS
+    # ##################################################################
+
+    def level(self, currency: str = DEFAULT_CURRENCY):
+        return self.__levels.get(currency.lower())
+
+    def price(self, currency: str = DEFAULT_CURRENCY):
+        level = self.__levels.get(currency.lower())
+        return level.price if level else None
+
+    def age(self, currency: str = DEFAULT_CURRENCY):
+        """
+        :return: (float) Seconds since the last update of the currency, None if never received.
+        """
+        level = self.__levels.get(currency.lower())
+        return time.time() - level.received if level else None
+
+    def is_stale(self, currency: str = DEFAULT_CURRENCY):
+        age = self.age(currency)
+        return age is None or age > self.max_age
+
+    def levels(self):
+        return dict(self.__levels)
+
+    # ##################################################################
+    # LIFECYCLE
+    # ##################################################################
+
+    async def run(self):
+
+        poller = asyncio.ensure_future(self.__poll_forever())
+        try:
+            await super().run()
+        finally:
+            poller.cancel()
+
+    # ##################################################################
+    # SYNCHRONIZATION
+    # ##################################################################
+
+    async def synchronize(self, connection):
+        await self.poll(self.currencies, connection)
+
+    async def poll(self, currencies: List[str] = None, connection=None):
+        """
+        Requests the index of the currencies with 'public/get_index', on the
+        manager's connection or, when disconnected, on a temporary one.
+        """
+
+        currencies = [c.lower() for c in (currencies or self.currencies)]
+
+        if connection is None or not connection.is_open:
+            async with DeribitConnection(transport=self.transport) as temporary:
+                return await self.poll(currencies, temporary)
+
+        futures = await connection.pipeline([data.request_index(currency=cur) for cur in currencies])
+
+        for (cur, future) in zip(currencies, futures):
+            response = await future
+            if RESP_ERROR in response:
+                raise Exception(f"Index request failed ({response[RESP_ERROR]}).")
+
+            price = response[RESP_CONTENT].get(cur.upper())
+            if price is None:
+                continue
+
+            # The response is stamped with the server time in microseconds
+            timestamp = response.get(RESP_TS_OUT, time.time() * 1e6) // 1000
+            self.apply_level(cur, price, timestamp)
+
+        self.polls += 1
+
+    async def __poll_forever(self):
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+
+            stale = [cur for cur in self.currencies if self.is_stale(cur)]
+            if not stale:
+                continue
+
+            try:
+                logging.debug(f"Polling stale index levels {stale}.")
+                await self.poll(stale, self.connection if self.is_ready else None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Index poll failed ({e}).")
+
+    # ##################################################################
+    # NOTIFICATIONS
+    # ##################################################################
+
+    def on_notification(self, channel, data):
+
+        if not data:
+            return
+
+        currency = self.__names.get(data.get("index_name"))
+        if currency is None:
+            return
+
+        self.apply_level(currency, data["price"], data["timestamp"])
+
+    def apply_level(self, currency: str, price: float, timestamp: int):
+
+        # Polled levels may be older than streamed ones
+        current = self.__levels.get(currency)
+        if current is not None and timestamp < current.timestamp:
+            return
+
+        level = IndexLevel(currency, price, timestamp, time.time())
+        self.__levels[currency] = level
+        self.updates += 1
+        sig_index_level_updated.send(data=level)
@@ -0,0 +1,272 @@
+import math
+import time
+import asyncio
+import logging
+
+from typing import List, Tuple
+
+import source.features.data as data
+import source.features.trading as trading
+
+from source.support.networking import *
+from source.support.settings import DERIBIT_WSS_URL
+from source.support.transport import TransportConfig
+from source.clients.connection import DeribitConnection
+
+# Relative width of the amount and price buckets
+MARGIN_AMOUNT_BUCKET = 0.01
+MARGIN_PRICE_BUCKET = 0.001
+
+MARGIN_CACHE_TTL = 1.0
+
+# Seconds estimates are collected for before being sent together
+MARGIN_BATCH_WINDOW = 0.0
+
+
+# ######################################################################
+# MARGIN ESTIMATOR
+# ######################################################################
+
+class MarginEstimator(object):
+    """
+    Estimates order margins ('private/get_margins') for pre-trade checks.
+    Amounts and prices are rounded to relative buckets, and the estimates
+    are memoized per (instrument, amount bucket, price bucket) for a short
+    time. Concurrent estimates are batched and pipelined on a single
+    authenticated connection, and identical ones share a single request.
+    The estimate of a bucket is requested for its central amount and price,
+    rounded to the amount step and tick size of the instrument (fetched
+    once per instrument, in the batch of its first estimate): set the
+    buckets to 0 to send the exact amounts and prices.
+    """
+
+    def __init__(self,
+                 client,
+                 amount_bucket: float = MARGIN_AMOUNT_BUCKET,
+                 price_bucket: float = MARGIN_PRICE_BUCKET,
+                 ttl: float = MARGIN_CACHE_TTL,
+                 batch_window: float = MARGIN_BATCH_WINDOW,
+                 url: str = DERIBIT_WSS_URL,
+                 transport: TransportConfig = None):
+
+        self.client = client
+        self.amount_bucket = amount_bucket
+        self.price_bucket = price_bucket
+        self.ttl = ttl
+        self.batch_window = batch_window
+
+        # The transport settings carry their own url
+        self.transport = transport or TransportConfig(url=url)
+
+        self.__connection = None
+        self.__lock = None
+
+        # key -> (expiry, estimate)
+        self.__memo = {}
+
+        # instrument -> (amount step, tick size)
+        self.__specs = {}
+
+        # key -> future, for the estimates requested or waiting for a batch
+        self.__in_flight = {}
+        self.__batch = []
+        self.__flush = None
+
+        # Statistics
+        self.estimates = 0
+        self.hits = 0
+        self.requests = 0
+        self.batches = 0
+
+    # ##################################################################
+    # BUCKETS
+    # ##################################################################
+
+    def key(self, instrument: str, amount: float, price: float):
+        return (instrument.upper(),
+                _bucket(amount, self.amount_bucket),
+                _bucket(price, self.price_bucket))
+
+    def bucketed(self, amount: float, price: float, amount_step: float = None, tick_size: float = None):
+        """
+        :param amount_step: (float) Amounts are multiples of it (e.g. the instrument's minimum trade amount).
+        :param tick_size: (float) Prices are multiples of it.
+        :return: (tuple) Amount and price actually sent for an estimate.
+        """
+        return self.__sent(_bucket(amount, self.amount_bucket), _bucket(price, self.price_bucket),
+                           amount_step, tick_size)
+
+    def specs(self, instrument: str):
+        """
+        :return: (tuple) Amount step and tick size of an instrument, None if not fetched yet.
+        """
+        return self.__specs.get(instrument.upper())
+
+    def __sent(self, amount_bucket, price_bucket, amount_step, tick_size):
+        amount = _bucket_value(amount_bucket, self.amount_bucket)
+        price = _bucket_value(price_bucket, self.price_bucket)
+        return _snap(amount, amount_step, minimum=amount_step), _snap(price, tick_size)
+
+    # ##################################################################
+    # ESTIMATES
+    # ##################################################################
+
+    async def estimate(self, instrument: str, amount: float, price: float):
+        """
+        :return: (dict) Result of 'private/get_margins' (buy, sell, max and min prices).
+        """
+
+        self.estimates += 1
+        key = self.key(instrument, amount, price)
+
+        memo = self.__memo.get(key)
+        if memo is not None and memo[0] > time.monotonic():
+            self.hits += 1
+            return memo[1]
+
+        future = self.__in_flight.get(key)
+        if future is None:
+            future = asyncio.get_event_loop().create_future()
+            self.__in_flight[key] = future
+            self.__batch.append((key, future))
+            if self.__flush is None:
+                self.__flush = asyncio.ensure_future(self.__send_batch())
+        else:
+            self.hits += 1
+
+        return await asyncio.shield(future)
+
+    async def estimate_many(self, orders: List[Tuple[str, float, float]]):
+        """
+        :param orders: (list) (instrument, amount, price) tuples.
+        :return: (list) Estimates (or exceptions) in the order of the orders.
+        """
+        return await asyncio.gather(*[self.estimate(*order) for order in orders], return_exceptions=True)
+
+    def invalidate(self):
+        self.__memo.clear()
+
+    async def __send_batch(self):
+
+        # Let the concurrent callers join the batch
+        await asyncio.sleep(self.batch_window)
+
+        batch, self.__batch, self.__flush = self.__batch, [], None
+
+        # Forget the expired estimates
+        now = time.monotonic()
+        for key in [k for (k, (expiry, _)) in self.__memo.items() if expiry <= now]:
+            del self.__memo[key]
+
+        try:
+            connection = await self.connection()
+            await self.__fetch_specs(connection, {key[0] for (key, _) in batch})
+
+            messages = []
+            for ((instrument, amount_bucket, price_bucket), _) in batch:
+                (amount, price) = self.__sent(amount_bucket, price_bucket, *self.__specs[instrument])
+                messages.append(trading.margins(instrument=instrument, amount=amount, price=price))
+
+            futures = await connection.pipeline(messages, auth_required=True)
+            self.requests += len(messages)
+            self.batches += 1
+
+            for ((key, future), response) in zip(batch, futures):
+                self.__resolve(key, future, response)
+
+        except Exception as e:
+            logging.warning(f"Margin estimates failed ({e}).")
+            for (key, future) in batch:
+                self.__in_flight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+
+    async def __fetch_specs(self, connection, instruments):
+
+        missing = [ins for ins in instruments if ins not in self.__specs]
+        if not missing:
+            return
+
+        futures = await connection.pipeline([data.request_instrument(ins) for ins in missing])
+        for (instrument, response) in zip(missing, await asyncio.gather(*futures)):
+            if RESP_ERROR in response:
+                raise Exception(f"Unknown instrument {instrument} ({response[RESP_ERROR]}).")
+            spec = response[RESP_CONTENT]
+            self.__specs[instrument] = (spec.get("min_trade_amount") or spec.get("contract_size"),
+                                        spec.get("tick_size"))
+
+    def __resolve(self, key, future, response):
+
+        def _done(f):
+            self.__in_flight.pop(key, None)
+            if future.done():
+                return
+            if f.exception() is not None:
+                future.set_exception(f.exception())
+                return
+            result = f.result()
+            if RESP_ERROR in result:
+                future.set_exception(Exception(f"Margin estimate failed ({result[RESP_ERROR]})."))
+                future.exception()
+                return
+            self.__memo[key] = (time.monotonic() + self.ttl, result[RESP_CONTENT])
+            future.set_result(result[RESP_CONTENT])
+
+        response.add_done_callback(_done)
+
+    # ##################################################################
+    # CONNECTION
+    # ##################################################################
+
+    async def connection(self):
+        """
+        :return: (DeribitConnection) The open, authenticated connection.
+        """
+
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+
+        async with self.__lock:
+            if self.__connection is None or not self.__connection.is_open:
+                self.__connection = DeribitConnection(client=self.client, transport=self.transport)
+                await self.__connection.open(authenticate=True)
+
+        return self.__connection
+
+    async def close(self):
+        if self.__connection is not None:
+            await self.__connection.close()
+            self.__connection = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+# ######################################################################
+# PRIVATE METHODS
+# ######################################################################
+
+def _bucket(value: float, width: float):
+    # Logarithmic buckets: a constant relative width at every scale
+    value = float(value)
+    if value <= 0.0 or width <= 0.0:
+        return value
+    return round(math.log(value) / math.log1p(width))
+
+
+def _bucket_value(bucket, width: float):
+    if width <= 0.0 or isinstance(bucket, float):
+        return bucket
+    return round(math.exp(bucket * math.log1p(width)), 10)
+
+
+def _snap(value: float, step: float, minimum: float = None):
+    # Nearest multiple of the step (exact values of the exchange, e.g. 49990.5 and not 49990.64)
+    if not step or step <= 0.0:
+        return value
+    value = round(round(value / step) * step, 10)
+    return max(value, minimum) if minimum else value
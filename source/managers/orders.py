@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from typing import List
+
+import source.features.trading as trading
+
+from source.events import sig_order_updated, sig_user_trade_received
+from source.support.networking import *
+from source.support.settings import DEFAULT_CURRENCY, DERIBIT_WSS_URL
+from source.support.types import ORDER_STATE, PRIVATE_CHANNELS
+from source.support.transport import TransportConfig
+from source.managers.common import SubscriptionManager, RECONNECT_DELAY
+
+CLOSED_ORDERS_CAPACITY = 1000
+
+OPEN_STATES = [ORDER_STATE.OPEN.value, ORDER_STATE.UNTRIGGERED.value]
+
+
+# ######################################################################
+# ORDER MANAGER
+# ######################################################################
+
+class OrderManager(SubscriptionManager):
+    """
+    Local book of the user's orders, fed by the private 'user.orders' and
+    'user.trades' channels. Open orders are indexed by id, label and
+    instrument; a bounded number of closed orders is kept for lookups.
+    The book is reconciled with a single open orders snapshot on every
+    (re)connection.
+    """
+
+    def __init__(self,
+                 client,
+                 currencies: List[str] = None,
+                 kind: str = None,
+                 instruments: List[str] = None,
+                 closed_capacity: int = CLOSED_ORDERS_CAPACITY,
+                 url: str = DERIBIT_WSS_URL,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 transport: TransportConfig = None):
+
+        # Default to the whole currency when no instrument is provided
+        if not currencies and not instruments:
+            currencies = [DEFAULT_CURRENCY]
+
+        self.currencies = list(currencies or [])
+        self.kind = kind
+        self.instruments = list(instruments or [])
+
+        channels = []
+        for ins in self.instruments:
+            channels.append(trading.channel_user_orders(instrument=ins))
+            channels.append(trading.channel_user_trades(instrument=ins))
+        for cur in self.currencies:
+            channels.append(trading.channel_user_orders(currency=cur, kind=kind))
+            channels.append(trading.channel_user_trades(currency=cur, kind=kind))
+
+        super().__init__(client=client,
+                         channels=channels,
+                         private=True,
+                         url=url,
+                         reconnect_delay=reconnect_delay,
+                         transport=transport)
+
+        # Open orders and their indexes
+        self.__orders = {}
+        self.__by_label = {}
+        self.__by_instrument = {}
+
+        # Recently closed orders and trades per order
+        self.__closed = OrderedDict()
+        self.__closed_capacity = closed_capacity
+        self.__trades = OrderedDict()
+
+    # ##################################################################
+    # LOCAL READS
+    # ##################################################################
+
+    def order(self, order_id: str):
+        if order_id in self.__orders:
+            return self.__orders[order_id]
+        return self.__closed.get(order_id)
+
+    def open_orders(self):
+        return list(self.__orders.values())
+
+    def open_orders_by_label(self, label: str):
+        return [self.__orders[i] for i in self.__by_label.get(label, ())]
+
+    def open_orders_by_instrument(self, instrument: str):
+        return [self.__orders[i] for i in self.__by_instrument.get(instrument.upper(), ())]
+
+    def trades(self, order_id: str):
+        return list(self.__trades.get(order_id, []))
+
+    def is_open(self, order_id: str):
+        return order_id in self.__orders
+
+    # ##################################################################
+    # SYNCHRONIZATION
+    # ##################################################################
+
+    async def synchronize(self, connection):
+
+        messages = [trading.open_orders_by_instrument(instrument=ins) for ins in self.instruments]
+        messages += [trading.open_orders_by_currency(currency=cur, kind=self.kind) for cur in self.currencies]
+
+        futures = await connection.pipeline(messages, auth_required=True)
+
+        snapshot = {}
+        for future in futures:
+            response = await future
+            if RESP_ERROR in response:
+                raise Exception(f"Open orders snapshot failed ({response[RESP_ERROR]}).")
+            for order in response[RESP_CONTENT]:
+                snapshot[order["order_id"]] = order
+
+        # Orders missing from the snapshot were closed while disconnected
+        for order_id in list(self.__orders):
+            if order_id not in snapshot:
+                self.__close(self.__orders[order_id])
+
+        for order in snapshot.values():
+            self.__store(order)
+
+    # ##################################################################
+    # NOTIFICATIONS
+    # ##################################################################
+
+    def on_notification(self, channel, data):
+
+        if not channel:
+            return
+
+        updates = data if isinstance(data, list) else [data]
+
+        if channel.startswith(PRIVATE_CHANNELS.USER_ORDERS.value):
+            for order in updates:
+                self.apply_order(order)
+
+        elif channel.startswith(PRIVATE_CHANNELS.USER_TRADES.value):
+            for trade in updates:
+                self.apply_trade(trade)
+
+    def apply_order(self, order):
+
+        current = self.order(order["order_id"])
+        if current and current.get("last_update_timestamp", 0) > order.get("last_update_timestamp", 0):
+            return
+
+        if order.get("order_state") in OPEN_STATES:
+            self.__store(order)
+        else:
+            self.__close(order)
+
+        sig_order_updated.send(data=order)
+
+    def apply_trade(self, trade):
+
+        # Trades may arrive before the order update, so keep them anyway
+        order_id = trade.get("order_id")
+        trades = self.__trades.setdefault(order_id, [])
+        if all(t.get("trade_id") != trade.get("trade_id") for t in trades):
+            trades.append(trade)
+
+        while len(self.__trades) > self.__closed_capacity + len(self.__orders):
+            self.__trades.popitem(last=False)
+
+        sig_user_trade_received.send(data=trade)
+
+    # ##################################################################
+    # INDEXES
+    # ##################################################################
+
+    def __store(self, order):
+
+        order_id = order["order_id"]
+        if order_id in self.__orders:
+            self.__unindex(self.__orders[order_id])
+
+        self.__closed.pop(order_id, None)
+        self.__orders[order_id] = order
+
+        if order.get("label"):
+            self.__by_label.setdefault(order["label"], set()).add(order_id)
+        self.__by_instrument.setdefault(order["instrument_name"], set()).add(order_id)
+
+    def __close(self, order):
+
+        order_id = order["order_id"]
+        if order_id in self.__orders:
+            self.__unindex(self.__orders.pop(order_id))
+
+        self.__closed[order_id] = order
+        self.__closed.move_to_end(order_id)
+
+        while len(self.__closed) > self.__closed_capacity:
+            old_id, _ = self.__closed.popitem(last=False)
+            self.__trades.pop(old_id, None)
+
+    def __unindex(self, order):
+
+        order_id = order["order_id"]
+        for (index, key) in [(self.__by_label, order.get("label")),
+                             (self.__by_instrument, order.get("instrument_name"))]:
+            ids = index.get(key)
+            if ids is None:
+                continue
+            ids.discard(order_id)
+            if not ids:
+                del index[key]
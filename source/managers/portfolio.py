@@ -0,0 +1,167 @@
+import time
+
+from typing import List
+
+import source.features.account as account
+
+from source.events import sig_position_updated, sig_portfolio_updated
+from source.support.networking import *
+from source.support.settings import DEFAULT_CURRENCY, DERIBIT_WSS_URL
+from source.support.types import PRIVATE_CHANNELS
+from source.support.transport import TransportConfig
+from source.managers.common import SubscriptionManager, RECONNECT_DELAY
+
+
+# ######################################################################
+# PORTFOLIO MANAGER
+# ######################################################################
+
+class PortfolioManager(SubscriptionManager):
+    """
+    Local copy of the user's positions and account summaries. Seeded
+    from 'private/get_positions' and 'private/get_account_summary' on
+    every (re)connection, then kept up to date from the 'user.changes'
+    and 'user.portfolio' channels. All reads are dictionary lookups.
+    """
+
+    def __init__(self,
+                 client,
+                 currencies: List[str] = None,
+                 kind: str = None,
+                 url: str = DERIBIT_WSS_URL,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 transport: TransportConfig = None):
+
+        self.currencies = [c.lower() for c in (currencies or [DEFAULT_CURRENCY])]
+        self.kind = kind
+
+        channels = []
+        for cur in self.currencies:
+            channels.append(account.channel_user_changes(currency=cur, kind=kind))
+            channels.append(account.channel_user_portfolio(currency=cur))
+
+        super().__init__(client=client,
+                         channels=channels,
+                         private=True,
+                         url=url,
+                         reconnect_delay=reconnect_delay,
+                         transport=transport)
+
+        # Positions by instrument, summaries by currency
+        self.__positions = {}
+        self.__summaries = {}
+        self.__updated = {}
+
+    # ##################################################################
+    # LOCAL READS
+    # ##################################################################
+
+    def position(self, instrument: str):
+        return self.__positions.get(instrument.upper())
+
+    def positions(self, currency: str = None):
+        if not currency:
+            return list(self.__positions.values())
+        prefix = currency.upper() + "-"
+        return [p for (k, p) in self.__positions.items() if k.startswith(prefix)]
+
+    def size(self, instrument: str):
+        position = self.position(instrument)
+        return position.get("size", 0.0) if position else 0.0
+
+    def summary(self, currency: str = DEFAULT_CURRENCY):
+        return self.__summaries.get(currency.lower())
+
+    def equity(self, currency: str = DEFAULT_CURRENCY):
+        return self.__summary_field(currency, "equity")
+
+    def balance(self, currency: str = DEFAULT_CURRENCY):
+        return self.__summary_field(currency, "balance")
+
+    def available_funds(self, currency: str = DEFAULT_CURRENCY):
+        return self.__summary_field(currency, "available_funds")
+
+    def initial_margin(self, currency: str = DEFAULT_CURRENCY):
+        return self.__summary_field(currency, "initial_margin")
+
+    def maintenance_margin(self, currency: str = DEFAULT_CURRENCY):
+        return self.__summary_field(currency, "maintenance_margin")
+
+    def last_update(self, currency: str = DEFAULT_CURRENCY):
+        """
+        :return: (float) Local time (time.time) of the last update received for the currency.
+        """
+        return self.__updated.get(currency.lower())
+
+    def __summary_field(self, currency, field):
+        summary = self.__summaries.get(currency.lower())
+        if summary is None:
+            return None
+        return summary.get(field)
+
+    # ##################################################################
+    # SYNCHRONIZATION
+    # ##################################################################
+
+    async def synchronize(self, connection):
+
+        positions = [account.get_all_positions(currency=cur, kind=self.kind) for cur in self.currencies]
+        summaries = [account.get_account_summary(currency=cur) for cur in self.currencies]
+
+        futures = await connection.pipeline(positions + summaries, auth_required=True)
+
+        responses = []
+        for future in futures:
+            response = await future
+            if RESP_ERROR in response:
+                raise Exception(f"Portfolio snapshot failed ({response[RESP_ERROR]}).")
+            responses.append(response[RESP_CONTENT])
+
+        n = len(self.currencies)
+        now = time.time()
+
+        # Replace the positions of the synchronized currencies
+        for cur in self.currencies:
+            prefix = cur.upper() + "-"
+            for k in [k for k in self.__positions if k.startswith(prefix)]:
+                del self.__positions[k]
+
+        for result in responses[:n]:
+            for position in result:
+                self.__positions[position["instrument_name"]] = position
+
+        for (cur, summary) in zip(self.currencies, responses[n:]):
+            self.__summaries[cur] = summary
+            self.__updated[cur] = now
+
+    # ##################################################################
+    # NOTIFICATIONS
+    # ##################################################################
+
+    def on_notification(self, channel, data):
+
+        if not channel or not data:
+            return
+
+        if channel.startswith(PRIVATE_CHANNELS.USER_CHANGES.value):
+            for position in data.get("positions", []):
+                self.apply_position(position)
+
+        elif channel.startswith(PRIVATE_CHANNELS.USER_PORTFOLIO.value):
+            self.apply_portfolio(data)
+
+    def apply_position(self, position):
+
+        self.__positions[position["instrument_name"]] = position
+        self.__updated[position["instrument_name"].split("-")[0].lower()] = time.time()
+        sig_position_updated.send(data=position)
+
+    def apply_portfolio(self, portfolio):
+
+        currency = portfolio.get("currency", "").lower()
+        summary = self.__summaries.setdefault(currency, {})
+
+        # Portfolio pushes carry a subset of the account summary fields
+        summary.update(portfolio)
+        self.__updated[currency] = time.time()
+        sig_portfolio_updated.send(data=summary)
@@ -0,0 +1,427 @@
+import time
+import logging
+import threading
+
+from typing import Callable, List
+
+from source.support.decoding import extract_channel
+from source.support.transport import TransportConfig
+from source.support.metrics import SHARD_CHANNELS, SHARD_MESSAGE_RATE
+from source.clients.websocket_client import DeribitChannelClient
+
+# Balancing policies
+BALANCE_BY_RATE = "rate"
+BALANCE_BY_COUNT = "count"
+
+SHARD_COUNT = 4
+SHARD_MAX_CHANNELS = 500
+
+# Rebalancing
+REBALANCE_INTERVAL = 30.0
+REBALANCE_THRESHOLD = 1.5
+REBALANCE_MAX_MOVES = 50
+
+# Weight of the last interval in the message rate estimates
+RATE_SMOOTHING = 0.5
+
+
+# ######################################################################
+# SHARDED SUBSCRIPTION MANAGER
+# ######################################################################
+
+class ShardedSubscriptionManager(object):
+    """
+    Spreads channel subscriptions across a pool of connections (shards),
+    each a DeribitChannelClient with its own reading thread, and merges
+    their notifications into a single stream: 'message_handler' receives
+    (ws, message) as from a single DeribitChannelClient, never from two
+    threads at once (unless 'serialize' is False).
+
+    New channels go to the least loaded shard, by message rate or by
+    channel count (see the BALANCE_* policies), within 'max_channels' per
+    connection. 'rebalance' (run every 'rebalance_interval' seconds) moves
+    channels off the hottest shard when its load exceeds 'threshold' times
+    the mean. Moves are make-before-break: the channel is subscribed on
+    its new shard, and the stream switches to it once the subscription is
+    confirmed, before the old subscription is dropped.
+    """
+
+    def __init__(self,
+                 message_handler: Callable = None,
+                 shards: int = SHARD_COUNT,
+                 policy: str = BALANCE_BY_RATE,
+                 max_channels: int = SHARD_MAX_CHANNELS,
+                 rebalance_interval: float = REBALANCE_INTERVAL,
+                 threshold: float = REBALANCE_THRESHOLD,
+                 max_moves: int = REBALANCE_MAX_MOVES,
+                 serialize: bool = True,
+                 client=None,
+                 transport: TransportConfig = None,
+                 auto_start: bool = True):
+        """
+        :param message_handler: (callable) handler(ws, message) of the merged stream.
+        :param shards: (int) Number of connections.
+        :param policy: (str) BALANCE_BY_RATE or BALANCE_BY_COUNT.
+        :param max_channels: (int) Channels per connection.
+        :param rebalance_interval: (float) Seconds between rebalancing, None to only rebalance manually.
+        :param threshold: (float) Load of the hottest shard, relative to the mean, triggering moves.
+        :param max_moves: (int) Channels moved per rebalancing at most.
+        :param serialize: (bool) Never call the handler from two shards at once.
+        :param client: Client with credentials, for authenticated (raw) sessions.
+        """
+
+        if policy not in [BALANCE_BY_RATE, BALANCE_BY_COUNT]:
+            raise ValueError(f"Unknown balancing policy {policy}.")
+
+        if shards < 1:
+            raise ValueError("At least one shard is required.")
+
+        self.message_handler = message_handler or DeribitChannelClient.on_message
+        self.policy = policy
+        self.max_channels = max_channels
+        self.rebalance_interval = rebalance_interval
+        self.threshold = threshold
+        self.max_moves = max_moves
+        self.serialize = serialize
+
+        self.__lock = threading.RLock()
+        self.__deliver_lock = threading.Lock()
+
+        # Channel -> shard it is assigned to, and shard whose notifications are delivered
+        self.__assigned = {}
+        self.__owners = {}
+        self.__members = [set() for _ in range(shards)]
+        self.__moving = set()
+
+        # Per shard: notifications received per channel (written by the shard thread only)
+        self.__received = [{} for _ in range(shards)]
+        self.__last_received = [{} for _ in range(shards)]
+        self.__last_sample = time.monotonic()
+        self.__rates = {}
+
+        self.__shards = [DeribitChannelClient(message_handler=self.__shard_handler(n),
+                                              auto_start=False,
+                                              transport=transport,
+                                              client=client) for n in range(shards)]
+
+        self.__rebalancer = None
+        self.__is_running = False
+
+        # Statistics
+        self.moves = 0
+        self.duplicates = 0
+
+        if auto_start:
+            self.start()
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def shards(self):
+        return list(self.__shards)
+
+    @property
+    def channels(self):
+        with self.__lock:
+            return list(self.__assigned)
+
+    @property
+    def is_running(self):
+        return self.__is_running
+
+    def shard_of(self, channel: str):
+        """
+        :return: (int) Index of the shard delivering the channel, None if not subscribed.
+        """
+        return self.__owners.get(channel)
+
+    def rate(self, channel: str):
+        """
+        :return: (float) Estimated notifications per second of a channel.
+        """
+        return self.__rates.get(channel, 0.0)
+
+    def loads(self):
+        """
+        :return: (list) Channels, notifications per second and load (see the policy) per shard.
+        """
+        with self.__lock:
+            (loads, _) = self.__loads()
+            return [{"channels": len(members),
+                     "rate": sum(self.__rates.get(c, 0.0) for c in members),
+                     "load": load} for (members, load) in zip(self.__members, loads)]
+
+    # ##################################################################
+    # LIFECYCLE
+    # ##################################################################
+
+    def start(self):
+
+        if self.__is_running:
+            return
+
+        self.__is_running = True
+
+        # The shards wait for their connection in parallel
+        threads = [threading.Thread(target=shard.start, kwargs={"auto_start": True}) for shard in self.__shards]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.rebalance_interval:
+            self.__rebalancer = threading.Thread(target=self.__rebalance_forever, args=())
+            self.__rebalancer.daemon = True
+            self.__rebalancer.start()
+
+    def stop(self):
+        self.__is_running = False
+        for shard in self.__shards:
+            shard.close_socket()
+
+    def __rebalance_forever(self):
+
+        while self.__is_running:
+            time.sleep(self.rebalance_interval)
+            if not self.__is_running:
+                break
+            try:
+                self.rebalance()
+            except Exception:
+                logging.exception("Subscription rebalancing failed.")
+
+    # ##################################################################
+    # SUBSCRIPTIONS
+    # ##################################################################
+
+    def subscribe(self, channel: str):
+        """
+        Thread safe.
+        :return: (Future) Resolved with the channels confirmed by the exchange, None if already subscribed.
+        """
+        return self.subscribe_many([channel])[0]
+
+    def subscribe_many(self, channels: List[str]):
+        """
+        Assigns the channels to the shards, and subscribes them with a single
+        request per shard.
+        :return: (list) Futures, in the order of the channels (None if already subscribed).
+        """
+
+        futures, touched = [], set()
+
+        with self.__lock:
+            (loads, default) = self.__loads()
+
+            for channel in channels:
+                if channel in self.__assigned:
+                    futures.append(None)
+                    continue
+
+                n = self.__pick_shard(loads)
+                loads[n] += self.__weight(channel, default)
+                self.__assign(channel, n)
+                self.__owners[channel] = n
+                futures.append(self.__shards[n].subscribe(channel, immediate=False))
+                touched.add(n)
+
+        for n in touched:
+            self.__shards[n].implement_channels_modifications()
+
+        self.__publish()
+        return futures
+
+    def unsubscribe(self, channel: str):
+        """
+        :return: (Future) Resolved with the channels unsubscribed by the exchange, None if not subscribed.
+        """
+
+        with self.__lock:
+            n = self.__assigned.pop(channel, None)
+            if n is None:
+                return None
+
+            self.__members[n].discard(channel)
+            owner = self.__owners.pop(channel, n)
+            self.__moving.discard(channel)
+            self.__rates.pop(channel, None)
+
+        # A channel being moved is subscribed on both shards
+        if owner != n:
+            self.__shards[owner].unsubscribe(channel)
+
+        self.__publish()
+        return self.__shards[n].unsubscribe(channel)
+
+    def __pick_shard(self, loads):
+
+        candidates = [n for (n, members) in enumerate(self.__members) if len(members) < self.max_channels]
+
+        if not candidates:
+            raise Exception(f"Every shard is full ({self.max_channels} channels per connection).")
+
+        return min(candidates, key=lambda n: (loads[n], len(self.__members[n])))
+
+    def __assign(self, channel, n):
+        previous = self.__assigned.get(channel)
+        if previous is not None:
+            self.__members[previous].discard(channel)
+        self.__assigned[channel] = n
+        self.__members[n].add(channel)
+
+    # ##################################################################
+    # LOAD
+    # ##################################################################
+
+    def __weight(self, channel, default: float = 1.0):
+        if self.policy == BALANCE_BY_COUNT:
+            return 1.0
+        return self.__rates.get(channel, default)
+
+    def __loads(self):
+        """
+        :return: (tuple) Load of each shard, and weight of the channels without a rate yet.
+        """
+
+        # Unknown channels weigh as much as an average one
+        default = sum(self.__rates.values()) / len(self.__rates) if self.__rates else 1.0
+        return [sum(self.__weight(c, default) for c in members) for members in self.__members], default
+
+    def sample_rates(self):
+        """
+        Updates the message rate estimates from the notifications counted since the last sample.
+        """
+
+        now = time.monotonic()
+        elapsed = now - self.__last_sample
+        if elapsed <= 0.0:
+            return
+
+        with self.__lock:
+
+            # A channel being moved is received by two shards: only count one of them
+            counts = {}
+            for n in range(len(self.__shards)):
+                received = dict(self.__received[n])
+                last = self.__last_received[n]
+                for (channel, count) in received.items():
+                    counts[channel] = max(counts.get(channel, 0), count - last.get(channel, 0))
+                self.__last_received[n] = received
+
+            for (channel, count) in counts.items():
+                if channel not in self.__assigned:
+                    continue
+                rate = count / elapsed
+                previous = self.__rates.get(channel)
+                self.__rates[channel] = rate if previous is None else \
+                    RATE_SMOOTHING * rate + (1.0 - RATE_SMOOTHING) * previous
+
+            self.__last_sample = now
+
+        self.__publish()
+
+    def rebalance(self):
+        """
+        Moves channels from the hottest shards to the coolest ones while the
+        hottest load exceeds 'threshold' times the mean.
+        :return: (int) Number of channels moved.
+        """
+
+        self.sample_rates()
+        moves = []
+
+        with self.__lock:
+            (loads, default) = self.__loads()
+            mean = sum(loads) / len(loads)
+
+            for _ in range(self.max_moves):
+                hot = max(range(len(loads)), key=lambda n: loads[n])
+                cold = min(range(len(loads)), key=lambda n: loads[n])
+
+                if hot == cold or mean <= 0.0 or loads[hot] <= self.threshold * mean:
+                    break
+
+                if len(self.__members[cold]) >= self.max_channels:
+                    break
+
+                # The heaviest channel whose move narrows the gap
+                gap = loads[hot] - loads[cold]
+                candidates = [(self.__weight(c, default), c) for c in self.__members[hot] if c not in self.__moving]
+                candidates = [(w, c) for (w, c) in candidates if 0.0 < w < gap]
+                if not candidates:
+                    break
+
+                (weight, channel) = max(candidates)
+                self.__assign(channel, cold)
+                self.__moving.add(channel)
+                moves.append((channel, hot, cold))
+                loads[hot] -= weight
+                loads[cold] += weight
+
+        for (channel, source, target) in moves:
+            self.__move(channel, source, target)
+
+        if moves:
+            logging.info(f"Rebalanced {len(moves)} channels across {len(self.__shards)} connections.")
+            self.__publish()
+
+        return len(moves)
+
+    def __move(self, channel, source, target):
+
+        def _done(future):
+
+            with self.__lock:
+                self.__moving.discard(channel)
+
+                # Unsubscribed (or moved again) meanwhile
+                if self.__assigned.get(channel) != target:
+                    return
+
+                if future.exception() is not None:
+                    logging.warning(f"Moving {channel} failed ({future.exception()}).")
+                    self.__assign(channel, source)
+                    return
+
+                # The stream switches to the new shard
+                self.__owners[channel] = target
+                self.moves += 1
+
+            self.__shards[source].unsubscribe(channel)
+
+        self.__shards[target].subscribe(channel).add_done_callback(_done)
+
+    def __publish(self):
+        for (n, members) in enumerate(self.__members):
+            SHARD_CHANNELS.labels(str(n)).set(len(members))
+            SHARD_MESSAGE_RATE.labels(str(n)).set(sum(self.__rates.get(c, 0.0) for c in members))
+
+    # ##################################################################
+    # MERGED STREAM
+    # ##################################################################
+
+    def __shard_handler(self, n):
+
+        received = self.__received[n]
+
+        def on_message(ws, message):
+
+            channel = extract_channel(message) if isinstance(message, str) else None
+
+            if channel is not None:
+                received[channel] = received.get(channel, 0) + 1
+
+                # Only the owner of a channel delivers it (e.g. while it is moved)
+                if self.__owners.get(channel, n) != n:
+                    self.duplicates += 1
+                    return
+
+            if self.serialize:
+                with self.__deliver_lock:
+                    self.message_handler(ws, message)
+            else:
+                self.message_handler(ws, message)
+
+        return on_message
@@ -0,0 +1,146 @@
+import time
+import asyncio
+import logging
+
+import source.features.data as data
+import source.analytics.export as export
+
+from source.events import sig_market_snapshot_updated
+from source.support.networking import *
+from source.support.settings import DEFAULT_CURRENCY, DEFAULT_KIND, DERIBIT_WSS_URL
+from source.support.transport import TransportConfig
+from source.managers.common import SubscriptionManager, RECONNECT_DELAY
+
+SNAPSHOT_REFRESH_INTERVAL = 1.0
+
+
+# ######################################################################
+# MARKET SNAPSHOT MANAGER
+# ######################################################################
+
+class MarketSnapshotManager(SubscriptionManager):
+    """
+    Columnar table of marks, best bid/ask, open interest and volumes of
+    every instrument of a currency, refreshed at a fixed cadence with
+    'public/get_book_summary_by_currency' (one request per refresh) on a
+    persistent connection. Columns are listed in export.SUMMARY_COLUMNS.
+    """
+
+    def __init__(self,
+                 currency: str = DEFAULT_CURRENCY,
+                 kind: str = DEFAULT_KIND,
+                 interval: float = SNAPSHOT_REFRESH_INTERVAL,
+                 url: str = DERIBIT_WSS_URL,
+                 reconnect_delay: float = RECONNECT_DELAY,
+                 transport: TransportConfig = None):
+
+        super().__init__(client=None,
+                         channels=[],
+                         private=False,
+                         url=url,
+                         reconnect_delay=reconnect_delay,
+                         transport=transport)
+
+        self.currency = currency.lower()
+        self.kind = kind
+        self.interval = interval
+
+        self.__table = None
+        self.__rows = {}
+        self.__updated = None
+
+        # Statistics
+        self.refreshes = 0
+
+    # ##################################################################
+    # LOCAL READS
+    # ##################################################################
+
+    @property
+    def table(self):
+        return self.__table
+
+    @property
+    def instruments(self):
+        return list(self.__rows)
+
+    def column(self, name: str):
+        return self.__table[name] if self.__table is not None else None
+
+    def row(self, instrument: str):
+        """
+        :return: (dict) Column values of the instrument, None if unknown.
+        """
+        n = self.__rows.get(instrument)
+        if n is None:
+            return None
+        return {name: values[n] for (name, values) in self.__table.items()}
+
+    @property
+    def last_update(self):
+        """
+        :return: (float) Local time (time.time) of the last refresh.
+        """
+        return self.__updated
+
+    @property
+    def age(self):
+        return time.time() - self.__updated if self.__updated else None
+
+    # ##################################################################
+    # LIFECYCLE
+    # ##################################################################
+
+    async def run(self):
+
+        refresher = asyncio.ensure_future(self.__refresh_forever())
+        try:
+            await super().run()
+        finally:
+            refresher.cancel()
+
+    async def __refresh_forever(self):
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time()
+
+        while True:
+
+            # Fixed cadence: a slow refresh does not shift the next ones
+            deadline += self.interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            if deadline < loop.time():
+                deadline = loop.time()
+
+            if not self.is_ready:
+                continue
+
+            try:
+                await self.refresh(self.connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Market snapshot refresh failed ({e}).")
+
+    # ##################################################################
+    # SYNCHRONIZATION
+    # ##################################################################
+
+    async def synchronize(self, connection):
+        await self.refresh(connection)
+
+    async def refresh(self, connection):
+
+        msg = data.request_book_summary(currency=self.currency, kind=self.kind)
+        response = await connection.request(msg)
+        if RESP_ERROR in response:
+            raise Exception(f"Book summary request failed ({response[RESP_ERROR]}).")
+
+        table = export.summaries_to_columns(response)
+
+        self.__table = table
+        self.__rows = {name: n for (n, name) in enumerate(table["instrument_name"].tolist())}
+        self.__updated = time.time()
+        self.refreshes += 1
+
+        sig_market_snapshot_updated.send(data=table)
@@ -0,0 +1,33 @@
+import time
+import asyncio
+import unittest
+
+from source.managers.clock import ClockManager
+
+
+class FakeConnection(object):
+    """
+    Answers public/get_time from an exchange clock ahead by 'offset' seconds.
+    """
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    async def request(self, msg, auth_required=False):
+        now = int((time.time() + self.offset) * 1e6)
+        return {"id": msg["id"], "result": now // 1000, "usIn": now, "usOut": now + 50}
+
+
+class TestClockManager(unittest.TestCase):
+
+    def test_synchronize(self):
+        manager = ClockManager(burst=3)
+        asyncio.run(manager.synchronize(FakeConnection(offset=12.0)))
+
+        self.assertEqual(manager.estimator.samples, 3)
+        self.assertAlmostEqual(manager.offset, 12.0, delta=0.05)
+        self.assertAlmostEqual(manager.now_exchange(), time.time() + 12.0, delta=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
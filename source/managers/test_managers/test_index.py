@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+from unittest import mock
+
+from source.events import sig_index_level_updated
+from source.managers.index import IndexManager, IndexLevel
+from source.clients.test_clients.exchange import FakeExchange
+from source.support.transport import TransportConfig
+
+
+class TestIndexPolling(unittest.TestCase):
+
+    def test_poll_connects_with_the_transport(self):
+        def index(params):
+            return {params["currency"].upper(): 65000.0, "edp": 65000.0}
+
+        with FakeExchange(handlers={"public/get_index": index}) as exchange:
+            transport = TransportConfig(url=exchange.url, compression=False)
+            manager = IndexManager(currencies=["BTC", "ETH"], transport=transport)
+
+            # Not running: polled on a temporary connection
+            asyncio.run(manager.poll())
+
+        self.assertIs(manager.transport, transport)
+        self.assertEqual(exchange.methods(), ["public/get_index", "public/get_index"])
+        self.assertEqual(manager.price("BTC"), 65000.0)
+        self.assertEqual(manager.price("eth"), 65000.0)
+        self.assertEqual(manager.polls, 1)
+
+
+
+class TestIndexManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = IndexManager(currencies=["BTC", "eth"], max_age=5.0)
+        self.received = []
+
+        def receiver(sender, data=None, **kwargs):
+            self.received.append(data)
+
+        sig_index_level_updated.connect(receiver)
+        self.addCleanup(sig_index_level_updated.disconnect, receiver)
+
+    def test_notifications(self):
+        self.assertEqual(self.manager.channels, ["deribit_price_index.btc_usd", "deribit_price_index.eth_usd"])
+
+        self.manager.on_notification("deribit_price_index.btc_usd",
+                                     {"index_name": "btc_usd", "price": 65000.5, "timestamp": 1000})
+
+        level = self.manager.level("BTC")
+        self.assertEqual((level.currency, level.price, level.timestamp), ("btc", 65000.5, 1000))
+        self.assertEqual(self.manager.price("btc"), 65000.5)
+        self.assertIsNone(self.manager.price("eth"))
+        self.assertEqual(self.received, [level])
+        self.assertEqual(self.manager.levels(), {"btc": level})
+
+    def test_unknown_indices_are_ignored(self):
+        self.manager.on_notification("deribit_price_index.sol_usd",
+                                     {"index_name": "sol_usd", "price": 150.0, "timestamp": 1000})
+        self.manager.on_notification("deribit_price_index.btc_usd", None)
+
+        self.assertEqual(self.manager.levels(), {})
+        self.assertEqual(self.manager.updates, 0)
+
+    def test_older_levels_are_ignored(self):
+        self.manager.apply_level("btc", 65000.0, 2000)
+        self.manager.apply_level("btc", 64000.0, 1000)
+        self.manager.apply_level("btc", 66000.0, 2000)
+
+        self.assertEqual(self.manager.price("btc"), 66000.0)
+        self.assertEqual([level.price for level in self.received], [65000.0, 66000.0])
+        self.assertEqual(self.manager.updates, 2)
+
+    def test_staleness(self):
+        self.assertTrue(self.manager.is_stale("btc"))
+        self.assertIsNone(self.manager.age("btc"))
+
+        with mock.patch("source.managers.index.time.time", return_value=1000.0):
+            self.manager.apply_level("btc", 65000.0, 1000)
+        self.assertEqual(self.manager.level("btc"), IndexLevel("btc", 65000.0, 1000, 1000.0))
+
+        with mock.patch("source.managers.index.time.time", return_value=1003.0):
+            self.assertEqual(self.manager.age("btc"), 3.0)
+            self.assertFalse(self.manager.is_stale("btc"))
+
+        with mock.patch("source.managers.index.time.time", return_value=1006.0):
+            self.assertTrue(self.manager.is_stale("btc"))
+
+    def test_poll_errors(self):
+        def index(params):
+            raise Exception("Invalid currency.")
+
+        with FakeExchange(handlers={"public/get_index": index}) as exchange:
+            manager = IndexManager(transport=TransportConfig(url=exchange.url))
+
+            with self.assertRaises(Exception):
+                asyncio.run(manager.poll())
+
+        self.assertEqual(manager.polls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
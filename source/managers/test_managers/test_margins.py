@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from source.managers.margins import MarginEstimator
+
+SPECS = {"BTC-PERPETUAL": {"min_trade_amount": 10.0, "contract_size": 10.0, "tick_size": 0.5},
+         "BTC-27DEC24-60000-C": {"min_trade_amount": 0.1, "contract_size": 1.0, "tick_size": 0.0005}}
+
+
+class FakeConnection(object):
+    """
+    Answers get_instrument and get_margins requests, and records them.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    async def pipeline(self, messages, auth_required=False):
+        self.batches.append(messages)
+        futures = []
+        for msg in messages:
+            future = asyncio.get_event_loop().create_future()
+            params = msg["params"]
+            if msg["method"] == "public/get_instrument":
+                future.set_result({"id": msg["id"], "result": SPECS[params["instrument_name"]]})
+            else:
+                future.set_result({"id": msg["id"], "result": dict(params)})
+            futures.append(future)
+        return futures
+
+
+class TestMarginEstimator(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection()
+        self.estimator = MarginEstimator(client=None)
+
+        async def connection():
+            return self.connection
+
+        self.estimator.connection = connection
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_sent_values_are_valid_order_values(self):
+        estimates = self.run_async(self.estimator.estimate_many([("BTC-PERPETUAL", 10, 50000),
+                                                                 ("BTC-PERPETUAL", 1230, 50123.3),
+                                                                 ("BTC-27DEC24-60000-C", 0.3, 0.0125)]))
+
+        for e in estimates:
+            self.assertNotIsInstance(e, Exception)
+
+        self.assertEqual((estimates[0]["amount"], estimates[0]["price"]), (10.0, 49990.5))
+        for e in estimates:
+            (step, tick) = self.estimator.specs(e["instrument_name"])
+            self.assertAlmostEqual(e["amount"] / step, round(e["amount"] / step), places=9)
+            self.assertAlmostEqual(e["price"] / tick, round(e["price"] / tick), places=6)
+
+    def test_specs_are_fetched_once(self):
+        self.run_async(self.estimator.estimate("BTC-PERPETUAL", 10, 50000))
+        self.estimator.invalidate()
+        self.run_async(self.estimator.estimate("BTC-PERPETUAL", 20, 50000))
+
+        methods = [m["method"] for batch in self.connection.batches for m in batch]
+        self.assertEqual(methods.count("public/get_instrument"), 1)
+        self.assertEqual(methods.count("private/get_margins"), 2)
+
+    def test_identical_buckets_share_a_request(self):
+        estimates = self.run_async(self.estimator.estimate_many([("BTC-PERPETUAL", 1000, 50000),
+                                                                 ("btc-perpetual", 1001, 50001),
+                                                                 ("BTC-PERPETUAL", 2000, 50000)]))
+
+        self.assertIs(estimates[0], estimates[1])
+        self.assertEqual(self.estimator.requests, 2)
+        self.assertEqual(self.estimator.batches, 1)
+
+        # Memoized
+        self.run_async(self.estimator.estimate("BTC-PERPETUAL", 1000, 50000))
+        self.assertEqual(self.estimator.requests, 2)
+
+    def test_exact_values_without_buckets(self):
+        self.estimator.amount_bucket = 0.0
+        self.estimator.price_bucket = 0.0
+        estimate = self.run_async(self.estimator.estimate("BTC-PERPETUAL", 30, 50000.5))
+        self.assertEqual((estimate["amount"], estimate["price"]), (30.0, 50000.5))
+
+    def test_bucketed(self):
+        self.assertEqual(self.estimator.bucketed(10, 50000, amount_step=10, tick_size=0.5), (10.0, 49990.5))
+
+        # Never below the minimum amount
+        self.assertEqual(self.estimator.bucketed(1, 50000, amount_step=10, tick_size=0.5)[0], 10.0)
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+
+from source.events import sig_position_updated, sig_portfolio_updated
+from source.managers.portfolio import PortfolioManager
+
+POSITIONS = {"btc": [{"instrument_name": "BTC-PERPETUAL", "size": 100.0},
+                     {"instrument_name": "BTC-27DEC24", "size": -20.0}],
+             "eth": [{"instrument_name": "ETH-PERPETUAL", "size": 5.0}]}
+
+SUMMARIES = {"btc": {"currency": "BTC", "equity": 1.5, "balance": 1.4, "available_funds": 1.2,
+                     "initial_margin": 0.3, "maintenance_margin": 0.2},
+             "eth": {"currency": "ETH", "equity": 10.0, "balance": 10.0}}
+
+
+class FakeConnection(object):
+    """
+    Answers the positions and summary requests of a portfolio snapshot.
+    """
+
+    def __init__(self, positions=None, summaries=None, error=None):
+        self.positions = positions or POSITIONS
+        self.summaries = summaries or SUMMARIES
+        self.error = error
+
+    async def pipeline(self, messages, auth_required=False):
+        futures = []
+        for msg in messages:
+            future = asyncio.get_event_loop().create_future()
+            currency = msg["params"]["currency"].lower()
+            if self.error:
+                future.set_result({"id": msg["id"], "error": self.error})
+            elif msg["method"] == "private/get_positions":
+                future.set_result({"id": msg["id"], "result": self.positions[currency]})
+            else:
+                future.set_result({"id": msg["id"], "result": dict(self.summaries[currency])})
+            futures.append(future)
+        return futures
+
+
+class TestPortfolioManager(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = PortfolioManager(client=object(), currencies=["BTC", "eth"])
+
+    def synchronize(self, connection=None):
+        asyncio.run(self.manager.synchronize(connection or FakeConnection()))
+
+    def received(self, signal):
+        received = []
+
+        def receiver(sender, data=None, **kwargs):
+            received.append(data)
+
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        return received
+
+    def test_synchronize(self):
+        self.synchronize()
+
+        self.assertEqual(self.manager.size("btc-perpetual"), 100.0)
+        self.assertEqual(self.manager.size("ETH-PERPETUAL"), 5.0)
+        self.assertEqual(self.manager.size("ETH-27DEC24"), 0.0)
+        self.assertEqual(len(self.manager.positions()), 3)
+        self.assertEqual([p["instrument_name"] for p in self.manager.positions("BTC")],
+                         ["BTC-PERPETUAL", "BTC-27DEC24"])
+
+        self.assertEqual(self.manager.equity("BTC"), 1.5)
+        self.assertEqual(self.manager.available_funds(), 1.2)
+        self.assertEqual(self.manager.initial_margin(), 0.3)
+        self.assertEqual(self.manager.maintenance_margin(), 0.2)
+        self.assertIsNone(self.manager.initial_margin("eth"))
+        self.assertIsNotNone(self.manager.last_update("eth"))
+
+    def test_synchronize_replaces_closed_positions(self):
+        self.synchronize()
+        self.synchronize(FakeConnection(positions={"btc": [{"instrument_name": "BTC-PERPETUAL", "size": 50.0}],
+                                                   "eth": []}))
+
+        self.assertEqual([p["instrument_name"] for p in self.manager.positions()], ["BTC-PERPETUAL"])
+        self.assertEqual(self.manager.size("BTC-PERPETUAL"), 50.0)
+
+    def test_synchronize_errors(self):
+        with self.assertRaises(Exception):
+            self.synchronize(FakeConnection(error={"code": 13009, "message": "unauthorized"}))
+
+    def test_position_changes(self):
+        received = self.received(sig_position_updated)
+        self.synchronize()
+
+        self.manager.on_notification("user.changes.any.btc.raw",
+                                     {"trades": [], "orders": [],
+                                      "positions": [{"instrument_name": "BTC-PERPETUAL", "size": 80.0},
+                                                    {"instrument_name": "BTC-27DEC24-60000-C", "size": 1.0}]})
+
+        self.assertEqual(self.manager.size("BTC-PERPETUAL"), 80.0)
+        self.assertEqual(self.manager.size("BTC-27DEC24-60000-C"), 1.0)
+        self.assertEqual(len(self.manager.positions("btc")), 3)
+        self.assertEqual([p["instrument_name"] for p in received], ["BTC-PERPETUAL", "BTC-27DEC24-60000-C"])
+
+    def test_portfolio_pushes_update_the_summary(self):
+        received = self.received(sig_portfolio_updated)
+        self.synchronize()
+
+        # Pushes carry a subset of the summary fields
+        self.manager.on_notification("user.portfolio.btc", {"currency": "BTC", "equity": 1.6,
+                                                            "available_funds": 1.1})
+
+        self.assertEqual(self.manager.equity(), 1.6)
+        self.assertEqual(self.manager.available_funds(), 1.1)
+        self.assertEqual(self.manager.balance(), 1.4)
+        self.assertEqual(received[-1]["equity"], 1.6)
+
+    def test_ignored_notifications(self):
+        self.manager.on_notification(None, {"positions": []})
+        self.manager.on_notification("user.portfolio.btc", None)
+        self.manager.on_notification("user.orders.any.btc.raw", [{"order_id": "1"}])
+
+        self.assertEqual(self.manager.positions(), [])
+        self.assertIsNone(self.manager.summary())
+
+    def test_credentials_are_required(self):
+        with self.assertRaises(Exception):
+            PortfolioManager(client=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
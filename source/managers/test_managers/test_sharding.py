@@ -0,0 +1,188 @@
+import json
+import unittest
+
+from concurrent.futures import Future
+from unittest import mock
+
+from source.managers.sharding import ShardedSubscriptionManager, BALANCE_BY_COUNT, BALANCE_BY_RATE
+
+
+class FakeShard(object):
+    """
+    In-memory DeribitChannelClient: subscriptions are confirmed on demand.
+    """
+
+    def __init__(self, message_handler=None, **kwargs):
+        self.message_handler = message_handler
+        self.channels = set()
+        self.pending = {}
+        self.requests = 0
+
+    def subscribe(self, channel=None, immediate=True):
+        future = Future()
+        self.pending[channel] = future
+        if immediate:
+            self.implement_channels_modifications()
+        return future
+
+    def unsubscribe(self, channel=None, immediate=True):
+        self.channels.discard(channel)
+        future = Future()
+        future.set_result([channel])
+        return future
+
+    def implement_channels_modifications(self):
+        self.requests += 1
+
+    def confirm(self, fail=False):
+        pending, self.pending = self.pending, {}
+        for (channel, future) in pending.items():
+            if fail:
+                future.set_exception(Exception("rejected"))
+            else:
+                self.channels.add(channel)
+                future.set_result([channel])
+
+    def notify(self, channel, count=1):
+        msg = json.dumps({"jsonrpc": "2.0", "method": "subscription",
+                          "params": {"channel": channel, "data": {}}})
+        for _ in range(count):
+            self.message_handler(self, msg)
+
+    def start(self, auto_start=False):
+        pass
+
+    def close_socket(self):
+        pass
+
+
+class TestShardedSubscriptionManager(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch("source.managers.sharding.DeribitChannelClient", FakeShard)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.received = []
+
+    def manager(self, **kwargs):
+        kwargs.setdefault("shards", 3)
+        kwargs.setdefault("rebalance_interval", None)
+        return ShardedSubscriptionManager(message_handler=lambda ws, msg: self.received.append((ws, msg)),
+                                          auto_start=False, **kwargs)
+
+    def confirm(self, manager, fail=False):
+        for shard in manager.shards:
+            shard.confirm(fail=fail)
+
+    def test_channels_are_spread_with_one_request_per_shard(self):
+        manager = self.manager(policy=BALANCE_BY_COUNT)
+        futures = manager.subscribe_many([f"ch{n}" for n in range(9)])
+
+        self.assertEqual([s.requests for s in manager.shards], [1, 1, 1])
+        self.assertEqual([load["channels"] for load in manager.loads()], [3, 3, 3])
+
+        self.confirm(manager)
+        self.assertTrue(all(f.done() for f in futures))
+
+        # Already subscribed
+        self.assertIsNone(manager.subscribe("ch0"))
+
+    def test_shards_are_full(self):
+        manager = self.manager(shards=2, max_channels=2)
+        manager.subscribe_many(["a", "b", "c", "d"])
+        with self.assertRaises(Exception):
+            manager.subscribe("e")
+
+    def test_only_the_owner_delivers(self):
+        manager = self.manager()
+        manager.subscribe("hot")
+        self.confirm(manager)
+        n = manager.shard_of("hot")
+
+        other = manager.shards[(n + 1) % 3]
+        other.notify("hot")
+        self.assertEqual(manager.duplicates, 1)
+        self.assertEqual(self.received, [])
+
+        manager.shards[n].notify("hot")
+        self.assertEqual(len(self.received), 1)
+
+    def notify(self, manager, rates):
+        for (channel, count) in rates.items():
+            manager.shards[manager.shard_of(channel)].notify(channel, count)
+
+    def test_rebalance_moves_the_hottest_channels(self):
+        manager = self.manager(policy=BALANCE_BY_RATE, threshold=1.5)
+        channels = [f"ch{n}" for n in range(6)]
+        manager.subscribe_many(channels)
+        self.confirm(manager)
+
+        # The channels of one shard are far busier than the others
+        hot = manager.shard_of("ch0")
+        self.notify(manager, {c: 200 if manager.shard_of(c) == hot else 1 for c in channels})
+
+        moved = manager.rebalance()
+        self.assertGreater(moved, 0)
+
+        # Make before break: the old shard delivers until the new one confirms
+        self.assertEqual(manager.moves, 0)
+        self.assertEqual([manager.shard_of(c) for c in channels].count(hot), 2)
+        received = len(self.received)
+        manager.shards[hot].notify("ch0")
+        self.assertEqual(len(self.received), received + 1)
+
+        self.confirm(manager)
+        self.assertEqual(manager.moves, moved)
+        self.assertLess([manager.shard_of(c) for c in channels].count(hot), 2)
+
+        # Each channel is subscribed on its owner only
+        for channel in channels:
+            self.assertEqual([n for (n, s) in enumerate(manager.shards) if channel in s.channels],
+                             [manager.shard_of(channel)])
+
+    def test_balanced_shards_are_left_alone(self):
+        manager = self.manager(policy=BALANCE_BY_RATE)
+        channels = [f"ch{n}" for n in range(6)]
+        manager.subscribe_many(channels)
+        self.confirm(manager)
+        self.notify(manager, {c: 10 for c in channels})
+
+        self.assertEqual(manager.rebalance(), 0)
+
+    def test_failed_move_keeps_the_owner(self):
+        manager = self.manager(shards=2, policy=BALANCE_BY_RATE)
+        manager.subscribe_many(["a", "b", "c", "d"])
+        self.confirm(manager)
+
+        hot = manager.shard_of("a")
+        self.notify(manager, {c: 300 if c == "a" else 1 for c in "abcd"})
+
+        self.assertEqual(manager.rebalance(), 1)
+        self.confirm(manager, fail=True)
+
+        self.assertEqual(manager.moves, 0)
+        self.assertEqual(manager.shard_of("a"), hot)
+        self.assertIn("a", manager.shards[hot].channels)
+        self.assertEqual([load["channels"] for load in manager.loads()], [2, 2])
+
+    def test_unsubscribe_during_a_move(self):
+        manager = self.manager(shards=2, policy=BALANCE_BY_RATE)
+        manager.subscribe_many(["a", "b", "c", "d"])
+        self.confirm(manager)
+
+        self.notify(manager, {c: 300 if c == "a" else 1 for c in "abcd"})
+        self.assertEqual(manager.rebalance(), 1)
+
+        for channel in "abcd":
+            manager.unsubscribe(channel)
+        self.confirm(manager)
+
+        self.assertEqual(manager.channels, [])
+        self.assertEqual(manager.moves, 0)
+        self.assertIsNone(manager.shard_of("a"))
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            self.manager(policy="random")
+        with self.assertRaises(ValueError):
+            self.manager(shards=0)
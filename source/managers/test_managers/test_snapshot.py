@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+from source.events import sig_market_snapshot_updated
+from source.managers.snapshot import MarketSnapshotManager
+
+SUMMARIES = [{"instrument_name": "BTC-PERPETUAL", "creation_timestamp": 1704067200000, "mark_price": 42000.0,
+              "open_interest": 1.0e9},
+             {"instrument_name": "BTC-27DEC24-60000-C", "creation_timestamp": 1704067200001, "mark_price": 0.0125,
+              "open_interest": 120.0}]
+
+
+class FakeConnection(object):
+
+    def __init__(self, result):
+        self.result = result
+        self.requests = []
+
+    async def request(self, msg, auth_required=False):
+        self.requests.append(msg)
+        if isinstance(self.result, Exception):
+            return {"id": msg["id"], "error": {"code": 10001, "message": str(self.result)}}
+        return {"id": msg["id"], "result": self.result}
+
+
+class TestMarketSnapshotManager(unittest.TestCase):
+
+    def test_refresh(self):
+        received = []
+
+        def receiver(sender, data=None, **kwargs):
+            received.append(data)
+
+        sig_market_snapshot_updated.connect(receiver)
+        self.addCleanup(sig_market_snapshot_updated.disconnect, receiver)
+
+        manager = MarketSnapshotManager(currency="BTC", kind="option")
+        connection = FakeConnection(SUMMARIES)
+        asyncio.run(manager.refresh(connection))
+
+        self.assertEqual(connection.requests[0]["params"], {"currency": "btc", "kind": "option"})
+        self.assertEqual(manager.instruments, ["BTC-PERPETUAL", "BTC-27DEC24-60000-C"])
+        self.assertEqual(manager.row("BTC-27DEC24-60000-C")["mark_price"], 0.0125)
+        self.assertIsNone(manager.row("ETH-PERPETUAL"))
+        np.testing.assert_array_equal(manager.column("open_interest"), [1.0e9, 120.0])
+        self.assertEqual(manager.refreshes, 1)
+        self.assertIsNotNone(manager.age)
+        self.assertIs(received[0], manager.table)
+
+    def test_failed_refresh_keeps_the_table(self):
+        manager = MarketSnapshotManager()
+        asyncio.run(manager.refresh(FakeConnection(SUMMARIES)))
+        table = manager.table
+
+        with self.assertRaises(Exception):
+            asyncio.run(manager.refresh(FakeConnection(Exception("Too many requests."))))
+
+        self.assertIs(manager.table, table)
+        self.assertEqual(manager.refreshes, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
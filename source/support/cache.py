@@ -0,0 +1,169 @@
+import time
+import threading
+
+from collections import OrderedDict
+from typing import Dict
+
+# Seconds a response stays fresh, per method
+DEFAULT_CACHE_TTLS = {"public/get_currencies": 3600.0,
+                      "public/get_instruments": 60.0,
+                      "public/get_announcements": 60.0,
+                      "public/get_index": 0.5}
+
+DEFAULT_CACHE_SIZE = 1024
+
+# Lookup results
+CACHE_FRESH = "fresh"
+CACHE_STALE = "stale"
+CACHE_MISS = "miss"
+
+
+# ######################################################################
+# RESPONSE CACHE
+# ######################################################################
+
+class ResponseCache(object):
+    """
+    Size-bounded (LRU) cache of responses with a time to live per method.
+    Once expired, an entry may still be served as stale for 'stale_ratio'
+    times its TTL while the caller refreshes it in the background
+    (stale-while-revalidate). Cached responses are shared by all the
+    callers and must not be modified.
+    """
+
+    def __init__(self,
+                 ttls: Dict[str, float] = None,
+                 max_entries: int = DEFAULT_CACHE_SIZE,
+                 stale_ratio: float = 1.0,
+                 stale_while_revalidate: bool = True):
+
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.stale_ratio = stale_ratio
+        self.stale_while_revalidate = stale_while_revalidate
+
+        # key -> (method, value, fresh until, stale until)
+        self.__entries = OrderedDict()
+        self.__refreshing = set()
+        self.__lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def size(self):
+        return len(self.__entries)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+    def stats(self):
+        return {"size": self.size,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hit_ratio}
+
+    def is_cacheable(self, method: str):
+        return self.ttls.get(method, 0.0) > 0.0
+
+    # ##################################################################
+    # LOOKUP
+    # ##################################################################
+
+    def lookup(self, key):
+        """
+        :return: (tuple) (value, state). State is CACHE_FRESH, CACHE_STALE
+        (the caller should refresh the entry, see 'begin_refresh') or CACHE_MISS.
+        """
+
+        now = time.monotonic()
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is not None:
+                (_, value, fresh_until, stale_until) = entry
+
+                if now < fresh_until:
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return value, CACHE_FRESH
+
+                if self.stale_while_revalidate and now < stale_until:
+                    self.__entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return value, CACHE_STALE
+
+                del self.__entries[key]
+
+            self.misses += 1
+            return None, CACHE_MISS
+
+    def store(self, key, method: str, value):
+
+        ttl = self.ttls.get(method, 0.0)
+        if ttl <= 0.0:
+            return
+
+        now = time.monotonic()
+
+        with self.__lock:
+            self.__entries[key] = (method, value, now + ttl, now + ttl * (1.0 + self.stale_ratio))
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin_refresh(self, key):
+        """
+        :return: (bool) True if the caller should refresh the entry, False
+        if a refresh is already running.
+        """
+        with self.__lock:
+            if key in self.__refreshing:
+                return False
+            self.__refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self.__lock:
+            self.__refreshing.discard(key)
+
+    # ##################################################################
+    # INVALIDATION
+    # ##################################################################
+
+    def invalidate(self, method: str = None, key=None):
+        """
+        Drops one entry (key), every entry of a method, or everything.
+        :return: (int) Number of entries dropped.
+        """
+
+        with self.__lock:
+            if key is not None:
+                return 1 if self.__entries.pop(key, None) is not None else 0
+
+            if method is None:
+                n = len(self.__entries)
+                self.__entries.clear()
+                return n
+
+            keys = [k for (k, entry) in self.__entries.items() if entry[0] == method]
+            for k in keys:
+                del self.__entries[k]
+            return len(keys)
+
+    def clear(self):
+        return self.invalidate()
@@ -1,3 +1,6 @@
+from collections import namedtuple
+from functools import lru_cache
+
 # ######################################################################
 # CHANNEL HEADERS
 # ######################################################################
@@ -5,6 +8,19 @@
 HEADER_ORDERBOOK = "book"
 HEADER_QUOTE = "quote"
 HEADER_TRADE = "trades"
+HEADER_PRICE_INDEX = "deribit_price_index"
+HEADER_USER_ORDERS = "user.orders"
+HEADER_USER_TRADES = "user.trades"
+HEADER_USER_CHANGES = "user.changes"
+HEADER_USER_PORTFOLIO = "user.portfolio"
+
+# Headers spanning two tokens (e.g. 'user.orders')
+COMPOUND_HEADERS = ["user", "markprice"]
+
+INTERVAL_RAW = "raw"
+INTERVAL_SUFFIX = "ms"
+
+ChannelKey = namedtuple("ChannelKey", ["header", "instrument", "group", "depth", "interval"])
 
 
 # ######################################################################
@@ -31,5 +47,31 @@ def build_channel(header, instrument, interval=None, group=None, depth=None):
     return '.'.join([content[k] for k in content])
 
 
+@lru_cache(maxsize=65536)
+def parse_channel(channel: str):
+    """
+    Reverse of 'build_channel': splits a channel name into its header,
+    instrument (or 'kind.currency' / index name), group, depth and interval.
+    Results are cached, so each channel name is parsed only once.
+    :return: (ChannelKey) Missing fields are None.
+    """
+
+    parts = channel.split(".")
+    size = 2 if parts[0] in COMPOUND_HEADERS and len(parts) > 1 else 1
+    header, rest = ".".join(parts[:size]), parts[size:]
+
+    interval = None
+    if rest and (rest[-1] == INTERVAL_RAW or (rest[-1].endswith(INTERVAL_SUFFIX) and rest[-1][:-2].isdigit())):
+        interval = rest.pop()
+
+    group = depth = None
+    if header == HEADER_ORDERBOOK and len(rest) == 3:
+        group, depth = _as_int(rest[1]), _as_int(rest[2])
+        rest = rest[:1]
+
+    instrument = ".".join(rest) or None
+    return ChannelKey(header, instrument, group, depth, interval)
 
 
+def _as_int(value):
+    return int(value) if value.isdigit() else value
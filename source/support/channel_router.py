@@ -0,0 +1,154 @@
+import json
+import logging
+
+from fnmatch import fnmatchcase
+from typing import Callable
+
+from source.support.networking import *
+from source.support.channel_name import parse_channel
+from source.support.decoding import LazyMessage
+
+WILDCARDS = "*?["
+
+
+# ######################################################################
+# CHANNEL ROUTER
+# ######################################################################
+
+class ChannelRouter(object):
+    """
+    Dispatches subscription notifications to the handlers registered for
+    their channel. Handlers are registered per channel name or per
+    wildcard pattern (e.g. 'book.*' or 'user.*.any.btc.raw'). The handlers
+    of each channel are resolved once and cached, so routing a message is
+    a single dictionary lookup. Handlers are called as handler(key, data),
+    where key is the parsed ChannelKey of the channel.
+
+    In lazy mode, raw frames are not decoded before routing: frames of
+    channels without handlers are dropped, and handlers receive a
+    LazyMessage (decoded on first access) instead of the data.
+    """
+
+    def __init__(self, default_handler: Callable = None, lazy: bool = False):
+
+        self.__exact = {}
+        self.__patterns = {}
+
+        # Channel name -> (ChannelKey, handlers)
+        self.__routes = {}
+
+        self.default_handler = default_handler
+        self.lazy = lazy
+        self.dropped = 0
+
+    # ##################################################################
+    # REGISTRATION
+    # ##################################################################
+
+    def register(self, channel: str, handler: Callable):
+
+        table = self.__patterns if any(c in channel for c in WILDCARDS) else self.__exact
+        handlers = table.setdefault(channel, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+        self.__routes.clear()
+
+    def unregister(self, channel: str, handler: Callable = None):
+
+        for table in [self.__exact, self.__patterns]:
+            if channel not in table:
+                continue
+            if handler is None:
+                del table[channel]
+            else:
+                table[channel] = [h for h in table[channel] if h != handler]
+                if not table[channel]:
+                    del table[channel]
+
+        self.__routes.clear()
+
+    def handlers(self, channel: str):
+        return list(self.__resolve(channel)[1])
+
+    def __resolve(self, channel):
+
+        route = self.__routes.get(channel)
+        if route is not None:
+            return route
+
+        handlers = list(self.__exact.get(channel, []))
+        for (pattern, pattern_handlers) in self.__patterns.items():
+            if fnmatchcase(channel, pattern):
+                handlers.extend(h for h in pattern_handlers if h not in handlers)
+
+        route = (parse_channel(channel), tuple(handlers))
+        self.__routes[channel] = route
+        return route
+
+    # ##################################################################
+    # DISPATCH
+    # ##################################################################
+
+    def route(self, msg):
+        """
+        Routes a notification (decoded dict, LazyMessage or raw JSON frame).
+        :return: (bool) True if at least one handler received the message.
+        """
+
+        if self.lazy and not isinstance(msg, dict):
+            return self.__route_lazy(msg if isinstance(msg, LazyMessage) else LazyMessage(msg))
+
+        if isinstance(msg, (str, bytes)):
+            msg = json.loads(msg)
+        elif isinstance(msg, LazyMessage):
+            msg = msg.message
+
+        params = msg.get(REQ_PARAMS) if isinstance(msg, dict) else None
+        channel = params.get(NOTIF_CHANNEL) if isinstance(params, dict) else None
+
+        if not channel:
+            if self.default_handler:
+                self.default_handler(None, msg)
+            return False
+
+        key, handlers = self.__resolve(channel)
+        if not handlers:
+            if self.default_handler:
+                self.default_handler(key, msg)
+            return False
+
+        data = params.get(NOTIF_DATA)
+        for handler in handlers:
+            try:
+                handler(key, data)
+            except Exception:
+                logging.exception(f"Handler failed for channel {channel}.")
+
+        return True
+
+    def __route_lazy(self, msg):
+
+        channel = msg.channel
+        key, handlers = self.__resolve(channel) if channel else (None, ())
+
+        if not handlers:
+            if self.default_handler:
+                self.default_handler(key, msg)
+            else:
+                self.dropped += 1
+            return False
+
+        for handler in handlers:
+            try:
+                handler(key, msg)
+            except Exception:
+                logging.exception(f"Handler failed for channel {channel}.")
+
+        return True
+
+    def on_message(self, ws, message):
+        """
+        Delegate for DeribitChannelClient's 'message_handler'.
+        """
+        self.route(message)
@@ -0,0 +1,118 @@
+import time
+
+from collections import deque
+
+CLOCK_FILTER_WINDOW = 8
+CLOCK_DRIFT_HISTORY = 64
+
+# Drift is only estimated over a long enough span (seconds)
+CLOCK_MIN_DRIFT_SPAN = 30.0
+
+
+# ######################################################################
+# CLOCK ESTIMATOR
+# ######################################################################
+
+class ClockEstimator(object):
+    """
+    Estimates the offset (exchange time - local time, in seconds) and the
+    drift of the local clock from request round trips, NTP style: each
+    sample gives an offset and a round trip delay, and the offset of the
+    sample with the lowest delay among the last 'window' ones is kept
+    (the least delayed samples are the least skewed by asymmetric network
+    delays). The drift is the least squares slope of the filtered offsets.
+    """
+
+    def __init__(self, window: int = CLOCK_FILTER_WINDOW, history: int = CLOCK_DRIFT_HISTORY):
+
+        # (delay, offset, local time)
+        self.__samples = deque(maxlen=window)
+
+        # Filtered (local time, offset)
+        self.__history = deque(maxlen=history)
+
+        self.offset = 0.0
+        self.drift = 0.0
+        self.delay = None
+        self.reference = None
+        self.samples = 0
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def is_synchronized(self):
+        return self.reference is not None
+
+    @property
+    def error(self):
+        """
+        :return: (float) Bound of the offset error (half the round trip delay), None if never synchronized.
+        """
+        return self.delay / 2.0 if self.delay is not None else None
+
+    # ##################################################################
+    # SAMPLES
+    # ##################################################################
+
+    def add_sample(self, sent: float, received: float, server_in: float, server_out: float = None):
+        """
+        :param sent: (float) Local time (time.time) the request was sent at.
+        :param received: (float) Local time the response was received at.
+        :param server_in: (float) Exchange time (seconds) the request was received at.
+        :param server_out: (float) Exchange time the response was sent at. Defaults to server_in.
+        """
+
+        if server_out is None:
+            server_out = server_in
+
+        offset = ((server_in - sent) + (server_out - received)) / 2.0
+        delay = max(0.0, (received - sent) - (server_out - server_in))
+
+        self.__samples.append((delay, offset, (sent + received) / 2.0))
+        self.samples += 1
+
+        best = min(self.__samples)
+        if self.__history and self.__history[-1][0] == best[2]:
+            return
+
+        self.__history.append((best[2], best[1]))
+        self.delay, self.offset, self.reference = best
+        self.drift = self.__fit_drift()
+
+    def __fit_drift(self):
+
+        n = len(self.__history)
+        if n < 3 or self.__history[-1][0] - self.__history[0][0] < CLOCK_MIN_DRIFT_SPAN:
+            return self.drift
+
+        mean_t = sum(t for (t, _) in self.__history) / n
+        mean_o = sum(o for (_, o) in self.__history) / n
+        var = sum((t - mean_t) ** 2 for (t, _) in self.__history)
+        if var <= 0.0:
+            return self.drift
+
+        return sum((t - mean_t) * (o - mean_o) for (t, o) in self.__history) / var
+
+    # ##################################################################
+    # CONVERSIONS
+    # ##################################################################
+
+    def offset_at(self, local_time: float):
+        if self.reference is None:
+            return self.offset
+        return self.offset + self.drift * (local_time - self.reference)
+
+    def now_exchange(self):
+        """
+        :return: (float) Current exchange time (seconds since epoch).
+        """
+        now = time.time()
+        return now + self.offset_at(now)
+
+    def to_exchange(self, local_time: float):
+        return local_time + self.offset_at(local_time)
+
+    def to_local(self, exchange_time: float):
+        return exchange_time - self.offset_at(exchange_time)
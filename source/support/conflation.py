@@ -0,0 +1,237 @@
+import json
+import logging
+import itertools
+import threading
+
+from collections import OrderedDict
+from typing import Callable
+
+from source.support.networking import *
+from source.support.channel_name import parse_channel
+from source.support.decoding import extract_channel
+from source.support.types import PUBLIC_CHANNELS
+from source.support.metrics import QUEUE_DEPTH
+
+# Channels carrying a state: only the latest state matters
+STATE_HEADERS = [PUBLIC_CHANNELS.ORDERBOOK_UPDATES.value,
+                 PUBLIC_CHANNELS.QUOTES.value,
+                 "ticker",
+                 PUBLIC_CHANNELS.PRICE_INDEX.value,
+                 "markprice.options"]
+
+MAX_PENDING_EVENTS = 10000
+
+# Numbers the dispatchers of a process, to label their queue depth
+_DISPATCHER_IDS = itertools.count(1)
+
+BOOK_NEW = "new"
+BOOK_CHANGE = "change"
+BOOK_DELETE = "delete"
+BOOK_SNAPSHOT = "snapshot"
+
+
+# ######################################################################
+# MERGING
+# ######################################################################
+
+def merge_book_levels(older, newer):
+    """
+    Merges two lists of book level updates ([action, price, amount]) into
+    the net update of a single price level per price.
+    """
+
+    # price -> [first action, last action, amount]
+    levels = OrderedDict()
+    for (action, price, amount) in list(older) + list(newer):
+        if price in levels:
+            levels[price][1] = action
+            levels[price][2] = amount
+        else:
+            levels[price] = [action, action, amount]
+
+    output = []
+    for (price, (first, last, amount)) in levels.items():
+        if last == BOOK_DELETE:
+            # Created and removed within the window: nothing to report
+            if first != BOOK_NEW:
+                output.append([BOOK_DELETE, price, 0.0])
+        elif first == BOOK_NEW:
+            output.append([BOOK_NEW, price, amount])
+        else:
+            output.append([BOOK_CHANGE, price, amount])
+    return output
+
+
+def merge_book_updates(older, newer):
+    """
+    Merges two consecutive book notifications (data) into a net one.
+    A snapshot followed by deltas stays a snapshot.
+    """
+
+    if newer.get("type") == BOOK_SNAPSHOT:
+        return newer
+
+    merged = dict(newer)
+    merged["type"] = older.get("type", newer.get("type"))
+    if "prev_change_id" in older:
+        merged["prev_change_id"] = older["prev_change_id"]
+    else:
+        merged.pop("prev_change_id", None)
+
+    for side in ["bids", "asks"]:
+        levels = merge_book_levels(older.get(side, []), newer.get(side, []))
+        if merged["type"] == BOOK_SNAPSHOT:
+            levels = [level for level in levels if level[0] != BOOK_DELETE]
+            levels = [[BOOK_NEW, price, amount] for (_, price, amount) in levels]
+        merged[side] = levels
+
+    return merged
+
+
+def is_book_delta(data):
+    return isinstance(data, dict) and data.get("type") in [BOOK_CHANGE, BOOK_SNAPSHOT]
+
+
+# ######################################################################
+# CONFLATING DISPATCHER
+# ######################################################################
+
+class ConflatingDispatcher(object):
+    """
+    Delivers channel messages to a (possibly slow) handler from its own
+    thread. While the handler is busy, messages are conflated per channel:
+    state channels (book, quote, ticker, index) keep only the latest
+    state, book deltas are merged into a net delta, and event channels
+    (e.g. trades) are concatenated up to a bound. A handler keeping up
+    receives every message unchanged.
+
+    The depth of the pending queue is exported per dispatcher, under its
+    'name' (by default 'conflator-<n>').
+    """
+
+    def __init__(self,
+                 handler: Callable,
+                 max_pending_events: int = MAX_PENDING_EVENTS,
+                 daemon: bool = True,
+                 name: str = None):
+
+        self.handler = handler
+        self.max_pending_events = max_pending_events
+        self.name = name or f"conflator-{next(_DISPATCHER_IDS)}"
+        self.__queue_depth = QUEUE_DEPTH.labels(self.name)
+
+        # Channel -> pending message (raw frame or decoded dict)
+        self.__pending = OrderedDict()
+        self.__condition = threading.Condition()
+        self.__ws = None
+        self.__daemon = daemon
+        self.__thread = None
+        self.__is_running = False
+
+        # Statistics
+        self.received = 0
+        self.delivered = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    # ##################################################################
+    # PROPERTIES
+    # ##################################################################
+
+    @property
+    def backlog(self):
+        return len(self.__pending)
+
+    # ##################################################################
+    # LIFECYCLE
+    # ##################################################################
+
+    def start(self):
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__is_running = True
+        self.__thread = threading.Thread(target=self.__deliver_forever, args=())
+        self.__thread.daemon = self.__daemon
+        self.__thread.start()
+
+    def stop(self):
+        with self.__condition:
+            self.__is_running = False
+            self.__condition.notify_all()
+
+    # ##################################################################
+    # RECEPTION
+    # ##################################################################
+
+    def on_message(self, ws, message):
+        """
+        Delegate for DeribitChannelClient's 'message_handler'.
+        """
+
+        if self.__thread is None:
+            self.start()
+
+        self.__ws = ws
+        channel = extract_channel(message) if isinstance(message, str) else None
+
+        # Responses and unknown frames are queued individually
+        key = channel if channel else object()
+
+        with self.__condition:
+            self.received += 1
+            if key in self.__pending:
+                self.__pending[key] = self.__merge(channel, self.__pending[key], message)
+                self.conflated += 1
+            else:
+                self.__pending[key] = message
+            self.__queue_depth.set(len(self.__pending))
+            self.__condition.notify()
+
+    def __merge(self, channel, older, newer):
+
+        older = json.loads(older) if isinstance(older, str) else older
+        newer = json.loads(newer) if isinstance(newer, str) else newer
+
+        header = parse_channel(channel).header
+        old_data = older[REQ_PARAMS][NOTIF_DATA]
+        new_data = newer[REQ_PARAMS][NOTIF_DATA]
+
+        if header in STATE_HEADERS:
+            if header == PUBLIC_CHANNELS.ORDERBOOK_UPDATES.value and is_book_delta(new_data):
+                newer[REQ_PARAMS][NOTIF_DATA] = merge_book_updates(old_data, new_data)
+            return newer
+
+        # Event channels: concatenate, dropping the oldest events beyond the bound
+        events = (old_data if isinstance(old_data, list) else [old_data]) + \
+                 (new_data if isinstance(new_data, list) else [new_data])
+        if len(events) > self.max_pending_events:
+            self.dropped += len(events) - self.max_pending_events
+            events = events[-self.max_pending_events:]
+
+        newer[REQ_PARAMS][NOTIF_DATA] = events
+        return newer
+
+    # ##################################################################
+    # DELIVERY
+    # ##################################################################
+
+    def __deliver_forever(self):
+
+        while True:
+            with self.__condition:
+                while self.__is_running and not self.__pending:
+                    self.__condition.wait()
+                if not self.__is_running:
+                    return
+                _, message = self.__pending.popitem(last=False)
+                self.__queue_depth.set(len(self.__pending))
+
+            if not isinstance(message, str):
+                message = json.dumps(message)
+
+            try:
+                self.handler(self.__ws, message)
+            except Exception:
+                logging.exception("Conflated message handler failed.")
+
+            self.delivered += 1
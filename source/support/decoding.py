@@ -0,0 +1,143 @@
+import json
+
+from source.support.networking import *
+
+NOTIFICATION_MARKER = f'"{REQ_METHOD}":"{NOTIF_METHOD}"'
+WHITESPACE = " \n\r\t"
+SCALAR_DELIMITERS = ",}]" + WHITESPACE
+
+
+# ######################################################################
+# CHEAP FIELD EXTRACTION
+# ######################################################################
+
+def extract_field(frame: str, field: str, start: int = 0):
+    """
+    Extracts the first scalar value of 'field' from a raw JSON frame with
+    plain string searches, without decoding the frame. Meant for fields
+    whose values rarely contain escaped characters (channel names,
+    methods, ids, timestamps): strings with escapes are decoded.
+    :return: The value (str, int, float or bool), None if not found or
+    truncated.
+    """
+
+    token = f'"{field}":'
+    begin = frame.find(token, start)
+    if begin < 0:
+        return None
+
+    size = len(frame)
+    begin += len(token)
+    while begin < size and frame[begin] in WHITESPACE:
+        begin += 1
+
+    if begin >= size:
+        return None
+
+    if frame[begin] == '"':
+        end = _closing_quote(frame, begin + 1)
+        if end < 0:
+            return None
+        value = frame[begin + 1:end]
+        return json.loads(frame[begin:end + 1]) if "\\" in value else value
+
+    end = begin
+    while end < size and frame[end] not in SCALAR_DELIMITERS:
+        end += 1
+
+    try:
+        return json.loads(frame[begin:end])
+    except ValueError:
+        return None
+
+
+def _closing_quote(frame: str, start: int):
+    """
+    :return: (int) Index of the first unescaped quote from 'start', -1 if none.
+    """
+
+    end = frame.find('"', start)
+    while end > 0:
+        # A quote preceded by an odd number of backslashes is escaped
+        escapes = 0
+        while frame[end - 1 - escapes] == "\\":
+            escapes += 1
+        if escapes % 2 == 0:
+            return end
+        end = frame.find('"', end + 1)
+    return -1
+
+
+def is_notification(frame: str):
+    return NOTIFICATION_MARKER in frame or (f'"{NOTIF_METHOD}"' in frame and f'"{NOTIF_CHANNEL}"' in frame)
+
+
+def extract_channel(frame: str):
+    if not is_notification(frame):
+        return None
+    return extract_field(frame, NOTIF_CHANNEL, start=max(0, frame.find(f'"{REQ_PARAMS}"')))
+
+
+# ######################################################################
+# LAZY MESSAGE
+# ######################################################################
+
+class LazyMessage(object):
+    """
+    Raw frame wrapper decoding the JSON payload on first access only.
+    The channel name is extracted cheaply, so frames can be filtered (or
+    routed) without being decoded. Supports read-only dict access to the
+    decoded message.
+    """
+
+    __slots__ = ("frame", "__message", "__channel")
+
+    def __init__(self, frame):
+
+        if isinstance(frame, bytes):
+            frame = frame.decode("utf-8")
+
+        self.frame = frame
+        self.__message = None
+        self.__channel = False
+
+    @property
+    def channel(self):
+        if self.__channel is False:
+            self.__channel = extract_channel(self.frame)
+        return self.__channel
+
+    @property
+    def is_decoded(self):
+        return self.__message is not None
+
+    @property
+    def message(self):
+        if self.__message is None:
+            self.__message = json.loads(self.frame)
+        return self.__message
+
+    @property
+    def data(self):
+        return self.message.get(REQ_PARAMS, {}).get(NOTIF_DATA)
+
+    def peek(self, field: str):
+        """
+        Reads a scalar field without decoding the frame (e.g. 'timestamp').
+        Falls back to the decoded message once it is available.
+        """
+        if self.__message is not None:
+            data = self.data
+            if isinstance(data, dict) and field in data:
+                return data[field]
+        return extract_field(self.frame, field)
+
+    # Read-only dict interface on the decoded message
+    def __getitem__(self, key):
+        return self.message[key]
+
+    def __contains__(self, key):
+        return key in self.message
+
+    def get(self, key, default=None):
+        return self.message.get(key, default)
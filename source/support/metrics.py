@@ -0,0 +1,297 @@
+import abc
+import math
+import time
+import bisect
+import threading
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ######################################################################
+# METRICS
+# ######################################################################
+
+class Metric(abc.ABC):
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        """
+        :return: The child metric for the given label values (created on first use).
+        """
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"Metric {self.name} expects labels {self.label_names}.")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """
+        :return: The child metric of a new combination of label values.
+        """
+
+    def _default(self):
+        return self.labels()
+
+    def samples(self):
+        """
+        :return: (list) (name suffix, label dict, value) tuples.
+        """
+        output = []
+        for (values, child) in list(self._children.items()):
+            labels = dict(zip(self.label_names, values))
+            output.extend((suffix, {**labels, **extra}, value) for (suffix, extra, value) in child.samples())
+        return output
+
+
+class _CounterChild(object):
+
+    def __init__(self):
+        self.value = 0.0
+        self.__lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self.__lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", {}, self.value)]
+
+
+class Counter(Metric):
+
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class _GaugeChild(object):
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_to_current_time(self):
+        self.value = time.time()
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        return [("", {}, self.function() if self.function else self.value)]
+
+
+class Gauge(Metric):
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class _HistogramChild(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.__lock = threading.Lock()
+
+    def observe(self, value: float):
+        n = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            self.counts[n] += 1
+            self.sum += value
+
+    def samples(self):
+        output, cumulative = [], 0
+        for (bound, count) in zip(list(self.buckets) + [math.inf], self.counts):
+            cumulative += count
+            output.append(("_bucket", {"le": _format_value(bound)}, cumulative))
+        output.append(("_sum", {}, self.sum))
+        output.append(("_count", {}, cumulative))
+        return output
+
+
+class Histogram(Metric):
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+
+# ######################################################################
+# REGISTRY
+# ######################################################################
+
+class Registry(object):
+
+    def __init__(self):
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+    def register(self, metric: Metric):
+        with self.__lock:
+            if metric.name in self.__metrics:
+                raise ValueError(f"Metric {metric.name} already registered.")
+            self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name):
+        return self.__metrics.get(name)
+
+    def expose(self):
+        """
+        :return: (str) All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self.__metrics.values()):
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for (suffix, labels, value) in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(text: str):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = [(k, _escape(str(v)).replace('"', '\\"')) for (k, v) in labels.items()]
+    return "{" + ",".join(f'{k}="{v}"' for (k, v) in escaped) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# ######################################################################
+# HTTP ENDPOINT
+# ######################################################################
+
+def start_http_server(port: int = 9100, addr: str = "127.0.0.1", registry: Registry = None):
+    """
+    Serves the registry on http://addr:port/metrics from a daemon thread.
+    :return: (HTTPServer) Call 'shutdown()' to stop serving.
+    """
+
+    # Only imported when the endpoint is actually used
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    registry = registry or REGISTRY
+
+    class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    class _Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ["/", "/metrics"]:
+                self.send_error(404)
+                return
+            body = registry.expose().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = _ThreadingHTTPServer((addr, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, args=())
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+# ######################################################################
+# CLIENT METRICS
+# ######################################################################
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("deribit_requests_total",
+                            "Requests sent to Deribit.", ["method"])
+REQUEST_ERRORS = REGISTRY.counter("deribit_request_errors_total",
+                                  "Requests answered with an error or failed in transport.", ["method"])
+REQUEST_LATENCY = REGISTRY.histogram("deribit_request_latency_seconds",
+                                     "Time between sending a request and receiving its response.", ["method"])
+COALESCED = REGISTRY.counter("deribit_requests_coalesced_total",
+                             "Requests answered by an identical request already in flight.", ["method"])
+CACHE_LOOKUPS = REGISTRY.counter("deribit_cache_lookups_total",
+                                 "Response cache lookups by result (fresh, stale or miss).", ["method", "result"])
+
+MESSAGES_RECEIVED = REGISTRY.counter("deribit_messages_received_total",
+                                     "Subscription notifications received.", ["channel"])
+LAST_MESSAGE_TIME = REGISTRY.gauge("deribit_last_message_timestamp_seconds",
+                                   "Local time of the last notification received.", ["channel"])
+
+CONNECTIONS_OPENED = REGISTRY.counter("deribit_connections_opened_total",
+                                      "Websocket connections opened.", ["client"])
+RECONNECTS = REGISTRY.counter("deribit_reconnects_total",
+                              "Connections lost and re-established by long running services.", ["client"])
+QUEUE_DEPTH = REGISTRY.gauge("deribit_queue_depth",
+                             "Messages or requests waiting in internal queues.", ["queue"])
+
+SHARD_CHANNELS = REGISTRY.gauge("deribit_shard_channels",
+                                "Channels subscribed per connection of a sharded subscription.", ["shard"])
+SHARD_MESSAGE_RATE = REGISTRY.gauge("deribit_shard_message_rate",
+                                    "Notifications per second per connection of a sharded subscription.", ["shard"])
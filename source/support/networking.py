@@ -16,6 +16,14 @@ RESP_CONTENT = "result"
 
 RESP_CONT_TOK_EXP = "expires_in"
 
+# ######################################################################
+# MESSAGE PARSING -- NOTIFICATION (NOTIF)
+# ######################################################################
+
+NOTIF_METHOD = "subscription"
+NOTIF_CHANNEL = "channel"
+NOTIF_DATA = "data"
+
 # ######################################################################
 # REQUEST FORMULATION -- REQUEST (REQ)
 # ######################################################################
@@ -1,12 +1,16 @@
 import sys
 import math
+import time
+
+import source.support.tracing as tracing
 
 from source.support.types import (INSTRUMENT_KIND,
                                   INSTRUMENT_CURRENCY,
                                   ORDER_BOOK_GROUP,
                                   ORDER_TYPE,
                                   TIME_IN_FORCE,
-                                  TRIGGER_PRICE)
+                                  TRIGGER_PRICE,
+                                  INTERVAL)
 
 from source.support.settings import (DEFAULT_CURRENCY,
                                      DEFAULT_INTERVAL,
@@ -20,6 +24,7 @@ from source.support.settings import (DEFAULT_CURRENCY,
 # ######################################################################
 
 def sanitize(**kwargs):
+    started = time.perf_counter_ns() if tracing.TRACER is not None else None
     output = {}
 
     fields = ["instrument",
@@ -42,6 +47,7 @@ def sanitize(**kwargs):
               "count",
               "include_old",
               "order_id",
+              "price",
               ]
 
     for f in fields:
@@ -49,6 +55,9 @@ def sanitize(**kwargs):
             method = getattr(sys.modules[__name__], "sanitize_" + f)
             output[f] = method(kwargs[f])
 
+    if started is not None:
+        tracing.on_sanitize(started)
+
     return output
 
 
@@ -153,6 +162,12 @@ def sanitize_interval(interval_ms=None):
     if not interval_ms:
         return str(DEFAULT_INTERVAL) + "ms"
 
+    # Raw (non-aggregated) channels
+    if isinstance(interval_ms, INTERVAL):
+        interval_ms = interval_ms.value
+    if isinstance(interval_ms, str) and interval_ms.lower() == INTERVAL.RAW.value:
+        return INTERVAL.RAW.value
+
     try:
         interval_ = int(interval_ms)
 
@@ -195,7 +210,7 @@ def sanitize_time_in_force(time_in_force: str = None):
         return TIME_IN_FORCE.GOOD_TIL_CANCELLED.value
 
     time_in_force = time_in_force.lower()
-    for k in ORDER_TYPE:
+    for k in TIME_IN_FORCE:
         if time_in_force == k.value.lower():
             return k.value
 
@@ -241,6 +256,19 @@ def sanitize_limit_price(limit_price: float = None):
     return limit_price
 
 
+def sanitize_price(price: float = None):
+    if price is None:
+        return None
+
+    # Ensure that this is a number
+    price = float(price)
+
+    if price <= 0:
+        raise ValueError(f"Prices must be positive.")
+
+    return price
+
+
 def sanitize_stop_price(stop_price: float = None):
     if not stop_price:
         return None
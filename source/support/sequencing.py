@@ -0,0 +1,183 @@
+import json
+import logging
+
+from typing import Callable
+
+from source.support.networking import *
+from source.support.decoding import extract_channel
+from source.support.channel_name import parse_channel, HEADER_ORDERBOOK, HEADER_TRADE, INTERVAL_RAW
+
+# Book notification types
+BOOK_SNAPSHOT = "snapshot"
+
+
+# ######################################################################
+# RAW FEED SEQUENCER
+# ######################################################################
+
+class RawFeedSequencer(object):
+    """
+    Checks the continuity of raw (non-aggregated) book and trades channels,
+    in front of a message handler (see DeribitChannelClient).
+
+    Raw book changes are chained: the 'prev_change_id' of a change is the
+    'change_id' of the previous one. On a gap, the book is out of sync:
+    its changes are dropped until a new snapshot, which 'resync' (e.g. a
+    resubscription of the channel) is called to obtain. Raw trades carry a
+    'trade_seq' incremented by one per instrument: gaps are reported, and
+    the missing trades can be fetched by sequence number.
+
+    Every other message is forwarded untouched.
+    """
+
+    def __init__(self, handler: Callable, resync: Callable = None, on_gap: Callable = None):
+        """
+        :param handler: (callable) handler(ws, message) receiving the messages in sequence.
+        :param resync: (callable) resync(channel), called once per book gap.
+        :param on_gap: (callable) on_gap(channel, expected, received). Gaps are logged by default.
+        """
+
+        self.handler = handler
+        self.resync = resync
+        self.on_gap = on_gap or self.log_gap
+
+        # Book channel -> last change id (None while out of sync)
+        self.__books = {}
+
+        # (Trades channel, instrument) -> last trade sequence number
+        self.__trades = {}
+
+        # Channel name -> header, when raw book or trades
+        self.__raw = {}
+
+        # Statistics
+        self.gaps = 0
+        self.dropped = 0
+
+    # ##################################################################
+    # STATE
+    # ##################################################################
+
+    def change_id(self, channel: str):
+        """
+        :return: (int) Last change id of a raw book channel, None if out of sync.
+        """
+        return self.__books.get(channel)
+
+    def trade_seq(self, channel: str, instrument: str):
+        return self.__trades.get((channel, instrument))
+
+    def reset(self, channel: str = None):
+        """
+        Forgets the sequence of a channel (or of all of them), e.g. on unsubscription.
+        """
+
+        if channel is None:
+            self.__books.clear()
+            self.__trades.clear()
+            return
+
+        self.__books.pop(channel, None)
+        for key in [k for k in self.__trades if k[0] == channel]:
+            del self.__trades[key]
+
+    @staticmethod
+    def log_gap(channel, expected, received):
+        logging.warning(f"Sequence gap on {channel}: expected {expected}, received {received}.")
+
+    # ##################################################################
+    # RECEPTION
+    # ##################################################################
+
+    def on_message(self, ws, message):
+        """
+        Delegate for DeribitChannelClient's 'message_handler'.
+        """
+
+        channel = extract_channel(message) if isinstance(message, str) else None
+        header = self.__header(channel) if channel else None
+
+        if header is None:
+            self.handler(ws, message)
+            return
+
+        data = json.loads(message)[REQ_PARAMS][NOTIF_DATA]
+        in_sequence = self.on_book(channel, data) if header == HEADER_ORDERBOOK else self.on_trades(channel, data)
+
+        if in_sequence:
+            self.handler(ws, message)
+        else:
+            self.dropped += 1
+
+    def on_book(self, channel: str, data):
+        """
+        :return: (bool) True if the book notification is in sequence.
+        """
+
+        change_id = data.get("change_id")
+
+        if data.get("type") == BOOK_SNAPSHOT or "prev_change_id" not in data:
+            self.__books[channel] = change_id
+            return True
+
+        last = self.__books.get(channel)
+
+        # Out of sync (or not subscribed yet): wait for the snapshot
+        if last is None:
+            return False
+
+        if data["prev_change_id"] != last:
+            self.__gap(channel, last, data["prev_change_id"], resync=True)
+            return False
+
+        self.__books[channel] = change_id
+        return True
+
+    def on_trades(self, channel: str, data):
+        """
+        Trades are never dropped: gaps are only reported.
+        :return: (bool) True.
+        """
+
+        for trade in data if isinstance(data, list) else [data]:
+            key = (channel, trade.get("instrument_name"))
+            seq = trade.get("trade_seq")
+            last = self.__trades.get(key)
+
+            if seq is None:
+                continue
+
+            if last is not None and seq > last + 1:
+                self.__gap(channel, last + 1, seq)
+
+            if last is None or seq > last:
+                self.__trades[key] = seq
+
+        return True
+
+    def __gap(self, channel, expected, received, resync=False):
+
+        self.gaps += 1
+
+        if resync:
+            # Out of sync until the next snapshot
+            self.__books[channel] = None
+
+        try:
+            self.on_gap(channel, expected, received)
+        except Exception:
+            logging.exception(f"Gap handler failed for channel {channel}.")
+
+        if resync and self.resync is not None:
+            self.resync(channel)
+
+    def __header(self, channel):
+
+        header = self.__raw.get(channel, False)
+        if header is False:
+            key = parse_channel(channel)
+            raw = key.interval == INTERVAL_RAW and key.header in [HEADER_ORDERBOOK, HEADER_TRADE]
+            header = key.header if raw else None
+            self.__raw[channel] = header
+
+        return header
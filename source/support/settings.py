@@ -4,4 +4,10 @@ DEFAULT_INTERVAL = 100
 DEFAULT_KIND = "any"
 DEFAULT_INSTRUMENT = "BTC-PERPETUAL"
 DEFAULT_GROUP = 1
+DEFAULT_TRADES_PAGE_SIZE = 1000
+DEFAULT_INDEX_QUOTE = "usd"
 DERIBIT_WSS_URL = "wss://www.deribit.com/ws/api/v2"
+DERIBIT_TEST_WSS_URL = "wss://test.deribit.com/ws/api/v2"
+
+# Authenticated sessions log in again when the token expires within this margin (seconds)
+TOKEN_REFRESH_MARGIN = 60.0
@@ -0,0 +1,87 @@
+import unittest
+
+from unittest import mock
+
+from source.support.cache import ResponseCache, CACHE_FRESH, CACHE_STALE, CACHE_MISS
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("source.support.cache.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = ResponseCache(ttls={"public/get_index": 1.0, "public/get_currencies": 60.0})
+
+    def test_ttl_expiry(self):
+        self.cache.store("k", "public/get_index", ["index"])
+        self.assertEqual(self.cache.lookup("k"), (["index"], CACHE_FRESH))
+
+        # Stale for another TTL, then gone
+        self.clock.now += 1.5
+        self.assertEqual(self.cache.lookup("k"), (["index"], CACHE_STALE))
+        self.clock.now += 1.0
+        self.assertEqual(self.cache.lookup("k"), (None, CACHE_MISS))
+        self.assertEqual(self.cache.size, 0)
+
+        self.assertEqual((self.cache.hits, self.cache.stale_hits, self.cache.misses), (1, 1, 1))
+
+    def test_no_stale_entries_without_revalidation(self):
+        self.cache.stale_while_revalidate = False
+        self.cache.store("k", "public/get_index", ["index"])
+        self.clock.now += 1.5
+        self.assertEqual(self.cache.lookup("k"), (None, CACHE_MISS))
+
+    def test_uncacheable_methods(self):
+        self.assertFalse(self.cache.is_cacheable("public/get_order_book"))
+        self.cache.store("k", "public/get_order_book", ["book"])
+        self.assertEqual(self.cache.lookup("k"), (None, CACHE_MISS))
+
+    def test_lru_eviction(self):
+        self.cache.max_entries = 2
+        self.cache.store("a", "public/get_index", 1)
+        self.cache.store("b", "public/get_index", 2)
+
+        # 'a' becomes the most recently used
+        self.cache.lookup("a")
+        self.cache.store("c", "public/get_index", 3)
+
+        self.assertEqual(self.cache.lookup("b"), (None, CACHE_MISS))
+        self.assertEqual(self.cache.lookup("a"), (1, CACHE_FRESH))
+        self.assertEqual(self.cache.lookup("c"), (3, CACHE_FRESH))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_single_refresh_of_stale_entries(self):
+        self.cache.store("k", "public/get_index", ["old"])
+        self.clock.now += 1.5
+
+        self.assertEqual(self.cache.lookup("k")[1], CACHE_STALE)
+        self.assertTrue(self.cache.begin_refresh("k"))
+        self.assertFalse(self.cache.begin_refresh("k"))
+
+        self.cache.store("k", "public/get_index", ["new"])
+        self.cache.end_refresh("k")
+        self.assertEqual(self.cache.lookup("k"), (["new"], CACHE_FRESH))
+        self.assertTrue(self.cache.begin_refresh("k"))
+
+    def test_invalidate(self):
+        self.cache.store("a", "public/get_index", 1)
+        self.cache.store("b", "public/get_index", 2)
+        self.cache.store("c", "public/get_currencies", 3)
+
+        self.assertEqual(self.cache.invalidate(key="a"), 1)
+        self.assertEqual(self.cache.invalidate(key="a"), 0)
+        self.assertEqual(self.cache.invalidate(method="public/get_index"), 1)
+        self.assertEqual(self.cache.lookup("c"), (3, CACHE_FRESH))
+        self.assertEqual(self.cache.clear(), 1)
+        self.assertEqual(self.cache.size, 0)
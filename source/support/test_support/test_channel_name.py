@@ -0,0 +1,49 @@
+import unittest
+
+from source.support.channel_name import ChannelKey, build_channel, parse_channel
+
+
+class TestParseChannel(unittest.TestCase):
+
+    def test_instrument_channels(self):
+        self.assertEqual(parse_channel("book.BTC-PERPETUAL.100ms"),
+                         ChannelKey("book", "BTC-PERPETUAL", None, None, "100ms"))
+        self.assertEqual(parse_channel("trades.BTC-27DEC24-60000-C.raw"),
+                         ChannelKey("trades", "BTC-27DEC24-60000-C", None, None, "raw"))
+        self.assertEqual(parse_channel("quote.ETH-PERPETUAL"),
+                         ChannelKey("quote", "ETH-PERPETUAL", None, None, None))
+
+    def test_grouped_book(self):
+        self.assertEqual(parse_channel("book.BTC-PERPETUAL.none.10.100ms"),
+                         ChannelKey("book", "BTC-PERPETUAL", "none", 10, "100ms"))
+        self.assertEqual(parse_channel("book.ETH-PERPETUAL.5.20.100ms"),
+                         ChannelKey("book", "ETH-PERPETUAL", 5, 20, "100ms"))
+
+    def test_compound_headers(self):
+        self.assertEqual(parse_channel("user.orders.future.BTC.raw"),
+                         ChannelKey("user.orders", "future.BTC", None, None, "raw"))
+        self.assertEqual(parse_channel("user.portfolio.btc"),
+                         ChannelKey("user.portfolio", "btc", None, None, None))
+        self.assertEqual(parse_channel("markprice.options.btc_usd"),
+                         ChannelKey("markprice.options", "btc_usd", None, None, None))
+
+    def test_index_and_bare_headers(self):
+        self.assertEqual(parse_channel("deribit_price_index.btc_usd"),
+                         ChannelKey("deribit_price_index", "btc_usd", None, None, None))
+        self.assertEqual(parse_channel("user"), ChannelKey("user", None, None, None, None))
+
+    def test_only_durations_are_intervals(self):
+        self.assertEqual(parse_channel("trades.future.BTC.100ms").instrument, "future.BTC")
+        self.assertEqual(parse_channel("ticker.BTC-10MS").interval, None)
+
+    def test_reverse_of_build_channel(self):
+        for (header, instrument, interval, group, depth) in [("book", "BTC-PERPETUAL", "100ms", None, None),
+                                                             ("book", "BTC-PERPETUAL", "100ms", "none", 10),
+                                                             ("trades", "ETH-PERPETUAL", "raw", None, None),
+                                                             ("quote", "BTC-PERPETUAL", None, None, None)]:
+            channel = build_channel(header, instrument, interval=interval, group=group, depth=depth)
+            self.assertEqual(parse_channel(channel), ChannelKey(header, instrument, group, depth, interval))
+
+
+if __name__ == "__main__":
+    unittest.main()
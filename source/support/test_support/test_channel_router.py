@@ -0,0 +1,117 @@
+import json
+import unittest
+
+from source.support.channel_name import ChannelKey
+from source.support.channel_router import ChannelRouter
+from source.support.decoding import LazyMessage
+
+BOOK = "book.BTC-PERPETUAL.100ms"
+TRADES = "trades.BTC-PERPETUAL.100ms"
+
+
+def notification(channel, data):
+    return {"jsonrpc": "2.0", "method": "subscription", "params": {"channel": channel, "data": data}}
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, key, data):
+        self.calls.append((key, data))
+
+
+class TestChannelRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.router = ChannelRouter()
+
+    def test_exact_channels(self):
+        book, trades = Recorder(), Recorder()
+        self.router.register(BOOK, book)
+        self.router.register(TRADES, trades)
+
+        self.assertTrue(self.router.route(notification(BOOK, {"change_id": 1})))
+        self.assertEqual(book.calls, [(ChannelKey("book", "BTC-PERPETUAL", None, None, "100ms"), {"change_id": 1})])
+        self.assertEqual(trades.calls, [])
+
+    def test_wildcards(self):
+        books, everything, raw = Recorder(), Recorder(), Recorder()
+        self.router.register("book.*", books)
+        self.router.register("*", everything)
+        self.router.register("*.BTC-???????.raw", raw)
+
+        self.assertEqual(self.router.handlers(BOOK), [books, everything])
+        self.assertEqual(self.router.handlers(TRADES), [everything])
+        self.assertEqual(self.router.handlers("trades.BTC-27DEC24.raw"), [everything, raw])
+
+    def test_exact_handlers_come_first_and_once(self):
+        handler, other = Recorder(), Recorder()
+        self.router.register("book.*", other)
+        self.router.register("book.*", handler)
+        self.router.register(BOOK, handler)
+        self.router.register(BOOK, handler)
+
+        self.assertEqual(self.router.handlers(BOOK), [handler, other])
+
+        self.router.route(notification(BOOK, 1))
+        self.assertEqual(len(handler.calls), 1)
+
+    def test_registration_resets_cached_routes(self):
+        handler = Recorder()
+        self.assertEqual(self.router.handlers(BOOK), [])
+
+        self.router.register("book.*", handler)
+        self.assertEqual(self.router.handlers(BOOK), [handler])
+
+        self.router.unregister("book.*", handler)
+        self.assertEqual(self.router.handlers(BOOK), [])
+
+    def test_unregister_all_handlers(self):
+        self.router.register(BOOK, Recorder())
+        self.router.register(BOOK, Recorder())
+        self.router.unregister(BOOK)
+
+        self.assertEqual(self.router.handlers(BOOK), [])
+
+    def test_unrouted_messages(self):
+        default = Recorder()
+        self.router.default_handler = default
+        response = {"jsonrpc": "2.0", "id": 1, "result": []}
+
+        self.assertFalse(self.router.route(response))
+        self.assertFalse(self.router.route(json.dumps(notification(TRADES, []))))
+        self.assertEqual(default.calls[0], (None, response))
+        self.assertEqual(default.calls[1][0].header, "trades")
+
+    def test_failing_handlers_do_not_stop_the_others(self):
+        handler = Recorder()
+
+        def failing(key, data):
+            raise ValueError("failed")
+
+        self.router.register(BOOK, failing)
+        self.router.register("book.*", handler)
+
+        with self.assertLogs(level="ERROR"):
+            self.assertTrue(self.router.route(notification(BOOK, 1)))
+        self.assertEqual(len(handler.calls), 1)
+
+    def test_lazy_routing(self):
+        router = ChannelRouter(lazy=True)
+        handler = Recorder()
+        router.register(BOOK, handler)
+
+        self.assertTrue(router.route(json.dumps(notification(BOOK, {"change_id": 5}))))
+        self.assertFalse(router.route(json.dumps(notification(TRADES, []))))
+
+        (key, msg) = handler.calls[0]
+        self.assertIsInstance(msg, LazyMessage)
+        self.assertFalse(msg.is_decoded)
+        self.assertEqual(msg.data, {"change_id": 5})
+        self.assertEqual(router.dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
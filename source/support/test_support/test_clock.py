@@ -0,0 +1,102 @@
+import unittest
+
+from unittest import mock
+
+from source.support.clock import ClockEstimator, CLOCK_MIN_DRIFT_SPAN
+
+T0 = 1700000000.0
+
+
+def sample(estimator, t, offset, forward=0.01, backward=0.01, processing=0.002):
+    """
+    Adds the round trip of a request sent at local time t to an exchange
+    clock ahead by 'offset' seconds.
+    """
+    server_in = t + forward + offset
+    server_out = server_in + processing
+    received = t + forward + processing + backward
+    estimator.add_sample(t, received, server_in, server_out)
+
+
+class TestClockEstimator(unittest.TestCase):
+
+    def test_offset_with_symmetric_delays(self):
+        estimator = ClockEstimator()
+        self.assertFalse(estimator.is_synchronized)
+        self.assertIsNone(estimator.error)
+
+        sample(estimator, T0, offset=2.5)
+
+        self.assertTrue(estimator.is_synchronized)
+        self.assertAlmostEqual(estimator.offset, 2.5, places=6)
+
+        # The server processing time is not part of the delay
+        self.assertAlmostEqual(estimator.delay, 0.02, places=6)
+        self.assertAlmostEqual(estimator.error, 0.01, places=6)
+
+    def test_server_out_defaults_to_server_in(self):
+        estimator = ClockEstimator()
+        estimator.add_sample(T0, T0 + 0.02, T0 + 0.01 - 1.0)
+
+        self.assertAlmostEqual(estimator.offset, -1.0, places=6)
+        self.assertAlmostEqual(estimator.delay, 0.02, places=6)
+
+    def test_least_delayed_sample_is_kept(self):
+        estimator = ClockEstimator(window=4)
+
+        # Asymmetric delays skew the offset by half their difference
+        sample(estimator, T0, offset=1.0, forward=0.2, backward=0.01)
+        self.assertAlmostEqual(estimator.offset, 1.095, places=6)
+
+        sample(estimator, T0 + 1, offset=1.0, forward=0.005, backward=0.005)
+        sample(estimator, T0 + 2, offset=1.0, forward=0.01, backward=0.3)
+
+        self.assertAlmostEqual(estimator.offset, 1.0, places=6)
+        self.assertAlmostEqual(estimator.delay, 0.01, places=6)
+        self.assertAlmostEqual(estimator.reference, T0 + 1 + 0.006, places=6)
+
+    def test_window(self):
+        estimator = ClockEstimator(window=2)
+
+        sample(estimator, T0, offset=1.0, forward=0.001, backward=0.001)
+        sample(estimator, T0 + 1, offset=1.0, forward=0.05, backward=0.03)
+        self.assertAlmostEqual(estimator.delay, 0.002, places=6)
+
+        # The best sample left the window
+        sample(estimator, T0 + 2, offset=1.0, forward=0.04, backward=0.03)
+        self.assertAlmostEqual(estimator.delay, 0.07, places=6)
+        self.assertAlmostEqual(estimator.offset, 1.005, places=6)
+        self.assertEqual(estimator.samples, 3)
+
+    def test_drift(self):
+        estimator = ClockEstimator(window=1)
+        drift = 2e-5
+
+        # No drift before the minimum span
+        for n in range(4):
+            sample(estimator, T0 + n * 5, offset=0.5 + drift * n * 5)
+        self.assertEqual(estimator.drift, 0.0)
+
+        for n in range(1, 31):
+            t = T0 + CLOCK_MIN_DRIFT_SPAN * n / 10
+            sample(estimator, t, offset=0.5 + drift * (t - T0))
+
+        self.assertAlmostEqual(estimator.drift, drift, delta=drift * 0.01)
+
+        # Offsets are extrapolated with the drift
+        later = estimator.reference + 100.0
+        self.assertAlmostEqual(estimator.offset_at(later), 0.5 + drift * (later - T0), places=6)
+
+    def test_conversions(self):
+        estimator = ClockEstimator()
+        sample(estimator, T0, offset=-3.0)
+
+        self.assertAlmostEqual(estimator.to_exchange(T0 + 10), T0 + 7, places=6)
+        self.assertAlmostEqual(estimator.to_local(T0 + 7), T0 + 10, places=6)
+
+        with mock.patch("source.support.clock.time.time", return_value=T0 + 60):
+            self.assertAlmostEqual(estimator.now_exchange(), T0 + 57, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
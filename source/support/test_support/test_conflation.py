@@ -0,0 +1,164 @@
+import json
+import threading
+import unittest
+
+from source.support.metrics import QUEUE_DEPTH
+from source.support.conflation import ConflatingDispatcher, merge_book_levels, merge_book_updates
+
+BOOK = "book.BTC-PERPETUAL.raw"
+TICKER = "ticker.BTC-PERPETUAL.raw"
+TRADES = "trades.BTC-PERPETUAL.raw"
+
+
+def notification(channel, data):
+    return json.dumps({"jsonrpc": "2.0", "method": "subscription", "params": {"channel": channel, "data": data}})
+
+
+def change(prev_change_id, change_id, bids=(), asks=()):
+    return {"type": "change", "prev_change_id": prev_change_id, "change_id": change_id,
+            "bids": [list(level) for level in bids], "asks": [list(level) for level in asks]}
+
+
+def snapshot(change_id, bids=(), asks=()):
+    return {"type": "snapshot", "change_id": change_id,
+            "bids": [list(level) for level in bids], "asks": [list(level) for level in asks]}
+
+
+class TestMergeBookLevels(unittest.TestCase):
+
+    def test_new_then_delete_cancels_out(self):
+        self.assertEqual(merge_book_levels([["new", 100.0, 5.0]], [["delete", 100.0, 0.0]]), [])
+
+    def test_delete_then_new_is_a_change(self):
+        self.assertEqual(merge_book_levels([["delete", 100.0, 0.0]], [["new", 100.0, 7.0]]),
+                         [["change", 100.0, 7.0]])
+
+    def test_change_then_delete_is_a_delete(self):
+        self.assertEqual(merge_book_levels([["change", 100.0, 3.0]], [["delete", 100.0, 0.0]]),
+                         [["delete", 100.0, 0.0]])
+
+    def test_new_then_change_stays_new_with_the_last_amount(self):
+        self.assertEqual(merge_book_levels([["new", 100.0, 3.0]], [["change", 100.0, 4.0]]),
+                         [["new", 100.0, 4.0]])
+
+    def test_levels_keep_their_first_seen_order(self):
+        merged = merge_book_levels([["change", 101.0, 1.0], ["new", 99.0, 2.0]],
+                                   [["change", 100.0, 3.0], ["change", 101.0, 4.0]])
+
+        self.assertEqual(merged, [["change", 101.0, 4.0], ["new", 99.0, 2.0], ["change", 100.0, 3.0]])
+
+
+class TestMergeBookUpdates(unittest.TestCase):
+
+    def test_deltas_merge_into_one_continuous_delta(self):
+        merged = merge_book_updates(change(10, 11, bids=[["new", 100.0, 1.0]]),
+                                    change(11, 12, bids=[["change", 100.0, 2.0]], asks=[["new", 101.0, 3.0]]))
+
+        # Spans from the first delta's predecessor to the last delta
+        self.assertEqual(merged["prev_change_id"], 10)
+        self.assertEqual(merged["change_id"], 12)
+        self.assertEqual(merged["type"], "change")
+        self.assertEqual(merged["bids"], [["new", 100.0, 2.0]])
+        self.assertEqual(merged["asks"], [["new", 101.0, 3.0]])
+
+    def test_chained_merges_keep_the_first_prev_change_id(self):
+        merged = merge_book_updates(merge_book_updates(change(10, 11), change(11, 12)), change(12, 13))
+
+        self.assertEqual((merged["prev_change_id"], merged["change_id"]), (10, 13))
+
+    def test_snapshot_followed_by_deltas_stays_a_snapshot(self):
+        merged = merge_book_updates(snapshot(10, bids=[["new", 100.0, 1.0], ["new", 99.0, 2.0]]),
+                                    change(10, 11, bids=[["delete", 99.0, 0.0], ["change", 100.0, 5.0]],
+                                           asks=[["new", 101.0, 3.0]]))
+
+        self.assertEqual(merged["type"], "snapshot")
+        self.assertEqual(merged["change_id"], 11)
+        self.assertNotIn("prev_change_id", merged)
+
+        # Deleted levels disappear and every remaining level is new
+        self.assertEqual(merged["bids"], [["new", 100.0, 5.0]])
+        self.assertEqual(merged["asks"], [["new", 101.0, 3.0]])
+
+    def test_newer_snapshot_replaces_everything(self):
+        newer = snapshot(20, bids=[["new", 98.0, 1.0]])
+
+        self.assertEqual(merge_book_updates(change(10, 11, bids=[["new", 100.0, 1.0]]), newer), newer)
+
+
+class TestConflatingDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.delivered = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.done = threading.Semaphore(0)
+
+        self.dispatcher = ConflatingDispatcher(handler=self.handler)
+        self.addCleanup(self.dispatcher.stop)
+        self.addCleanup(self.release.set)
+
+    def handler(self, ws, message):
+        self.started.set()
+        self.release.wait(5)
+        self.delivered.append(json.loads(message))
+        self.done.release()
+
+    def block(self):
+        # The first message holds the handler until released
+        self.dispatcher.on_message(None, notification(TICKER, {"last_price": 1.0}))
+        self.assertTrue(self.started.wait(5))
+
+    def drain(self, n):
+        self.release.set()
+        for _ in range(n):
+            self.assertTrue(self.done.acquire(timeout=5))
+
+    def test_book_deltas_are_merged_while_the_handler_is_busy(self):
+        self.block()
+        self.dispatcher.on_message(None, notification(BOOK, change(10, 11, bids=[["new", 100.0, 1.0]])))
+        self.dispatcher.on_message(None, notification(BOOK, change(11, 12, bids=[["delete", 100.0, 0.0]],
+                                                                   asks=[["new", 101.0, 2.0]])))
+        self.dispatcher.on_message(None, notification(BOOK, change(12, 13, asks=[["change", 101.0, 3.0]])))
+        self.drain(2)
+
+        data = self.delivered[1]["params"]["data"]
+        self.assertEqual((data["prev_change_id"], data["change_id"]), (10, 13))
+        self.assertEqual(data["bids"], [])
+        self.assertEqual(data["asks"], [["new", 101.0, 3.0]])
+        self.assertEqual(self.dispatcher.conflated, 2)
+
+    def test_state_keeps_the_latest_and_events_are_concatenated(self):
+        self.block()
+        self.dispatcher.on_message(None, notification(TICKER, {"last_price": 2.0}))
+        self.dispatcher.on_message(None, notification(TICKER, {"last_price": 3.0}))
+        self.dispatcher.on_message(None, notification(TRADES, [{"trade_seq": 1}]))
+        self.dispatcher.on_message(None, notification(TRADES, [{"trade_seq": 2}, {"trade_seq": 3}]))
+        self.drain(3)
+
+        self.assertEqual(self.delivered[1]["params"]["data"], {"last_price": 3.0})
+        self.assertEqual([t["trade_seq"] for t in self.delivered[2]["params"]["data"]], [1, 2, 3])
+
+    def test_responses_are_never_conflated(self):
+        self.block()
+        for id_ in [1, 2]:
+            self.dispatcher.on_message(None, json.dumps({"jsonrpc": "2.0", "id": id_, "result": []}))
+        self.drain(3)
+
+        self.assertEqual([msg.get("id") for msg in self.delivered], [None, 1, 2])
+
+    def test_queue_depth_is_labelled_per_dispatcher(self):
+        other = ConflatingDispatcher(handler=lambda ws, msg: None, name="other")
+        self.addCleanup(other.stop)
+        self.assertNotEqual(self.dispatcher.name, other.name)
+
+        self.block()
+        self.dispatcher.on_message(None, notification(TRADES, [{"trade_seq": 1}]))
+        self.dispatcher.on_message(None, notification(TICKER, {"last_price": 2.0}))
+
+        self.assertEqual(QUEUE_DEPTH.labels(self.dispatcher.name).value, 2)
+        self.assertEqual(QUEUE_DEPTH.labels("other").value, 0)
+        self.drain(3)
+
+
+if __name__ == "__main__":
+    unittest.main()
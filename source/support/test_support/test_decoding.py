@@ -0,0 +1,105 @@
+import json
+import unittest
+
+from source.support.decoding import LazyMessage, extract_field, extract_channel, is_notification
+
+CHANNEL = "book.BTC-PERPETUAL.100ms"
+
+
+def notification(data, channel=CHANNEL):
+    return json.dumps({"jsonrpc": "2.0", "method": "subscription", "params": {"channel": channel, "data": data}})
+
+
+def response(id_, result):
+    return json.dumps({"jsonrpc": "2.0", "id": id_, "result": result, "usIn": 1, "usOut": 2})
+
+
+class TestExtractField(unittest.TestCase):
+
+    def test_scalars(self):
+        frame = '{"id": 42, "price": 1.5e3, "ok": true, "none": null, "name": "BTC"}'
+
+        self.assertEqual(extract_field(frame, "id"), 42)
+        self.assertEqual(extract_field(frame, "price"), 1500.0)
+        self.assertIs(extract_field(frame, "ok"), True)
+        self.assertIsNone(extract_field(frame, "none"))
+        self.assertEqual(extract_field(frame, "name"), "BTC")
+        self.assertIsNone(extract_field(frame, "missing"))
+
+    def test_matches_json_decoding(self):
+        frame = response(7, {"label": "a,b}c", "amount": -10})
+
+        self.assertEqual(extract_field(frame, "id"), 7)
+        self.assertEqual(extract_field(frame, "label"), "a,b}c")
+        self.assertEqual(extract_field(frame, "amount"), -10)
+
+    def test_escaped_quotes_in_values(self):
+        frame = json.dumps({"label": 'say "hi" \\o/', "id": 3})
+
+        self.assertEqual(extract_field(frame, "label"), 'say "hi" \\o/')
+        self.assertEqual(extract_field(frame, "id"), 3)
+
+    def test_escaped_field_names_in_values_are_skipped(self):
+        frame = json.dumps({"label": '"id": 1', "id": 2})
+
+        self.assertEqual(extract_field(frame, "id"), 2)
+
+    def test_truncated_frames(self):
+        self.assertIsNone(extract_field('{"id":', "id"))
+        self.assertIsNone(extract_field('{"id":   ', "id"))
+        self.assertIsNone(extract_field('{"name": "BT', "name"))
+        self.assertIsNone(extract_field('{"name": "BT\\"', "name"))
+
+    def test_start(self):
+        frame = '{"id": 1, "params": {"id": 2}}'
+
+        self.assertEqual(extract_field(frame, "id", start=frame.find('"params"')), 2)
+
+
+class TestExtractChannel(unittest.TestCase):
+
+    def test_notifications(self):
+        frame = notification({"timestamp": 1})
+
+        self.assertTrue(is_notification(frame))
+        self.assertEqual(extract_channel(frame), CHANNEL)
+
+    def test_compact_notifications(self):
+        frame = json.dumps(json.loads(notification({})), separators=(",", ":"))
+
+        self.assertEqual(extract_channel(frame), CHANNEL)
+
+    def test_responses_have_no_channel(self):
+        self.assertIsNone(extract_channel(response(1, ["ticker.BTC-PERPETUAL.100ms"])))
+        self.assertIsNone(extract_channel(response(1, {"channel": "x"})))
+
+
+class TestLazyMessage(unittest.TestCase):
+
+    def test_channel_without_decoding(self):
+        msg = LazyMessage(notification({"timestamp": 5, "bids": []}).encode("utf-8"))
+
+        self.assertEqual(msg.channel, CHANNEL)
+        self.assertEqual(msg.peek("timestamp"), 5)
+        self.assertFalse(msg.is_decoded)
+
+    def test_decoding_on_access(self):
+        msg = LazyMessage(notification({"timestamp": 5, "label": 'a "b"'}))
+
+        self.assertEqual(msg.data, {"timestamp": 5, "label": 'a "b"'})
+        self.assertTrue(msg.is_decoded)
+        self.assertEqual(msg.peek("label"), 'a "b"')
+        self.assertIn("params", msg)
+        self.assertEqual(msg["method"], "subscription")
+        self.assertIsNone(msg.get("id"))
+
+    def test_responses(self):
+        msg = LazyMessage(response(9, {"state": "open"}))
+
+        self.assertIsNone(msg.channel)
+        self.assertIsNone(msg.data)
+        self.assertEqual(msg["id"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
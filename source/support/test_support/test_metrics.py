@@ -0,0 +1,81 @@
+import unittest
+import urllib.request
+
+from source.support.metrics import Registry, Metric, start_http_server, CONTENT_TYPE
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_and_gauge(self):
+        requests = self.registry.counter("requests_total", "Requests sent.", ["method"])
+        depth = self.registry.gauge("queue_depth", "Queued messages.")
+
+        requests.labels("public/get_time").inc()
+        requests.labels("public/get_time").inc(2)
+        requests.labels("private/buy").inc()
+        depth.set(3.5)
+
+        self.assertEqual(self.registry.expose(),
+                         "# HELP requests_total Requests sent.\n"
+                         "# TYPE requests_total counter\n"
+                         'requests_total{method="public/get_time"} 3\n'
+                         'requests_total{method="private/buy"} 1\n'
+                         "# HELP queue_depth Queued messages.\n"
+                         "# TYPE queue_depth gauge\n"
+                         "queue_depth 3.5\n")
+
+    def test_label_escaping(self):
+        counter = self.registry.counter("escaped_total", "Back\\slash\nand newline.", ["label"])
+        counter.labels('quote " back\\slash \n newline').inc()
+
+        lines = self.registry.expose().splitlines()
+        self.assertEqual(lines[0], "# HELP escaped_total Back\\\\slash\\nand newline.")
+        self.assertEqual(lines[2], 'escaped_total{label="quote \\" back\\\\slash \\n newline"} 1')
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram("latency_seconds", "Latency.", ["method"], buckets=(0.5, 0.1, 1.0))
+
+        for value in [0.05, 0.1, 0.3, 0.7, 5.0]:
+            latency.labels("get").observe(value)
+
+        samples = [line for line in self.registry.expose().splitlines() if not line.startswith("#")]
+        self.assertEqual(samples, ['latency_seconds_bucket{method="get",le="0.1"} 2',
+                                   'latency_seconds_bucket{method="get",le="0.5"} 3',
+                                   'latency_seconds_bucket{method="get",le="1"} 4',
+                                   'latency_seconds_bucket{method="get",le="+Inf"} 5',
+                                   'latency_seconds_sum{method="get"} 6.15',
+                                   'latency_seconds_count{method="get"} 5'])
+
+    def test_gauge_function(self):
+        gauge = self.registry.gauge("size", "Size.")
+        gauge.labels().set_function(lambda: 7)
+
+        self.assertIn("size 7\n", self.registry.expose())
+
+    def test_registration_errors(self):
+        self.registry.counter("twice_total", "Twice.", ["a"])
+
+        with self.assertRaises(ValueError):
+            self.registry.gauge("twice_total", "Twice.")
+        with self.assertRaises(ValueError):
+            self.registry.get("twice_total").labels("a", "b")
+        with self.assertRaises(TypeError):
+            Metric("abstract", "Abstract.")
+
+    def test_http_endpoint(self):
+        self.registry.counter("served_total", "Served.").inc()
+        server = start_http_server(port=0, registry=self.registry)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.assertEqual(response.headers["Content-Type"], CONTENT_TYPE)
+            self.assertIn("served_total 1", response.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import unittest
+
+from source.support.sequencing import RawFeedSequencer
+
+BOOK = "book.BTC-PERPETUAL.raw"
+TRADES = "trades.BTC-PERPETUAL.raw"
+
+
+def notification(channel, data):
+    return json.dumps({"jsonrpc": "2.0", "method": "subscription", "params": {"channel": channel, "data": data}})
+
+
+def snapshot(change_id):
+    return notification(BOOK, {"type": "snapshot", "change_id": change_id, "bids": [], "asks": []})
+
+
+def change(prev_change_id, change_id):
+    return notification(BOOK, {"type": "change", "prev_change_id": prev_change_id, "change_id": change_id,
+                               "bids": [], "asks": []})
+
+
+def trades(*seqs, instrument="BTC-PERPETUAL"):
+    return notification(TRADES, [{"instrument_name": instrument, "trade_seq": s} for s in seqs])
+
+
+class TestRawFeedSequencer(unittest.TestCase):
+
+    def setUp(self):
+        self.delivered = []
+        self.resyncs = []
+        self.gaps = []
+        self.sequencer = RawFeedSequencer(handler=lambda ws, msg: self.delivered.append(msg),
+                                          resync=self.resyncs.append,
+                                          on_gap=lambda *gap: self.gaps.append(gap))
+
+    def feed(self, *messages):
+        for msg in messages:
+            self.sequencer.on_message(None, msg)
+
+    def test_book_in_sequence(self):
+        self.feed(snapshot(10), change(10, 11), change(11, 15))
+
+        self.assertEqual(len(self.delivered), 3)
+        self.assertEqual(self.sequencer.change_id(BOOK), 15)
+        self.assertEqual(self.sequencer.gaps, 0)
+
+    def test_book_gap_resyncs_until_the_next_snapshot(self):
+        self.feed(snapshot(10), change(10, 11), change(12, 13))
+
+        self.assertEqual(self.gaps, [(BOOK, 11, 12)])
+        self.assertEqual(self.resyncs, [BOOK])
+        self.assertIsNone(self.sequencer.change_id(BOOK))
+
+        # Dropped while out of sync, without a second resync
+        self.feed(change(13, 14))
+        self.assertEqual(self.resyncs, [BOOK])
+        self.assertEqual(self.sequencer.dropped, 2)
+
+        self.feed(snapshot(20), change(20, 21))
+        self.assertEqual(len(self.delivered), 4)
+        self.assertEqual(self.sequencer.change_id(BOOK), 21)
+
+    def test_changes_before_the_snapshot_are_dropped(self):
+        self.feed(change(9, 10), snapshot(10))
+
+        self.assertEqual(self.sequencer.dropped, 1)
+        self.assertEqual(self.sequencer.gaps, 0)
+        self.assertEqual(self.resyncs, [])
+
+    def test_trade_gaps_are_reported_not_dropped(self):
+        self.feed(trades(1, 2), trades(3), trades(6, 7), trades(5))
+
+        self.assertEqual(len(self.delivered), 4)
+        self.assertEqual(self.gaps, [(TRADES, 4, 6)])
+        self.assertEqual(self.sequencer.trade_seq(TRADES, "BTC-PERPETUAL"), 7)
+        self.assertEqual(self.resyncs, [])
+
+    def test_trade_sequences_per_instrument(self):
+        self.feed(trades(1), trades(100, instrument="BTC-27DEC24"), trades(2), trades(101, instrument="BTC-27DEC24"))
+        self.assertEqual(self.gaps, [])
+
+    def test_other_messages_are_forwarded(self):
+        other = [notification("book.BTC-PERPETUAL.100ms", {"change_id": 5, "prev_change_id": 1}),
+                 notification("ticker.BTC-PERPETUAL.raw", {"timestamp": 1}),
+                 json.dumps({"jsonrpc": "2.0", "id": 1, "result": []})]
+        self.feed(*other)
+
+        self.assertEqual(self.delivered, other)
+        self.assertEqual(self.sequencer.gaps, 0)
+
+    def test_reset(self):
+        self.feed(snapshot(10), trades(1))
+        self.sequencer.reset(BOOK)
+        self.assertIsNone(self.sequencer.change_id(BOOK))
+        self.assertEqual(self.sequencer.trade_seq(TRADES, "BTC-PERPETUAL"), 1)
+
+        self.sequencer.reset()
+        self.assertIsNone(self.sequencer.trade_seq(TRADES, "BTC-PERPETUAL"))
@@ -0,0 +1,134 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from unittest import mock
+
+import source.support.tracing as tracing
+import source.features.data as data
+
+from source.clients.connection import DeribitConnection
+from source.clients.test_clients.exchange import FakeExchange
+from source.support.transport import TransportConfig
+
+MS = 1000000
+
+
+class TestTrace(unittest.TestCase):
+
+    def test_phases(self):
+        with mock.patch("source.support.tracing.time.perf_counter_ns", side_effect=[3 * MS, 10 * MS]):
+            trace = tracing.Trace("public/get_time", start_ns=1 * MS)
+            trace.mark(tracing.PHASE_ENCODE)
+            trace.mark(tracing.PHASE_SEND)
+
+        self.assertEqual(trace.phases(), [(tracing.PHASE_ENCODE, 2 * MS), (tracing.PHASE_SEND, 7 * MS)])
+        self.assertEqual(trace.duration_ns, 9 * MS)
+        self.assertEqual(trace.to_dict(), {"name": "public/get_time", "kind": tracing.KIND_REQUEST,
+                                           "duration_ms": 9.0, "phases_ms": {"encode": 2.0, "send": 7.0},
+                                           "tags": {}})
+
+    def test_no_marks(self):
+        self.assertEqual(tracing.Trace("x").duration_ns, 0)
+
+
+class TestTracingHooks(unittest.TestCase):
+
+    def setUp(self):
+        self.tracer = tracing.SlowRequestSampler(threshold_ms=0.0, kinds=(tracing.KIND_REQUEST,
+                                                                          tracing.KIND_NOTIFICATION))
+        self.tracer.write = lambda trace: None
+        tracing.set_tracer(self.tracer)
+        self.addCleanup(tracing.set_tracer, None)
+
+    def test_disabled(self):
+        tracing.set_tracer(None)
+
+        self.assertIsNone(tracing.start("book.BTC-PERPETUAL.100ms", tracing.KIND_NOTIFICATION))
+        self.assertIsNone(tracing.start_request("public/get_index"))
+        tracing.finish(None)
+
+    def test_request_includes_the_message_build(self):
+        data.request_index(currency="BTC")
+        trace = tracing.start_request("public/get_index")
+
+        self.assertEqual([phase for (phase, _) in trace.phases()], [tracing.PHASE_SANITIZE, tracing.PHASE_BUILD])
+        self.assertTrue(all(ns >= 0 for (_, ns) in trace.phases()))
+
+        # The pending build is consumed by the request it belongs to
+        self.assertEqual(tracing.start_request("public/get_index").marks, [])
+
+    def test_request_phases_on_a_connection(self):
+        with FakeExchange(handlers={"public/get_index": lambda params: {"BTC": 1.0}}) as exchange:
+
+            async def _main():
+                async with DeribitConnection(transport=TransportConfig(url=exchange.url)) as connection:
+                    await connection.request(data.request_index(currency="BTC"))
+
+            asyncio.run(_main())
+
+        (trace,) = self.tracer.traces
+        self.assertEqual(trace.name, "public/get_index")
+        self.assertEqual([phase for (phase, _) in trace.phases()],
+                         [tracing.PHASE_SANITIZE, tracing.PHASE_BUILD, tracing.PHASE_ENCODE, tracing.PHASE_SEND,
+                          tracing.PHASE_WAIT, tracing.PHASE_DECODE, tracing.PHASE_DISPATCH])
+
+
+class TestSlowRequestSampler(unittest.TestCase):
+
+    def trace(self, sampler, duration_ms, name="public/get_time"):
+        trace = sampler.start(name)
+        trace.start_ns = 0
+        trace.marks.append((tracing.PHASE_SEND, int(duration_ms * MS)))
+        sampler.finish(trace)
+        return trace
+
+    def test_only_slow_traces_are_kept(self):
+        sampler = tracing.SlowRequestSampler(threshold_ms=50.0)
+
+        with self.assertLogs(level="WARNING") as logs:
+            self.trace(sampler, 10.0)
+            slow = self.trace(sampler, 75.0)
+
+        self.assertEqual(list(sampler.traces), [slow])
+        self.assertEqual((sampler.started, sampler.slow), (2, 1))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("public/get_time (75.000 ms): send=75.000", logs.output[0])
+
+    def test_sampling_and_kinds(self):
+        self.assertIsNone(tracing.SlowRequestSampler(rate=0.0).start("public/get_time"))
+        self.assertIsNone(tracing.SlowRequestSampler().start("book.BTC-PERPETUAL.100ms", tracing.KIND_NOTIFICATION))
+
+        with mock.patch("source.support.tracing.random.random", side_effect=[0.2, 0.8]):
+            sampler = tracing.SlowRequestSampler(rate=0.5)
+            self.assertIsNotNone(sampler.start("public/get_time"))
+            self.assertIsNone(sampler.start("public/get_time"))
+        self.assertEqual(sampler.started, 1)
+
+    def test_capacity(self):
+        sampler = tracing.SlowRequestSampler(threshold_ms=0.0, capacity=2)
+        sampler.write = lambda trace: None
+
+        traces = [self.trace(sampler, n) for n in range(3)]
+        self.assertEqual(list(sampler.traces), traces[1:])
+
+    def test_json_lines(self):
+        (handle, path) = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        sampler = tracing.SlowRequestSampler(threshold_ms=1.0, path=path)
+        self.trace(sampler, 2.0, name="private/buy")
+        self.trace(sampler, 3.0, name="private/sell")
+
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([(line["name"], line["duration_ms"]) for line in lines],
+                         [("private/buy", 2.0), ("private/sell", 3.0)])
+        self.assertEqual(lines[0]["phases_ms"], {"send": 2.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
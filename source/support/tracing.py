@@ -0,0 +1,237 @@
+import json
+import time
+import random
+import logging
+import threading
+import contextvars
+
+from collections import deque
+
+# Phases, named after the stage ending at the mark
+PHASE_SANITIZE = "sanitize"
+PHASE_BUILD = "build"
+PHASE_CONNECT = "connect"
+PHASE_LOGIN = "login"
+PHASE_ENCODE = "encode"
+PHASE_SEND = "send"
+PHASE_WAIT = "wait"
+PHASE_DECODE = "decode"
+PHASE_SIGNAL = "signal"
+PHASE_DISPATCH = "dispatch"
+
+# Trace kinds
+KIND_REQUEST = "request"
+KIND_NOTIFICATION = "notification"
+
+DEFAULT_SLOW_THRESHOLD_MS = 100.0
+DEFAULT_SAMPLER_CAPACITY = 1000
+
+# Active tracer, None when tracing is disabled
+TRACER = None
+
+# Timings of the message being built in the current context: [begin ns, sanitize ns, built]
+_PENDING_BUILD = contextvars.ContextVar("pending_build", default=None)
+
+
+# ######################################################################
+# TRACES
+# ######################################################################
+
+class Trace(object):
+    """
+    High resolution (perf_counter_ns) marks of a request or notification
+    going through the client. Each mark closes the phase it is named after,
+    which started at the previous mark.
+    """
+
+    __slots__ = ("name", "kind", "start_ns", "marks", "tags")
+
+    def __init__(self, name: str, kind: str = KIND_REQUEST, start_ns: int = None):
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns if start_ns is not None else time.perf_counter_ns()
+        self.marks = []
+        self.tags = {}
+
+    def mark(self, phase: str):
+        self.marks.append((phase, time.perf_counter_ns()))
+
+    @property
+    def duration_ns(self):
+        return (self.marks[-1][1] if self.marks else self.start_ns) - self.start_ns
+
+    def phases(self):
+        """
+        :return: (list) (phase, duration in ns) tuples, in order.
+        """
+        output, previous = [], self.start_ns
+        for (phase, t) in self.marks:
+            output.append((phase, t - previous))
+            previous = t
+        return output
+
+    def to_dict(self):
+        return {"name": self.name,
+                "kind": self.kind,
+                "duration_ms": self.duration_ns / 1e6,
+                "phases_ms": {phase: ns / 1e6 for (phase, ns) in self.phases()},
+                "tags": self.tags}
+
+
+# ######################################################################
+# TRACERS
+# ######################################################################
+
+class Tracer(object):
+    """
+    Interface called by the clients at the phase boundaries of requests and
+    notifications. 'start' may return None to skip tracing a message;
+    'finish' receives the completed trace.
+    """
+
+    def start(self, name: str, kind: str = KIND_REQUEST, start_ns: int = None):
+        return Trace(name=name, kind=kind, start_ns=start_ns)
+
+    def finish(self, trace: Trace):
+        pass
+
+
+class SlowRequestSampler(Tracer):
+    """
+    Traces a fraction of the messages and keeps (and writes) those slower
+    than a threshold. Traces are logged as warnings, or appended as JSON
+    lines to 'path' when given.
+    """
+
+    def __init__(self,
+                 threshold_ms: float = DEFAULT_SLOW_THRESHOLD_MS,
+                 rate: float = 1.0,
+                 path: str = None,
+                 capacity: int = DEFAULT_SAMPLER_CAPACITY,
+                 kinds=(KIND_REQUEST,)):
+
+        self.threshold_ns = int(threshold_ms * 1e6)
+        self.rate = rate
+        self.path = path
+        self.kinds = tuple(kinds)
+        self.traces = deque(maxlen=capacity)
+
+        self.started = 0
+        self.slow = 0
+
+        self.__lock = threading.Lock()
+
+    def start(self, name: str, kind: str = KIND_REQUEST, start_ns: int = None):
+        if kind not in self.kinds or (self.rate < 1.0 and random.random() >= self.rate):
+            return None
+        self.started += 1
+        return Trace(name=name, kind=kind, start_ns=start_ns)
+
+    def finish(self, trace: Trace):
+
+        if trace.duration_ns < self.threshold_ns:
+            return
+
+        self.slow += 1
+        self.traces.append(trace)
+        self.write(trace)
+
+    def write(self, trace: Trace):
+
+        if not self.path:
+            phases = ", ".join(f"{phase}={ns / 1e6:.3f}" for (phase, ns) in trace.phases())
+            logging.warning(f"Slow {trace.kind} {trace.name} ({trace.duration_ns / 1e6:.3f} ms): {phases}")
+            return
+
+        line = json.dumps(trace.to_dict())
+        with self.__lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+# ######################################################################
+# HOOKS
+# ######################################################################
+
+def set_tracer(tracer: Tracer = None):
+    """
+    Enables tracing with the given tracer, or disables it with None.
+    """
+    global TRACER
+    TRACER = tracer
+    _PENDING_BUILD.set(None)
+
+
+def get_tracer():
+    return TRACER
+
+
+def start(name: str, kind: str = KIND_REQUEST, start_ns: int = None):
+    """
+    :return: (Trace) A new trace, None when tracing is disabled or the
+    tracer skips this message.
+    """
+
+    if TRACER is None:
+        return None
+
+    return TRACER.start(name=name, kind=kind, start_ns=start_ns)
+
+
+def start_request(name: str):
+    """
+    Starts a request trace, including the build and sanitize phases of the
+    message built in the current context (see 'on_build' and 'on_sanitize').
+    """
+
+    if TRACER is None:
+        return None
+
+    pending = _PENDING_BUILD.get()
+    if pending is None:
+        return TRACER.start(name=name, kind=KIND_REQUEST)
+
+    _PENDING_BUILD.set(None)
+    (begin, sanitize_ns, _) = pending
+
+    trace = TRACER.start(name=name, kind=KIND_REQUEST, start_ns=begin)
+    if trace is not None:
+        # Build excludes the sanitize time, wherever it happened in the builder
+        trace.marks.append((PHASE_SANITIZE, begin + sanitize_ns))
+        trace.mark(PHASE_BUILD)
+    return trace
+
+
+def finish(trace: Trace):
+    if trace is not None and TRACER is not None:
+        TRACER.finish(trace)
+
+
+def on_build():
+    """
+    Called by the message builders (see features.common.message).
+    """
+
+    if TRACER is None:
+        return
+
+    pending = _PENDING_BUILD.get()
+    if pending is None or pending[2]:
+        _PENDING_BUILD.set([time.perf_counter_ns(), 0, True])
+    else:
+        pending[2] = True
+
+
+def on_sanitize(started_ns: int):
+    """
+    Called by 'sanitize' with the time it started at.
+    """
+
+    elapsed = time.perf_counter_ns() - started_ns
+
+    pending = _PENDING_BUILD.get()
+    if pending is None or pending[2]:
+        # Builders sanitize before creating the message: a new one is being built
+        _PENDING_BUILD.set([started_ns, elapsed, False])
+    else:
+        pending[1] += elapsed
@@ -0,0 +1,123 @@
+import socket
+
+from source.support.settings import DERIBIT_WSS_URL
+
+# Frames above this size close the connection (full depth books of every
+# instrument stay well below it)
+DEFAULT_MAX_FRAME_SIZE = 2 ** 26
+
+# Frames read but not yet consumed, per connection
+DEFAULT_READ_QUEUE_SIZE = 32
+
+# Bytes buffered by the writer before it pauses
+DEFAULT_WRITE_LIMIT = 2 ** 16
+
+# permessage-deflate (RFC 7692)
+COMPRESSION_DEFLATE = "deflate"
+
+
+# ######################################################################
+# TRANSPORT CONFIGURATION
+# ######################################################################
+
+class TransportConfig(object):
+    """
+    Websocket transport settings shared by the clients and connections.
+
+    Compression trades CPU for bandwidth: frames are deflated by the
+    exchange and inflated by the client, which mostly pays off on slow
+    links with large frames (e.g. full depth books). See
+    'benchmarks/bench_compression.py'. The socket buffer sizes are left
+    to the OS when None.
+
+    DeribitChannelClient (websocket-client) ignores the compression, frame
+    size, queue and write limit settings, which that library does not support.
+    """
+
+    def __init__(self,
+                 url: str = DERIBIT_WSS_URL,
+                 compression: bool = True,
+                 max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+                 read_buffer: int = None,
+                 write_buffer: int = None,
+                 tcp_nodelay: bool = True,
+                 read_queue_size: int = DEFAULT_READ_QUEUE_SIZE,
+                 write_limit: int = DEFAULT_WRITE_LIMIT):
+        """
+        :param url: (str) Websocket url of the API.
+        :param compression: (bool) Negotiate permessage-deflate.
+        :param max_frame_size: (int) Largest frame accepted (bytes), None for no limit.
+        :param read_buffer: (int) Socket receive buffer (SO_RCVBUF, bytes).
+        :param write_buffer: (int) Socket send buffer (SO_SNDBUF, bytes).
+        :param tcp_nodelay: (bool) Disable Nagle's algorithm (TCP_NODELAY).
+        :param read_queue_size: (int) Frames read ahead of the consumer before reading pauses.
+        :param write_limit: (int) Bytes buffered by the writer before sends wait for the socket.
+        """
+
+        self.url = url
+        self.compression = compression
+        self.max_frame_size = max_frame_size
+        self.read_buffer = read_buffer
+        self.write_buffer = write_buffer
+        self.tcp_nodelay = tcp_nodelay
+        self.read_queue_size = read_queue_size
+        self.write_limit = write_limit
+
+    def __repr__(self):
+        return f"TransportConfig({', '.join(f'{k}={v!r}' for (k, v) in vars(self).items())})"
+
+    def copy(self, **changes):
+        """
+        :return: (TransportConfig) A copy with some settings changed (e.g. url).
+        """
+        settings = dict(vars(self))
+        settings.update(changes)
+        return TransportConfig(**settings)
+
+    # ##################################################################
+    # OPTIONS
+    # ##################################################################
+
+    def connect_kwargs(self):
+        """
+        :return: (dict) Keyword arguments of 'websockets.connect'.
+        """
+        return {"compression": COMPRESSION_DEFLATE if self.compression else None,
+                "max_size": self.max_frame_size,
+                "max_queue": self.read_queue_size,
+                "write_limit": self.write_limit}
+
+    def socket_options(self):
+        """
+        :return: (list) (level, option, value) socket options (e.g. the
+        'sockopt' of websocket-client's 'run_forever').
+        """
+
+        options = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if self.tcp_nodelay else 0)]
+
+        if self.read_buffer:
+            options.append((socket.SOL_SOCKET, socket.SO_RCVBUF, int(self.read_buffer)))
+
+        if self.write_buffer:
+            options.append((socket.SOL_SOCKET, socket.SO_SNDBUF, int(self.write_buffer)))
+
+        return options
+
+    def configure(self, websocket):
+        """
+        Applies the socket options to an open 'websockets' connection.
+        :return: The connection.
+        """
+
+        transport = getattr(websocket, "transport", None)
+        sock = transport.get_extra_info("socket") if transport is not None else None
+
+        if sock is not None:
+            for (level, option, value) in self.socket_options():
+                try:
+                    sock.setsockopt(level, option, value)
+                except OSError:
+                    # e.g. TCP options on a proxied or unix socket
+                    pass
+
+        return websocket
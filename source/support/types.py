@@ -35,6 +35,22 @@ class PUBLIC_CHANNELS(Enum):
     ORDERBOOK_UPDATES = "book"
     QUOTES = "quote"
     TRADES = "trades"
+    PRICE_INDEX = "deribit_price_index"
+
+
+class PRIVATE_CHANNELS(Enum):
+    USER_ORDERS = "user.orders"
+    USER_TRADES = "user.trades"
+    USER_CHANGES = "user.changes"
+    USER_PORTFOLIO = "user.portfolio"
+
+
+class ORDER_STATE(Enum):
+    OPEN = "open"
+    UNTRIGGERED = "untriggered"
+    FILLED = "filled"
+    REJECTED = "rejected"
+    CANCELLED = "cancelled"
 
 
 class ORDER_TYPE(Enum):
@@ -0,0 +1,56 @@
+import sys
+import json
+import unittest
+
+from unittest import mock
+
+from source.utilities import LazyModule, lazy_import, unwrap_results
+
+
+class TestLazyModule(unittest.TestCase):
+
+    def test_module_is_imported_on_first_access(self):
+        sys.modules.pop("colorsys", None)
+        colorsys = lazy_import("colorsys")
+
+        self.assertIsInstance(colorsys, LazyModule)
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("colorsys", sys.modules)
+
+    def test_imported_modules_are_returned_as_is(self):
+        self.assertIs(lazy_import("json"), json)
+
+    def test_patched_attributes_are_visible(self):
+        lazy_json = LazyModule("json")
+        self.assertEqual(lazy_json.dumps([1]), "[1]")
+
+        with mock.patch("json.dumps", return_value="patched"):
+            self.assertEqual(lazy_json.dumps([1]), "patched")
+        self.assertEqual(lazy_json.dumps([1]), "[1]")
+
+    def test_attributes_are_set_on_the_module(self):
+        lazy_json = LazyModule("json")
+
+        with mock.patch.object(lazy_json, "loads", return_value="patched"):
+            self.assertEqual(json.loads("[1]"), "patched")
+        self.assertEqual(json.loads("[1]"), [1])
+        self.assertNotIn("loads", vars(lazy_json))
+
+    def test_missing_attributes(self):
+        with self.assertRaises(AttributeError):
+            LazyModule("json").missing
+
+
+class TestUnwrapResults(unittest.TestCase):
+
+    def test_responses_are_flattened(self):
+        responses = [{"result": [1, 2]}, {"result": 3}, [{"result": [4]}], 5]
+
+        self.assertEqual(unwrap_results(responses), [1, 2, 3, 4, 5])
+        self.assertEqual(unwrap_results({"result": {"a": 1}}), [{"a": 1}])
+        self.assertEqual(unwrap_results(None), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
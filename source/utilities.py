@@ -1,7 +1,56 @@
-import asyncio
+import sys
 import logging
 import random
 import string
+import importlib
+
+from source.support.networking import RESP_CONTENT
+
+
+# ######################################################################
+# LAZY IMPORTS
+# ######################################################################
+
+class LazyModule(object):
+    """
+    Stand-in for a module, imported on first attribute access. Attributes
+    are always read from (and written to) the module itself, so the
+    stand-in never holds a stale copy (e.g. of a patched attribute).
+    """
+
+    def __init__(self, name):
+        self.__dict__["_LazyModule__name"] = name
+        self.__dict__["_LazyModule__module"] = None
+
+    def __load(self):
+        if self.__module is None:
+            self.__dict__["_LazyModule__module"] = importlib.import_module(self.__name)
+        return self.__module
+
+    def __getattr__(self, attr):
+        return getattr(self.__load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self.__load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self.__load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self.__name}'>"
+
+
+def lazy_import(name):
+    """
+    Imports a module lazily: it is only loaded on first attribute access.
+    Keeps the import of the clients fast when most subsystems are unused.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+asyncio = lazy_import("asyncio")
 
 
 # ######################################################################
@@ -66,3 +115,30 @@ def generate_random_characters(length):
     if id_[0] == '0':
         return generate_random_numbers(length=length)
     return id_
+
+
+# ######################################################################
+# RESPONSES
+# ######################################################################
+
+def unwrap_results(responses):
+    """
+    Flattens Deribit responses into a list of result dictionaries.
+    Accepts raw results, single responses or lists of responses.
+    """
+    if isinstance(responses, dict):
+        responses = [responses]
+
+    output = []
+    for r in responses or []:
+        if isinstance(r, dict) and RESP_CONTENT in r:
+            content = r[RESP_CONTENT]
+            if isinstance(content, list):
+                output.extend(content)
+            else:
+                output.append(content)
+        elif isinstance(r, list):
+            output.extend(unwrap_results(r))
+        else:
+            output.append(r)
+    return output